@@ -42,7 +42,8 @@ db.createCollection("nodeEvents", {
       node_id:            { bsonType: "objectId", description: "FK -> nodes._id" },
       is_powered:         { bsonType: "bool" },
       is_receiving_data:  { bsonType: "bool" },
-      date_time:          { bsonType: "date" }
+      date_time:          { bsonType: "date" },
+      metrics:            { bsonType: "object", description: "Optional, how long each stage of the node's loop took" }
     }
   }},
   validationLevel: "strict",
@@ -76,7 +77,18 @@ db.createCollection("attendanceHistory", {
       packet_type:     { bsonType: "int" },
       device_id:       { bsonType: "string" }, // using hashed device ids
       signal_strength: { bsonType: ["int", 'null'] },
-      date_time:       { bsonType: "date" }
+      date_time:       { bsonType: "date" },
+      // set by the server as a document is stored (and as a summary is merged into), the incremental squash follows it
+      ingested_at:     { bsonType: "date" },
+      // optional, only on summaries uploaded by nodes (one per node, device and 30 minutes)
+      first_seen:      { bsonType: "date" },
+      last_seen:       { bsonType: "date" },
+      packet_count:    { bsonType: ["int", "long"] },
+      signal_min:      { bsonType: "int" },
+      signal_max:      { bsonType: "int" },
+      signal_total:    { bsonType: ["int", "long"] },
+      signal_samples:  { bsonType: ["int", "long"] },
+      uploads:         { bsonType: "array", items: { bsonType: "objectId" } } // the uploads merged in, so one sent again isn't merged twice
     }
   }},
   validationLevel: "strict",
@@ -94,7 +106,109 @@ db.createCollection("densityHistory", {
       total_estimated_humans:  { bsonType: "int" },
       total_estimated_devices: { bsonType: "int" },
       estimation_factor:       { bsonType: "double" },
-      date_time:               { bsonType: "date" }
+      date_time:               { bsonType: "date" },
+      // optional, a compressed HyperLogLog of the devices counted, merged to count distinct devices across nodes and time
+      device_sketch:           { bsonType: "binData" }
+    }
+  }},
+  validationLevel: "strict",
+  validationAction: "error"
+});
+
+// SQUASH STATE (the incremental squash's watermark, one document per squash keyed by name)
+db.createCollection("squashState");
+
+// SQUASH BUCKETS (every device seen each 30 minutes and which nodes saw them, so the squash only reads new attendance)
+db.createCollection("squashBuckets", {
+  validator: { $jsonSchema: {
+    bsonType: "object",
+    required: ["date_time","devices","nodes"],
+    properties: {
+      date_time: { bsonType: "date" },
+      devices:   { bsonType: "object", description: "device_id -> [first_seen, last_seen, packet_count]" },
+      nodes:     { bsonType: "object", description: "node_id -> [device_id]" },
+      // the latest read folded in and the packets it added, taken back out if that read is squashed again
+      folded_from: { bsonType: "object", description: "{ name, from } the squash and where its read started" },
+      folded:      { bsonType: "object", description: "device_id -> packet_count" }
+    }
+  }},
+  validationLevel: "strict",
+  validationAction: "error"
+});
+
+// DENSITY ROLLUPS (each node's density every 5 minutes, 30 minutes, hour and day, each tier built from the one below)
+for (const tier of ["5m", "30m", "1h", "1d"]) {
+  db.createCollection("densityRollup" + tier, {
+    validator: { $jsonSchema: {
+      bsonType: "object",
+      required: ["node_id","date_time","total_estimated_devices","peak_estimated_devices","total_estimated_humans","device_sketch"],
+      properties: {
+        node_id:                 { bsonType: "objectId" },
+        location_id:             { bsonType: "objectId" },
+        date_time:               { bsonType: "date" },
+        total_estimated_devices: { bsonType: "int", description: "distinct devices over the whole period" },
+        peak_estimated_devices:  { bsonType: "int", description: "the most devices of any period of the tier below" },
+        total_estimated_humans:  { bsonType: "int" },
+        estimation_factors:      { bsonType: "double" },
+        device_sketch:           { bsonType: "binData" }
+      }
+    }},
+    validationLevel: "strict",
+    validationAction: "error"
+  });
+}
+
+// DEVICE PROFILES (every hashed device, the 30 minutes of each day it was seen in, so the suspicion rules don't read raw attendance)
+db.createCollection("deviceProfiles", {
+  validator: { $jsonSchema: {
+    bsonType: "object",
+    required: ["first_seen","last_seen","total_packets"],
+    properties: {
+      _id:           { bsonType: "string", description: "the hashed device id" },
+      first_seen:    { bsonType: "date" },
+      last_seen:     { bsonType: "date" },
+      total_packets: { bsonType: ["int","long"] },
+      days:          { bsonType: "object", description: "YYYYMMDD -> { slots: [0-47], earliest, latest, packets }" },
+      // worked out from the days within suspicionFactors.json's profile_days
+      buckets_seen:  { bsonType: "int" },
+      earliest_hour: { bsonType: "int" },
+      latest_hour:   { bsonType: "int" },
+      refreshed_day: { bsonType: "string", description: "YYYYMMDD the fields above were worked out on, older ones are worked out again" },
+      // the latest read observed and the packets it added, taken back out if that read is squashed again
+      folded_from:   { bsonType: "object", description: "{ name, from } the squash and where its read started" },
+      folded:        { bsonType: "object", description: "read key -> YYYYMMDD -> packets" }
+    }
+  }},
+  validationLevel: "strict",
+  validationAction: "error"
+});
+
+// SUSPICIOUS FILTERS (a Bloom filter of the suspicious devices per version, the nodes drop what it holds before uploading)
+db.createCollection("suspiciousFilters", {
+  validator: { $jsonSchema: {
+    bsonType: "object",
+    required: ["version","date_time","devices","error_rate","checksum","filter"],
+    properties: {
+      version:    { bsonType: ["int","long"], description: "nodes ask for anything newer than the version they hold" },
+      date_time:  { bsonType: "date" },
+      devices:    { bsonType: ["int","long"], description: "how many suspicious devices it holds" },
+      error_rate: { bsonType: "double" },
+      checksum:   { bsonType: "string", description: "of the sorted device ids, the same set isn't published twice" },
+      filter:     { bsonType: "binData" }
+    }
+  }},
+  validationLevel: "strict",
+  validationAction: "error"
+});
+
+// SUSPICIOUS DEVICES (the devices in the suspicious filter, each kept until a while after it was last found suspicious)
+db.createCollection("suspiciousDevices", {
+  validator: { $jsonSchema: {
+    bsonType: "object",
+    required: ["listed_until"],
+    properties: {
+      _id:          { bsonType: "string", description: "the device id" },
+      listed_until: { bsonType: "date" }
     }
   }},
   validationLevel: "strict",
@@ -130,11 +244,80 @@ db.attendanceHistory.createIndex(
   { name: "node_device_date_desc" }
 );
 
+// The incremental squash reads what was stored since its last run, in the order it was stored
+db.attendanceHistory.createIndex(
+  { ingested_at: 1, _id: 1 },
+  { name: "ingested_id" }
+);
+
 db.densityHistory.createIndex(
   { location_id: 1, date_time: -1 },
   { name: "loc_date_desc" }
 );
 
+// The incremental squash replaces a node's record for a bucket, and looks buckets up by time
+db.densityHistory.createIndex(
+  { node_id: 1, date_time: 1 },
+  { name: "node_date" }
+);
+
+db.squashBuckets.createIndex(
+  { date_time: 1 },
+  { name: "bucket_date_unique", unique: true }
+);
+
+// A squash looks up what its read added last time, in case it crashed before it moved on
+db.squashBuckets.createIndex(
+  { folded_from: 1 },
+  { name: "bucket_folded_from", sparse: true }
+);
+db.deviceProfiles.createIndex(
+  { folded_from: 1 },
+  { name: "profile_folded_from", sparse: true }
+);
+
+// Each rollup is replaced by node and period, and charts read a node's or location's range
+for (const tier of ["5m", "30m", "1h", "1d"]) {
+  db.getCollection("densityRollup" + tier).createIndex(
+    { node_id: 1, date_time: 1 },
+    { name: "node_date_unique", unique: true }
+  );
+  db.getCollection("densityRollup" + tier).createIndex(
+    { location_id: 1, date_time: 1 },
+    { name: "loc_date" }
+  );
+}
+
+// One index per suspicion rule, each only over devices seen recently
+db.deviceProfiles.createIndex(
+  { last_seen: 1, buckets_seen: 1 },
+  { name: "seen_buckets" }
+);
+db.deviceProfiles.createIndex(
+  { last_seen: 1, earliest_hour: 1 },
+  { name: "seen_earliest" }
+);
+db.deviceProfiles.createIndex(
+  { last_seen: 1, latest_hour: 1 },
+  { name: "seen_latest" }
+);
+db.deviceProfiles.createIndex(
+  { last_seen: 1, refreshed_day: 1 },
+  { name: "seen_refreshed" }
+);
+
+// The devices that have left the filter are deleted by time
+db.suspiciousDevices.createIndex(
+  { listed_until: 1 },
+  { name: "listed_until" }
+);
+
+// The newest filter is the one nodes want, and two publishes can't make the same version
+db.suspiciousFilters.createIndex(
+  { version: -1 },
+  { name: "version_unique", unique: true }
+);
+
 // ----- Seed data (insert locations first, then reference their _id from nodes) -----
 
 // Insert sample locations
@@ -1,10 +1,13 @@
 #!/bin/bash
 # /opt/ict302/start_all.sh
 
+# Both sniffers import from "src", so they are run as modules from the project folder.
+cd /opt/DynamicPopulationDensity
+
 echo "Starting Main Sniffer..."
-python3 /opt/DynamicPopulationDensity/src/node/index.py &
+python3 -m src.node.index &
 
 echo "Starting Bluetooth Sniffer..."
-python3 /opt/DynamicPopulationDensity/src/node/BleSniffer.py 
+python3 -m src.node.BleSniffer
 
 wait  # keeps the script running until background jobs end
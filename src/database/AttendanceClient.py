@@ -4,8 +4,12 @@
 :brief: This module defines all important functions for interacting with the external database.
 """
 from src.structures.node import Node
+from datetime import datetime
 from src.structures.attendance import Attendance
+from src.structures.attendanceSummary import AttendanceSummary
+from src.structures.attendanceBatch import AttendanceBatch, from_epoch
 from src.structures.density import Density
+from src.structures.hyperLogLog import HyperLogLog
 from src.database.ProtoClient import ClientDB as ProtoClient
 
 # MongoDB client
@@ -55,13 +59,14 @@ class AttendanceDB(ProtoClient):
         # Create a new node document, this will be inserted into the database.
         self.insert_data(primary_key_query, attendance_data)
 
-    def insert_many(self, attendence_history: list[Attendance]):
+    def insert_many(self, attendence_history: AttendanceBatch | list[Attendance], timer = None):
         """ 
         :fn: insert_many
         :date: 05/09/2025
         :author: Cameron Sims
         :brief: Inserts a list of attendance record into the database.
-        :param attendence_history: The list of attendance we're inserting 
+        :param attendence_history: The list (or batch) of attendance we're inserting 
+        :param timer: A StageTimer to time serialising and inserting with, optional.
         """
         from colorama import Fore, Back, Style
 
@@ -76,17 +81,154 @@ class AttendanceDB(ProtoClient):
             print(f'{Fore.YELLOW}Warning: There are no attendnace records to insert.{Style.RESET_ALL}')
             return
 
-        history = [ 0 ] * history_len
-        
-        # For each record
+        # Serialised as they are encoded, so only one chunk of documents is held at a time.
+        if isinstance(attendence_history, AttendanceBatch):
+            documents = attendence_history.iter_documents()
+        else:
+            documents = (attendance.serialise() for attendance in attendence_history)
+
+        self.report_ingest(self.bulk_ingest(documents, timer=timer), history_len)
+
+    def insert_documents(self, documents: list[dict]):
+        """ 
+        :fn: insert_documents
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts already serialised attendance records, e.g. ones kept in a node's spool while the database was down.
+        :param documents: The serialised attendance records.
+        """
+        if len(documents) < 1:
+            return
+
+        # Unordered, so one bad document doesn't stop the rest.
+        self.report_ingest(self.bulk_ingest(documents), len(documents))
+
+    def insert_chunk(self, chunk: list):
+        """ 
+        :fn: insert_chunk
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts one chunk, the server stamps each document with when it stored it. A document sent again (by its _id) is left as it was.
+        :param chunk: The encoded documents.
+        :return: Raises a BulkWriteError naming each document (by its index) that failed.
+        """
+        from pymongo import UpdateOne
+        from bson.objectid import ObjectId as ObjectID
+
+        # The incremental squash follows "ingested_at", a node's clock (and the _ids it makes) can't move it.
+        # A stored document wins over the sent one, so a replayed spool or gateway batch isn't stamped (and squashed) again.
+        requests = [ 0 ] * len(chunk)
         i = 0
-        while i < history_len:
-            attendance = attendence_history[i]
-            history[i] = attendance.serialise()
+        for document in chunk:
+            document_id = document["_id"] if "_id" in document else ObjectID()
+            requests[i] = UpdateOne(
+                { "_id": document_id },
+                [ { "$replaceWith": { "$mergeObjects": [ { "$literal": document }, { "ingested_at": "$$NOW" }, "$$ROOT" ] } } ],
+                upsert=True
+            )
             i += 1
+        self.collection.bulk_write(requests, ordered=False)
+
+    def insert_summaries(self, summaries: list[AttendanceSummary]):
+        """ 
+        :fn: insert_summaries
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts attendance summaries, merging them into any summary already stored for the same node, device and 30 minutes.
+        :param summaries: The list of summaries we're inserting
+        """
+        from colorama import Fore, Back, Style
+
+        # If there is no history...
+        if len(summaries) < 1:
+            print(f'{Fore.YELLOW}Warning: There are no attendance summaries to insert.{Style.RESET_ALL}')
+            return
+
+        self.insert_summary_documents([ summary.serialise() for summary in summaries ])
+
+    def insert_summary_documents(self, documents: list[dict]):
+        """ 
+        :fn: insert_summary_documents
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Merges serialised attendance summaries into the database, one document per node, device and 30 minutes.
+                A summary sent again (from a spool or the gateway, after a write that failed part way) is only merged once.
+        :param documents: The serialised summaries.
+        :return: Raises a BulkWriteError naming each summary (by its index) that failed.
+        """
+        from pymongo import UpdateOne
+        from bson.objectid import ObjectId as ObjectID
+
+        if len(documents) < 1:
+            return
+
+        requests = [ 0 ] * len(documents)
         
-        # Insert all into the list 
-        self.collection.insert_many(history)
+        i = 0
+        for summary in documents:
+            # One document per node, device and 30 minutes. Raw attendance records don't have a packet count.
+            primary_key_query = {
+                "node_id": summary["node_id"],
+                "device_id": summary["device_id"],
+                "date_time": summary["date_time"],
+                "packet_count": { "$exists": True }
+            }
+
+            # Summaries from older nodes don't have one, it is kept on the document so retrying this write doesn't merge it twice.
+            upload_id = summary.get("upload_id")
+            if upload_id is None:
+                upload_id = summary["upload_id"] = ObjectID()
+
+            requests[i] = UpdateOne(primary_key_query, self.get_summary_merge(summary, upload_id), upsert=True)
+            i += 1
+
+        # Order doesn't matter, each summary is its own document.
+        self.collection.bulk_write(requests, ordered=False)
+
+    def get_summary_merge(self, summary: dict, upload_id) -> list[dict]:
+        """ 
+        :fn: get_summary_merge
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The update merging one summary into the stored one, an update pipeline so it does nothing if that upload was already merged.
+        :param summary: The serialised summary.
+        :param upload_id: The summary's upload id, remembered in "uploads" once merged.
+        :return: Returns the update pipeline (needs MongoDB 4.2 or newer)
+        """
+        # Worked out first, so every field below agrees on it.
+        merged = { "$in": [ upload_id, { "$ifNull": [ "$uploads", [] ] } ] }
+
+        def unless_merged(field: str, expression):
+            return { "$cond": [ "$merging.done", f"${field}", expression ] }
+
+        fields = {
+            "packet_type": { "$ifNull": [ "$packet_type", summary["packet_type"] ] },
+
+            # $min and $max skip a missing field, so a new summary takes the uploaded values.
+            "first_seen": unless_merged("first_seen", { "$min": [ "$first_seen", summary["first_seen"] ] }),
+            "last_seen": unless_merged("last_seen", { "$max": [ "$last_seen", summary["last_seen"] ] }),
+            "packet_count": unless_merged("packet_count", { "$add": [ { "$ifNull": [ "$packet_count", 0 ] }, summary["packet_count"] ] }),
+            "uploads": unless_merged("uploads", { "$concatArrays": [ { "$ifNull": [ "$uploads", [] ] }, [ upload_id ] ] }),
+
+            # Stamped again on every merge, so the incremental squash reads the summary again.
+            "ingested_at": unless_merged("ingested_at", "$$NOW")
+        }
+
+        # Null is smaller than any number to MongoDB, so only touch the signal when we have one.
+        if summary.get("signal_samples", 0) > 0:
+            fields["signal_min"] = unless_merged("signal_min", { "$min": [ "$signal_min", summary["signal_min"] ] })
+            fields["signal_max"] = unless_merged("signal_max", { "$max": [ "$signal_max", summary["signal_max"] ] })
+            fields["signal_strength"] = unless_merged("signal_strength", { "$max": [ "$signal_strength", summary["signal_max"] ] })
+            fields["signal_total"] = unless_merged("signal_total", { "$add": [ { "$ifNull": [ "$signal_total", 0 ] }, summary["signal_total"] ] })
+            fields["signal_samples"] = unless_merged("signal_samples", { "$add": [ { "$ifNull": [ "$signal_samples", 0 ] }, summary["signal_samples"] ] })
+        else:
+            fields["signal_strength"] = { "$ifNull": [ "$signal_strength", None ] }
+
+        return [
+            { "$set": { "merging": { "done": merged } } },
+            { "$set": fields },
+            { "$unset": "merging" }
+        ]
 
     def should_ignore_attendance(self, strength_options: dict, attendance: Attendance) -> bool:
         """
@@ -98,61 +240,101 @@ class AttendanceDB(ProtoClient):
         :param attendance: The attendance record we are checking
         :return: Returns boolean to if this packet is worth including
         """
+        return self.should_ignore_strength(strength_options, attendance.strength, attendance.packet_type)
+
+    def should_ignore_strength(self, strength_options: dict, strength: int | None, packet_type) -> bool:
+        """
+        :fn: should_ignore_strength
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Should a packet with this strength be added to the frequency list? Used without an Attendance object.
+        :param strength_options: Options for including macs if they fit criteria
+        :param strength: The signal strength, might be None
+        :param packet_type: The type of packet, a PacketType or its value.
+        :return: Returns boolean to if this packet is worth including
+        """
         from src.structures.PacketType import PacketType
 
-        if attendance.strength is not None:
+        if strength is not None:
             # Find the bounds.
-            key_type = 'wifi' if (attendance.packet_type is PacketType.WIFI) else 'bluetooth'
+            key_type = 'wifi' if (packet_type == PacketType.WIFI or packet_type == PacketType.WIFI.value) else 'bluetooth'
             maximum_strength = int(strength_options[key_type]['highest'])
             minimum_strength = int(strength_options[key_type]['lowest'])
 
              # Check if it is within bounds...
-            return (attendance.strength < minimum_strength)
+            return (strength < minimum_strength)
         
         return not strength_options['include_null']
 
-    def get_frequencies(self, entries: list[dict], strength_options: dict) -> dict:
+    def get_frequencies(self, entries: AttendanceBatch | list[dict], strength_options: dict) -> dict:
         """
         :fn: get_frequencies
         :date: 05/09/2025
         :author: Cameron Sims
         :brief: Gets frequencies in the entries.
-        :param entries: The entries of the database
+        :param entries: The entries of the database, as a batch (or the documents themselves)
         :param strength_options: Options for including macs if they fit criteria
         :return: Returns a dictionary of timestamps->hashes
         """
-        # The mac address frequencies, the amount of times they appear.
-        freq = dict()
+        entries = self.as_batch(entries)
+
+        # Worked out on the batch's columns as seconds, the datetimes are only made once per timestamp and mac.
+        seconds_freq = dict()
 
-        for entry in entries:
-            # Create an attendance from this.
-            attendance = Attendance()
-            attendance.deserialise(entry)
+        timestamps, strengths, packet_types = entries.timestamps, entries.strengths, entries.packet_types
+        first_seen, last_seen, packet_counts = entries.first_seen, entries.last_seen, entries.packet_counts
+        device_index, device_ids = entries.device_index, entries.device_ids
 
+        length = len(entries)
+        i = 0
+        while i < length:
             # If the attendance has any strength option...
-            if self.should_ignore_attendance(strength_options, attendance):
+            if self.should_ignore_strength(strength_options, entries.get_strength(i), packet_types[i]):
+                i += 1
                 continue
 
             # We round the time to last 30 minutes because we want to track time like this.
-            timestamp = Density.roundToLast30Minutes(attendance.timestamp)
-            mac_addr = attendance.device_id
+            bucket = int(timestamps[i] // 1800)
+            mac_addr = device_ids[device_index[i]]
+
+            # Summaries from the nodes already hold the first, last and amount of packets, single packets are their own.
+            bucket_freq = seconds_freq.get(bucket)
+            if bucket_freq is None:
+                bucket_freq = seconds_freq[bucket] = dict()
 
             # Check if the mac address exists. 
-            if timestamp in freq:
-                if mac_addr in freq[timestamp]:
-                    # Get the minimum and max of time 
-                    earliest = min(timestamp, freq[timestamp][mac_addr][0])
-                    latest   = max(timestamp, freq[timestamp][mac_addr][1])
-                    frequency = freq[timestamp][mac_addr][2] + 1
-                    freq[timestamp][mac_addr] = (earliest, latest, frequency)
-                else:
-                    freq[timestamp][mac_addr] = (timestamp, timestamp, 1)
+            previous = bucket_freq.get(mac_addr)
+            if previous is None:
+                bucket_freq[mac_addr] = (first_seen[i], last_seen[i], packet_counts[i])
             else:
-                freq[timestamp] = dict() 
-                freq[timestamp][mac_addr] = (timestamp, timestamp, 1)
+                # Get the minimum and max of time 
+                bucket_freq[mac_addr] = (min(first_seen[i], previous[0]), max(last_seen[i], previous[1]), previous[2] + packet_counts[i])
+            i += 1
+
+        # The mac address frequencies, the amount of times they appear.
+        freq = dict()
+        for bucket in seconds_freq:
+            timestamp = from_epoch(bucket * 1800)
+            freq[timestamp] = { mac_addr: (from_epoch(tpl[0]), from_epoch(tpl[1]), tpl[2]) for mac_addr, tpl in seconds_freq[bucket].items() }
 
         return freq
 
+    def as_batch(self, entries: AttendanceBatch | list[dict]) -> AttendanceBatch:
+        """
+        :fn: as_batch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Lets the squash steps take documents as well as batches.
+        :param entries: A batch, or documents from the database.
+        :return: Returns the entries as a batch.
+        """
+        if isinstance(entries, AttendanceBatch):
+            return entries
+
+        batch = AttendanceBatch()
+        batch.deserialise(entries)
+        return batch
+
     def get_total_mac_occurances(self, freq: dict) -> dict:
         """
         :fn: get_total_mac_occurances
@@ -230,53 +412,117 @@ class AttendanceDB(ProtoClient):
         # Give the set of suspicious macs...
         return suspicious_macs
 
-    def calculate_total_unsuspicious_macs(self,  entries: list[dict], freq: dict, suspicious_macs: set) -> set:
+    def find_suspicious_macs(self, options: dict, freq: dict, profile_client = None) -> set:
+        """
+        :fn: find_suspicious_macs
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the suspicious macs, from these frequencies alone or from the device profiles they are added to.
+        :param options: The option for suspicious macs
+        :param freq: Frequency map, timestamp and the mac addresses packets that were captured
+        :param profile_client: A DeviceProfileDB to add the frequencies to and evaluate, only the frequencies are looked at if None.
+        :return: Returns a set of hashes
+        """
+        if profile_client is None:
+            return self.get_suspicious_macs(options, freq, self.get_total_mac_occurances(freq))
+
+        if not freq:
+            return set()
+        return profile_client.evaluate(profile_client.observe(freq), options, max(freq))
+
+    def calculate_total_unsuspicious_macs(self,  entries: AttendanceBatch | list[dict], freq: dict, suspicious_macs: set) -> set:
         """
         :fn: calculate_total_unsuspicious_macs
         :date: 05/09/2025
         :author: Cameron Sims
         :brief: Get the amount of unsuspicious macs that we have.
-        :param entries: The entries of the database
+        :param entries: The entries of the database, as a batch (or the documents themselves)
         :param freq: The frequency dict, lists timestamps to node_ids
         :param suspicious_macs: The mac addresses we do not trust.
         :return: Returns the nodes with the appropriate level of non-suspicious macs
         """
+        entries = self.as_batch(entries)
         nodes = dict()
 
-        # Add the frequencies 
-        for entry in entries:
-            # Create an attendance from this.
-            attendance = Attendance()
-            attendance.deserialise(entry)
+        # The amount of non suspicious macs at each timestamp, only worked out once per timestamp.
+        totals = dict()
 
-            # We round the time to last 30 minutes because we want to track time like this.
-            timestamp = Density.roundToLast30Minutes(attendance.timestamp)
+        # Every node and timestamp that has an entry.
+        timestamps, node_index = entries.timestamps, entries.node_index
+        pairs = set()
+        length = len(entries)
+        i = 0
+        while i < length:
+            pairs.add((node_index[i], int(timestamps[i] // 1800)))
+            i += 1
 
+        for node, bucket in pairs:
             # If the node exists in the dictionary, add to the freq of the timestamp
-            node_id = attendance.node_id
+            node_id = entries.node_ids[node]
             if not node_id in nodes:
                 nodes[node_id] = dict()
 
-            # Get all the macs in this address.
-            
+            # We round the time to last 30 minutes because we want to track time like this.
+            timestamp = from_epoch(bucket * 1800)
+
             # Show the set
             if timestamp in freq:
-                # These are the unique macs at this timestamp
-                unique_macs = set(freq[timestamp])
+                if timestamp not in totals:
+                    # These are the unique macs at this timestamp, without the suspicious ones.
+                    unique_macs = set(freq[timestamp])
+                    totals[timestamp] = len(unique_macs - suspicious_macs)
 
-                # Get non suspicious macs
-                nonsus_macs = unique_macs - suspicious_macs
-
-                nodes[node_id][timestamp] = len(nonsus_macs)
+                nodes[node_id][timestamp] = totals[timestamp]
 
         return nodes
 
-    def convert_mac_accesses_to_history(self, full_nodes: list[Node], nodes: dict, estimation_options: dict) -> list[Density]:
+    def get_device_sketches(self, entries: AttendanceBatch | list[dict], strength_options: dict, suspicious_macs: set) -> dict:
+        """
+        :fn: get_device_sketches
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Sketches the unsuspicious devices each node saw every 30 minutes, so distinct devices can be counted across nodes and time later.
+        :param entries: The entries of the database, as a batch (or the documents themselves)
+        :param strength_options: Options for including macs if they fit criteria
+        :param suspicious_macs: The mac addresses we do not trust.
+        :return: Returns a dictionary of node_id->timestamp->HyperLogLog
+        """
+        entries = self.as_batch(entries)
+
+        # Sketched by (node, bucket) index first, then keyed like the counts.
+        bucket_sketches = dict()
+
+        timestamps, packet_types, node_index, device_index = entries.timestamps, entries.packet_types, entries.node_index, entries.device_index
+        length = len(entries)
+        i = 0
+        while i < length:
+            device_id = entries.device_ids[device_index[i]]
+
+            # The same entries the counts skip.
+            if self.should_ignore_strength(strength_options, entries.get_strength(i), packet_types[i]) or device_id in suspicious_macs:
+                i += 1
+                continue
+
+            key = (node_index[i], int(timestamps[i] // 1800))
+            sketch = bucket_sketches.get(key)
+            if sketch is None:
+                sketch = bucket_sketches[key] = HyperLogLog()
+            sketch.add(device_id)
+            i += 1
+
+        sketches = dict()
+        for (node, bucket), sketch in bucket_sketches.items():
+            sketches.setdefault(entries.node_ids[node], dict())[from_epoch(bucket * 1800)] = sketch
+
+        return sketches
+
+    def convert_mac_accesses_to_history(self, full_nodes: list[Node], nodes: dict, estimation_options: dict, sketches: dict = None) -> list[Density]:
         """
         :fn: convert_mac_accesses_to_history
         :date: 05/09/2025
         :author: Cameron Sims
         :brief: Get the history from a collection of node data
+        :param sketches: The device sketches of each node and timestamp, from get_device_sketches()
         :return: Returns the nodes and the estimated populaton they have
         """
         # Create an array to send back 
@@ -300,11 +546,27 @@ class AttendanceDB(ProtoClient):
 
                 # New Historic Attendance.
                 historic = Density(ts, node, freq, estimation_options['estimation_factor'])
+                if sketches is not None:
+                    historic.device_sketch = sketches.get(node_id, dict()).get(ts)
 
                 history.append(historic)
         return history
 
-    def squash(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict) -> list[Density]:
+    def roll_up(self, rollup_client, node_devices: dict, suspicious_macs: set, full_nodes: list[Node], estimation_options: dict):
+        """
+        :fn: roll_up
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds squashed attendance to the rollup tiers.
+        :param rollup_client: The RollupDB.
+        :param node_devices: The devices each node saw every few minutes, from get_node_devices()
+        :param suspicious_macs: The mac addresses we do not trust.
+        :param full_nodes: A list of all nodes.
+        :param estimation_options: Options for estimating people from devices.
+        """
+        rollup_client.roll_up(node_devices, suspicious_macs, full_nodes, float(estimation_options['estimation_factor']))
+
+    def squash(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict, rollup_client = None, profile_client = None) -> list[Density]:
         """
         :fn: squash
         :date: 03/09/2025
@@ -313,19 +575,20 @@ class AttendanceDB(ProtoClient):
         :param full_nodes: A list of all nodes.
         :param sus_options: The option for suspicious macs
         :param strength_options: Options for including macs if they fit criteria
+        :param rollup_client: A RollupDB to add the attendance to, no rollups if None.
+        :param profile_client: A DeviceProfileDB to judge suspicion with, only this attendance is looked at if None.
         :return: Returns an array of "Density" instances.
         """
 
-        # Get all entries in the collection.
-        entries = list(self.collection.find({}))
+        # Get all entries in the collection, straight into columns.
+        entries = AttendanceBatch()
+        entries.deserialise(self.collection.find({}, { "_id": 0 }))
 
          # The mac address frequencies, the amount of times they appear.
         freq = self.get_frequencies(entries, strength_options)
 
         # Get the suspicious macs 
-        macs_over_times = self.get_total_mac_occurances(freq)
-
-        suspicious_macs = self.get_suspicious_macs(sus_options, freq, macs_over_times)
+        suspicious_macs = self.find_suspicious_macs(sus_options, freq, profile_client)
 
         # This is the map of every node, every 30 mins.
         nodes = self.calculate_total_unsuspicious_macs(entries, freq, suspicious_macs)
@@ -336,4 +599,563 @@ class AttendanceDB(ProtoClient):
             for timestamp in nodes[node_id]:
                 print(timestamp, nodes[node_id][timestamp])
         
-        return self.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options)
+        # Sketches of the devices behind each count.
+        sketches = self.get_device_sketches(entries, strength_options, suspicious_macs)
+
+        if rollup_client is not None:
+            self.roll_up(rollup_client, self.get_node_devices(entries, strength_options, rollup_client.base_minutes), suspicious_macs, full_nodes, estimation_options)
+
+        return self.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options, sketches)
+
+    def stamp_unstamped(self):
+        """
+        :fn: stamp_unstamped
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stamps attendance stored without an "ingested_at" (from before it was stamped, or an old node writing directly) with now.
+        """
+        self.collection.update_many({ "ingested_at": { "$exists": False } }, { "$currentDate": { "ingested_at": True } })
+
+    def get_ingest_cutoff(self, settle_seconds: float) -> datetime:
+        """
+        :fn: get_ingest_cutoff
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The newest "ingested_at" that is safe to read up to, by the server's clock.
+        :param settle_seconds: How far behind the server's clock to stay, so a document stamped but not yet visible isn't passed.
+        :return: Returns the cutoff, attendance stamped before it is read.
+        """
+        from datetime import timedelta
+
+        now = self.collection.database.command("hello")["localTime"]
+        return now - timedelta(seconds=settle_seconds)
+
+    def get_ingest_query(self, watermark, cutoff: datetime) -> dict:
+        """
+        :fn: get_ingest_query
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The attendance stamped since the watermark and before the cutoff.
+        :param watermark: The cutoff of the last run, None to start from the beginning.
+        :param cutoff: From get_ingest_cutoff()
+        :return: Returns the query.
+        """
+        stamped = { "$lt": cutoff }
+        if watermark is not None:
+            stamped["$gte"] = watermark
+        return { "ingested_at": stamped }
+
+    def read_new_entries(self, query: dict, after: tuple, limit: int) -> tuple:
+        """
+        :fn: read_new_entries
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads a chunk of the attendance a query matches, in (ingested_at, _id) order, straight into columns.
+        :param query: From get_ingest_query()
+        :param after: The (ingested_at, _id) of the last document of the chunk before, None for the first chunk.
+        :param limit: The most documents to read.
+        :return: Returns (batch, (ingested_at, _id) of the last document read, _ids read)
+        """
+        if after is not None:
+            # A summary merged into since keeps its _id but moves past the cutoff, so it isn't read twice in a run.
+            query = { "$and": [ query, { "$or": [ { "ingested_at": { "$gt": after[0] } }, { "ingested_at": after[0], "_id": { "$gt": after[1] } } ] } ] }
+        cursor = self.collection.find(query).sort([ ("ingested_at", 1), ("_id", 1) ]).limit(limit)
+
+        # The _ids aren't kept in the batch, they are only needed to clear what was read.
+        ids = []
+        last = [ None ]
+        def documents():
+            for data in cursor:
+                ids.append(data["_id"])
+                last[0] = (data["ingested_at"], data["_id"])
+                yield data
+
+        entries = AttendanceBatch()
+        entries.deserialise(documents())
+        return (entries, last[0], ids)
+
+    def get_node_devices(self, entries: AttendanceBatch | list[dict], strength_options: dict, minutes: int = 30) -> dict:
+        """
+        :fn: get_node_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Which devices each node saw every 30 minutes, a node with only ignored entries still appears with none.
+        :param entries: The entries of the database, as a batch (or the documents themselves)
+        :param strength_options: Options for including macs if they fit criteria
+        :param minutes: The length of each bucket, e.g. 5 for the finest rollup.
+        :return: Returns a dictionary of timestamp->node_id->set of device ids
+        """
+        entries = self.as_batch(entries)
+        seconds = minutes * 60
+
+        # By bucket and node index first, the datetimes and node ids are only made once each.
+        bucket_nodes = dict()
+
+        timestamps, packet_types, node_index, device_index = entries.timestamps, entries.packet_types, entries.node_index, entries.device_index
+        length = len(entries)
+        i = 0
+        while i < length:
+            devices = bucket_nodes.setdefault((int(timestamps[i] // seconds), node_index[i]), set())
+
+            # Every node with an entry is counted, like calculate_total_unsuspicious_macs() does.
+            if not self.should_ignore_strength(strength_options, entries.get_strength(i), packet_types[i]):
+                devices.add(entries.device_ids[device_index[i]])
+            i += 1
+
+        node_devices = dict()
+        for (bucket, node), devices in bucket_nodes.items():
+            node_devices.setdefault(from_epoch(bucket * seconds), dict())[str(entries.node_ids[node])] = devices
+
+        return node_devices
+
+    def new_entry_chunks(self, query: dict, strength_options: dict, chunk_documents: int, engine: str = "python", rollup_minutes: int = None):
+        """
+        :fn: new_entry_chunks
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Groups the attendance stamped since the last run, a chunk at a time in python or all at once in an aggregation.
+        :param query: From get_ingest_query()
+        :param strength_options: Options for including macs if they fit criteria
+        :param chunk_documents: The most attendance documents read at once by the python engine.
+        :param engine: "python" or "aggregation"
+        :param rollup_minutes: The length of the finest rollup, its node devices are grouped as well if given.
+        :return: Yields (frequencies, node devices, rollup node devices or None, _ids read, documents) like get_frequencies() and get_node_devices() give.
+        """
+        if engine == "aggregation":
+            # Only the _ids come back, so what was read can be cleared.
+            ids = [ data["_id"] for data in self.collection.find(query, { "_id": 1 }) ]
+            if not ids:
+                return
+
+            freq, node_devices = self.aggregate_frequencies(query, strength_options)
+            rollup_devices = None if rollup_minutes is None else self.aggregate_node_devices(query, strength_options, rollup_minutes)
+            yield (freq, node_devices, rollup_devices, ids, len(ids))
+            return
+
+        after = None
+        while True:
+            entries, after, ids = self.read_new_entries(query, after, chunk_documents)
+            if not ids:
+                return
+
+            rollup_devices = None if rollup_minutes is None else self.get_node_devices(entries, strength_options, rollup_minutes)
+            yield (self.get_frequencies(entries, strength_options), self.get_node_devices(entries, strength_options), rollup_devices, ids, len(ids))
+
+            if len(ids) < chunk_documents:
+                return
+
+    def get_strength_match(self, strength_options: dict) -> dict:
+        """
+        :fn: get_strength_match
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The query matching the entries should_ignore_strength() keeps, so MongoDB can filter them.
+        :param strength_options: Options for including macs if they fit criteria
+        :return: Returns the query.
+        """
+        from src.structures.PacketType import PacketType
+
+        # Wi-Fi has its own bound, everything else (even a missing type) uses bluetooth's.
+        conditions = [
+            { "packet_type": PacketType.WIFI.value, "signal_strength": { "$gte": int(strength_options['wifi']['lowest']) } },
+            { "packet_type": { "$ne": PacketType.WIFI.value }, "signal_strength": { "$gte": int(strength_options['bluetooth']['lowest']) } }
+        ]
+
+        # Matches a null or missing strength.
+        if strength_options['include_null']:
+            conditions.append({ "signal_strength": None })
+
+        return { "$or": conditions }
+
+    def aggregate_frequencies(self, query: dict, strength_options: dict) -> tuple:
+        """
+        :fn: aggregate_frequencies
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Has MongoDB filter and group the entries into 30 minute buckets, only one row per bucket and device comes back.
+        :param query: Which entries, e.g. a time or _id range.
+        :param strength_options: Options for including macs if they fit criteria
+        :return: Returns (frequencies, node devices), the same as get_frequencies() and get_node_devices() give.
+        """
+        bucket = { "$dateTrunc": { "date": "$date_time", "unit": "minute", "binSize": 30 } }
+
+        # Every device in every bucket, with the nodes that saw it. Summaries already hold their first, last and amount.
+        pipeline = [
+            { "$match": { "$and": [ query, self.get_strength_match(strength_options) ] } },
+            { "$group": {
+                "_id": { "date_time": bucket, "device_id": "$device_id" },
+                "first_seen": { "$min": { "$ifNull": [ "$first_seen", "$date_time" ] } },
+                "last_seen": { "$max": { "$ifNull": [ "$last_seen", "$date_time" ] } },
+                "packet_count": { "$sum": { "$ifNull": [ "$packet_count", 1 ] } },
+                "node_ids": { "$addToSet": "$node_id" }
+            } }
+        ]
+
+        freq = dict()
+        node_devices = dict()
+        for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            timestamp, device_id = row["_id"]["date_time"], row["_id"]["device_id"]
+            freq.setdefault(timestamp, dict())[device_id] = (row["first_seen"], row["last_seen"], row["packet_count"])
+
+            nodes = node_devices.setdefault(timestamp, dict())
+            for node_id in row["node_ids"]:
+                nodes.setdefault(str(node_id), set()).add(device_id)
+
+        # Nodes count in a bucket even if every entry they had was filtered out, like calculate_total_unsuspicious_macs()
+        pipeline = [
+            { "$match": query },
+            { "$group": { "_id": { "date_time": bucket, "node_id": "$node_id" } } }
+        ]
+        for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            node_devices.setdefault(row["_id"]["date_time"], dict()).setdefault(str(row["_id"]["node_id"]), set())
+
+        return (freq, node_devices)
+
+    def aggregate_node_devices(self, query: dict, strength_options: dict, minutes: int) -> dict:
+        """
+        :fn: aggregate_node_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Has MongoDB work out which devices each node saw every few minutes, what get_node_devices() gives.
+        :param query: Which entries, e.g. a time or _id range.
+        :param strength_options: Options for including macs if they fit criteria
+        :param minutes: The length of each bucket.
+        :return: Returns a dictionary of timestamp->node_id->set of device ids
+        """
+        bucket = { "$dateTrunc": { "date": "$date_time", "unit": "minute", "binSize": minutes } }
+
+        node_devices = dict()
+        pipeline = [
+            { "$match": { "$and": [ query, self.get_strength_match(strength_options) ] } },
+            { "$group": { "_id": { "date_time": bucket, "node_id": "$node_id" }, "device_ids": { "$addToSet": "$device_id" } } }
+        ]
+        for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            node_devices.setdefault(row["_id"]["date_time"], dict())[str(row["_id"]["node_id"])] = set(row["device_ids"])
+
+        # Nodes with only filtered entries still appear, with no devices.
+        pipeline = [
+            { "$match": query },
+            { "$group": { "_id": { "date_time": bucket, "node_id": "$node_id" } } }
+        ]
+        for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            node_devices.setdefault(row["_id"]["date_time"], dict()).setdefault(str(row["_id"]["node_id"]), set())
+
+        return node_devices
+
+    def numpy_squash(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict, rollup_client = None, profile_client = None) -> list[Density]:
+        """
+        :fn: numpy_squash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The same as squash(), but the counting is done on the batch's columns with NumPy.
+        :param full_nodes: A list of all nodes.
+        :param sus_options: The option for suspicious macs
+        :param strength_options: Options for including macs if they fit criteria
+        :param estimation_options: Options for estimating people from devices.
+        :param rollup_client: A RollupDB to add the attendance to, no rollups if None.
+        :param profile_client: A DeviceProfileDB to judge suspicion with, only this attendance is looked at if None.
+        :return: Returns an array of "Density" instances.
+        """
+        from src.database.NumpySquash import squash_batch
+
+        # Get all entries in the collection, straight into columns.
+        entries = AttendanceBatch()
+        entries.deserialise(self.collection.find({}, { "_id": 0 }))
+
+        nodes, sketches, suspicious_macs = squash_batch(entries, sus_options, strength_options, profile_client)
+        print('Suspicious macs:', [mac for mac in suspicious_macs])
+
+        if rollup_client is not None:
+            self.roll_up(rollup_client, self.get_node_devices(entries, strength_options, rollup_client.base_minutes), suspicious_macs, full_nodes, estimation_options)
+
+        return self.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options, sketches)
+
+    def aggregate_squash(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict, start: datetime = None, end: datetime = None, rollup_client = None, profile_client = None) -> list[Density]:
+        """
+        :fn: aggregate_squash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The same as squash(), but MongoDB does the filtering and grouping so only per bucket summaries are sent to us.
+        :param full_nodes: A list of all nodes.
+        :param sus_options: The option for suspicious macs
+        :param strength_options: Options for including macs if they fit criteria
+        :param estimation_options: Options for estimating people from devices.
+        :param start: Only squash entries from this time, inclusive, everything if None.
+        :param end: Only squash entries before this time, everything if None.
+        :param rollup_client: A RollupDB to add the attendance to, no rollups if None.
+        :param profile_client: A DeviceProfileDB to judge suspicion with, only this attendance is looked at if None.
+        :return: Returns an array of "Density" instances.
+        """
+        # The time range uses the date_time indexes.
+        query = dict()
+        if start is not None or end is not None:
+            query["date_time"] = dict()
+            if start is not None:
+                query["date_time"]["$gte"] = start
+            if end is not None:
+                query["date_time"]["$lt"] = end
+
+        freq, node_devices = self.aggregate_frequencies(query, strength_options)
+
+        # Get the suspicious macs 
+        suspicious_macs = self.find_suspicious_macs(sus_options, freq, profile_client)
+
+        # Every node in a bucket gets the bucket's count, the same as calculate_total_unsuspicious_macs()
+        nodes = dict()
+        sketches = dict()
+        for timestamp, bucket_nodes in node_devices.items():
+            if timestamp not in freq:
+                continue
+            total = len(set(freq[timestamp]) - suspicious_macs)
+
+            for node_id, devices in bucket_nodes.items():
+                nodes.setdefault(node_id, dict())[timestamp] = total
+
+                counted = devices - suspicious_macs
+                if not counted:
+                    continue
+                sketch = HyperLogLog()
+                for device_id in counted:
+                    sketch.add(device_id)
+                sketches.setdefault(node_id, dict())[timestamp] = sketch
+
+        print('Suspicious macs:', [mac for mac in suspicious_macs])
+
+        if rollup_client is not None:
+            self.roll_up(rollup_client, self.aggregate_node_devices(query, strength_options, rollup_client.base_minutes), suspicious_macs, full_nodes, estimation_options)
+
+        return self.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options, sketches)
+
+    def fold_into_buckets(self, buckets: dict, freq: dict, node_devices: dict, fold: dict = None):
+        """
+        :fn: fold_into_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds new entries to the buckets they fall in, folding the same entry in twice doesn't change who was seen.
+        :param buckets: timestamp -> bucket, the buckets are changed in place.
+        :param freq: The new entries' frequencies, from get_frequencies()
+        :param node_devices: The new entries' devices per node, from get_node_devices()
+        :param fold: Which read the entries came from, { "name", "from" } where it started. Each bucket remembers the packets its latest read added,
+                     so SquashStateDB.revert_buckets() can take them back out if that read is squashed again.
+        """
+        for timestamp, macs in freq.items():
+            bucket = buckets[timestamp]
+            devices = bucket["devices"]
+
+            # Only the latest read is kept, the ones before it have all been confirmed.
+            folded = None
+            if fold is not None:
+                if bucket.get("folded_from") != fold:
+                    bucket["folded_from"] = fold
+                    bucket["folded"] = dict()
+                folded = bucket["folded"]
+
+            for mac, tpl in macs.items():
+                previous = devices.get(mac)
+                if previous is None:
+                    devices[mac] = list(tpl)
+                else:
+                    devices[mac] = [ min(previous[0], tpl[0]), max(previous[1], tpl[1]), previous[2] + tpl[2] ]
+
+                if folded is not None:
+                    folded[mac] = folded.get(mac, 0) + tpl[2]
+
+        for timestamp, nodes in node_devices.items():
+            bucket_nodes = buckets[timestamp]["nodes"]
+            for node_id, devices in nodes.items():
+                bucket_nodes.setdefault(node_id, set()).update(devices)
+
+    def rebuild_frequencies(self, keys: set, strength_options: dict) -> dict:
+        """
+        :fn: rebuild_frequencies
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Groups everything stored for some devices in some buckets again, for summaries that were merged into after they were folded.
+        :param keys: (bucket timestamp, device id) pairs.
+        :param strength_options: Options for including macs if they fit criteria
+        :return: Returns the frequencies of just those pairs, like get_frequencies() gives.
+        """
+        from datetime import timedelta
+
+        # One query per bucket, for every device of it.
+        bucket_devices = dict()
+        for timestamp, device_id in keys:
+            bucket_devices.setdefault(timestamp, set()).add(device_id)
+
+        freq = dict()
+        for timestamp, device_ids in bucket_devices.items():
+            query = { "date_time": { "$gte": timestamp, "$lt": timestamp + timedelta(minutes=30) }, "device_id": { "$in": list(device_ids) } }
+            for bucket, macs in self.get_frequencies(list(self.collection.find(query)), strength_options).items():
+                freq.setdefault(bucket, dict()).update({ mac: tpl for mac, tpl in macs.items() if mac in device_ids })
+
+        return freq
+
+    def incremental_squash(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict, state_client, lookback_buckets: int = 96, chunk_documents: int = 50000, engine: str = "python", rollup_client = None, profile_client = None, settle_seconds: float = 5) -> tuple:
+        """
+        :fn: incremental_squash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Squashes only the attendance stored (or merged into) since the last run, rebuilding just the 30 minute buckets it falls in.
+        :param full_nodes: A list of all nodes.
+        :param sus_options: The option for suspicious macs
+        :param strength_options: Options for including macs if they fit criteria
+        :param estimation_options: Options for estimating people from devices.
+        :param state_client: The SquashStateDB holding the watermark and buckets.
+        :param lookback_buckets: How many buckets before the new ones the suspicion rules look at, the full squash looked at whatever attendance was kept.
+        :param chunk_documents: The most attendance documents read at once.
+        :param engine: "python" reads the new documents, "aggregation" has MongoDB group them first.
+        :param rollup_client: A RollupDB to add the new attendance to, no rollups if None.
+        :param profile_client: A DeviceProfileDB to add the new attendance to and judge suspicion with, the stored buckets are looked back at if None.
+        :param settle_seconds: How far behind the server's clock the run reads, see get_ingest_cutoff()
+        :return: Returns (densities, bucket documents to save, the new watermark, _ids read, documents read), only the rollups and profiles are written here.
+        """
+        watermark = state_client.get_watermark("attendance")
+
+        # A run that crashed before the watermark moved read from the same place, what it added is taken back out before it is read again.
+        fold = { "name": "attendance", "from": watermark }
+        state_client.revert_buckets(fold)
+        if profile_client is not None:
+            profile_client.revert(fold)
+
+        # Anything stored without a stamp is stamped now, so it is read by this run or the next.
+        self.stamp_unstamped()
+        cutoff = self.get_ingest_cutoff(settle_seconds)
+        query = self.get_ingest_query(watermark, cutoff)
+
+        # Read and fold the new entries a chunk at a time, only the buckets they touch are held.
+        buckets = dict()
+        documents = 0
+        rollup_minutes = None if rollup_client is None else rollup_client.base_minutes
+        rollup_devices = dict()
+        profiled = set()
+        read_ids = []
+        for freq, node_devices, chunk_rollup_devices, ids, amount in self.new_entry_chunks(query, strength_options, chunk_documents, engine, rollup_minutes):
+            read_ids.extend(ids)
+            documents += amount
+
+            # Only the new entries are rolled up, the base tier keeps what it had.
+            if chunk_rollup_devices is not None:
+                for timestamp, nodes in chunk_rollup_devices.items():
+                    for node_id, devices in nodes.items():
+                        rollup_devices.setdefault(timestamp, dict()).setdefault(node_id, set()).update(devices)
+
+            # Load the stored buckets we are about to add to, or start them.
+            self.load_buckets(buckets, set(freq) | set(node_devices), state_client)
+            self.fold_into_buckets(buckets, freq, node_devices, fold)
+
+            # Profiles only ever see each chunk once.
+            if profile_client is not None:
+                profiled |= profile_client.observe(freq, fold)
+
+        if documents == 0:
+            return ([], [], cutoff, [], 0)
+
+        suspicious_macs = None if profile_client is None else profile_client.evaluate(profiled, sus_options, max(buckets))
+        history, suspicious_macs = self.count_buckets(full_nodes, buckets, sus_options, estimation_options, state_client, lookback_buckets, suspicious_macs)
+
+        print(f"Incremental squash read {documents} new attendance documents, {len(buckets)} buckets changed, {len(suspicious_macs)} suspicious macs.")
+
+        # Written before the watermark moves, so a crash only merges the same devices in again.
+        if rollup_client is not None:
+            self.roll_up(rollup_client, rollup_devices, suspicious_macs, full_nodes, estimation_options)
+
+        return (history, self.storable_buckets(buckets), cutoff, read_ids, documents)
+
+    def load_buckets(self, buckets: dict, timestamps, state_client):
+        """
+        :fn: load_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Loads the stored buckets of some timestamps that aren't held yet, or starts them empty.
+        :param buckets: timestamp -> bucket, the buckets held so far. Changed in place.
+        :param timestamps: The buckets about to be added to.
+        :param state_client: The SquashStateDB holding the buckets.
+        """
+        missing = [ timestamp for timestamp in timestamps if timestamp not in buckets ]
+        if not missing:
+            return
+
+        stored = state_client.get_buckets(missing)
+        for timestamp in missing:
+            bucket = stored.get(timestamp, { "date_time": timestamp, "devices": dict(), "nodes": dict() })
+            bucket["nodes"] = { node_id: set(devices) for node_id, devices in bucket["nodes"].items() }
+            buckets[timestamp] = bucket
+
+    def count_buckets(self, full_nodes: list[Node], buckets: dict, sus_options: dict, estimation_options: dict, state_client, lookback_buckets: int, suspicious_macs: set = None) -> tuple:
+        """
+        :fn: count_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Counts the unsuspicious devices of some buckets, the stored buckets before them are only read for the suspicion rules.
+        :param full_nodes: A list of all nodes.
+        :param buckets: timestamp -> bucket, the buckets to count.
+        :param sus_options: The option for suspicious macs
+        :param estimation_options: Options for estimating people from devices.
+        :param state_client: The SquashStateDB holding the stored buckets.
+        :param lookback_buckets: How many buckets before these the suspicion rules look at.
+        :param suspicious_macs: The suspicious macs if already known (e.g. from the device profiles), worked out from the buckets if None.
+        :return: Returns (densities, suspicious macs)
+        """
+        from datetime import timedelta
+
+        if suspicious_macs is None:
+            # The suspicion rules look back from these buckets, which replace what is stored.
+            window = state_client.get_bucket_devices(min(buckets) - timedelta(minutes=30 * lookback_buckets), max(buckets))
+            for timestamp, bucket in buckets.items():
+                window[timestamp] = bucket["devices"]
+
+            macs_over_times = self.get_total_mac_occurances(window)
+            suspicious_macs = self.get_suspicious_macs(sus_options, window, macs_over_times)
+
+        # Only these buckets are counted, the same way squash() counts them.
+        nodes = dict()
+        sketches = dict()
+        for timestamp, bucket in buckets.items():
+            # A bucket without a counted device has no records, like squash()
+            if not bucket["devices"]:
+                continue
+            total = len(set(bucket["devices"]) - suspicious_macs)
+            for node_id, devices in bucket["nodes"].items():
+                nodes.setdefault(node_id, dict())[timestamp] = total
+
+                # Like get_device_sketches(), a node without any counted device has no sketch.
+                counted = devices - suspicious_macs
+                if not counted:
+                    continue
+                sketch = HyperLogLog()
+                for device_id in counted:
+                    sketch.add(device_id)
+                sketches.setdefault(node_id, dict())[timestamp] = sketch
+
+        history = self.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options, sketches)
+        return (history, suspicious_macs)
+
+    def storable_buckets(self, buckets: dict) -> list[dict]:
+        """
+        :fn: storable_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Copies buckets into documents SquashStateDB.save_buckets() can store, the held buckets are left as they are.
+        :param buckets: timestamp -> bucket
+        :return: Returns the bucket documents.
+        """
+        # Sets can't be stored.
+        return [
+            dict(bucket, nodes={ node_id: sorted(devices) for node_id, devices in bucket["nodes"].items() })
+            for bucket in buckets.values()
+        ]
+
+    def clear_read(self, ids: list, cutoff: datetime, chunk_documents: int = 10000):
+        """ 
+        :fn: clear_read
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Clears the attendance a run read, anything stored (or merged into) since is kept.
+        :param ids: The _ids read.
+        :param cutoff: The run's cutoff, a summary merged into after it was read is stamped past this.
+        :param chunk_documents: The most _ids in one delete.
+        """
+        start = 0
+        while start < len(ids):
+            self.collection.delete_many({ "_id": { "$in": ids[start:start + chunk_documents] }, "ingested_at": { "$lt": cutoff } })
+            start += chunk_documents
@@ -9,6 +9,11 @@ from src.database.NodeClient import NodeDB as NodeClient
 from src.database.LocationClient import LocationDB as LocationClient
 from src.database.AttendanceClient import AttendanceDB as AttendanceClient
 from src.database.DensityClient import DensityDB as DensityClient
+from src.database.NodeEventClient import NodeEventDB as NodeEventClient
+from src.database.SquashStateClient import SquashStateDB as SquashStateClient
+from src.database.RollupClient import RollupDB as RollupClient
+from src.database.DeviceProfileClient import DeviceProfileDB as DeviceProfileClient
+from src.database.SuspiciousFilterClient import SuspiciousFilterDB as SuspiciousFilterClient
     
 class DatabaseClient:
     """
@@ -27,6 +32,9 @@ class DatabaseClient:
         # Import the JSON module, used for reading the database login file
         from json import load as json_load
 
+        # Kept so worker processes can make their own connections.
+        self.login_file = login_file
+
         # Open the database login file 
         with open(login_file, "r") as db_loginFile:
             # Read the JSON file, 
@@ -38,7 +46,7 @@ class DatabaseClient:
             self.collections = db_login['collections']
             
             # Create the database clients
-            self.node_client, self.location_client, self.attendance_client, self.historic_client = self.create_clients(self.collections)
+            self.node_client, self.location_client, self.attendance_client, self.historic_client, self.node_event_client, self.squash_state_client, self.rollup_client, self.device_profile_client, self.suspicious_filter_client = self.create_clients(self.collections)
 
     def __del__(self):
         """
@@ -70,7 +78,7 @@ class DatabaseClient:
         :author: Cameron Sims
         :brief: Creates instances of our clients.
         :param collections: The dictonary of collections from the database login file.
-        :return: A tuple of the node client, location client, attendance client, and historic attendance client.
+        :return: A tuple of the node client, location client, attendance client, historic attendance client, node event client, squash state client, rollup client, device profile client and suspicious filter client.
         """
         # Create the node client 
         node_client = NodeClient(self.mongo_database, collections['nodes'])
@@ -84,7 +92,22 @@ class DatabaseClient:
         # Create the historic attendance client
         historic_client = DensityClient(self.mongo_database, collections['density'])
 
-        return (node_client, location_client, attendance_client, historic_client)
+        # Create the node event client, older login files don't name the collection.
+        node_event_client = NodeEventClient(self.mongo_database, collections.get('nodeEvents', 'nodeEvents'))
+
+        # Create the client holding the incremental squash's watermark and buckets.
+        squash_state_client = SquashStateClient(self.mongo_database, collections.get('squashState', 'squashState'), collections.get('squashBuckets', 'squashBuckets'))
+
+        # Create the client holding the density rollups, a collection per tier.
+        rollup_client = RollupClient(self.mongo_database, collections)
+
+        # Create the client holding every device's profile, for the suspicion rules.
+        device_profile_client = DeviceProfileClient(self.mongo_database, collections.get('deviceProfiles', 'deviceProfiles'))
+
+        # Create the client holding the filter of suspicious devices the nodes drop.
+        suspicious_filter_client = SuspiciousFilterClient(self.mongo_database, collections.get('suspiciousFilters', 'suspiciousFilters'), collections.get('suspiciousDevices', 'suspiciousDevices'))
+
+        return (node_client, location_client, attendance_client, historic_client, node_event_client, squash_state_client, rollup_client, device_profile_client, suspicious_filter_client)
     
     def clear_clients(self):
         """ 
@@ -97,7 +120,60 @@ class DatabaseClient:
             collection = self.mongo_database[collection_name]
             collection.delete_many({})
 
-    def convert_attendance_to_historic(self, sus_options: dict, strength_options: dict, estimation_options: dict, push_to_db: bool = False, clear_db: bool = False) -> list[Density]:
+    def get_rollup_client(self, push_to_db: bool, squash_options: dict):
+        """ 
+        :fn: get_rollup_client
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Whether the squash should roll up what it reads.
+        :param push_to_db: Are the density records being put into the database?
+        :param squash_options: How to squash, see "data/server/squashConfig.json"
+        :return: Returns the rollup client, or None if there are no rollups.
+        """
+        if push_to_db and squash_options.get('rollups', False):
+            return self.rollup_client
+        return None
+
+    def get_profile_client(self, push_to_db: bool, squash_options: dict):
+        """ 
+        :fn: get_profile_client
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Whether the squash should judge suspicion from the device profiles.
+        :param push_to_db: Are the density records being put into the database?
+        :param squash_options: How to squash, see "data/server/squashConfig.json"
+        :return: Returns the device profile client, or None if suspicion is judged from the attendance read.
+        """
+        if push_to_db and squash_options.get('profiles', False):
+            return self.device_profile_client
+        return None
+
+    def publish_suspicious_filter(self, sus_options: dict, squash_options: dict) -> int | None:
+        """ 
+        :fn: publish_suspicious_filter
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Publishes the devices the device profiles find suspicious now, for the nodes to drop.
+        :param sus_options: Factors for suspicion
+        :param squash_options: How to squash, see "data/server/squashConfig.json"
+        :return: Returns the version the nodes should have, or None if no filter is published.
+        """
+        if not squash_options.get('filter', False):
+            return None
+
+        # Only the profiles know what is suspicious beyond the attendance a squash read.
+        profile_client = self.get_profile_client(True, squash_options)
+        if profile_client is None:
+            from colorama import Fore, Style
+            print(f"{Fore.YELLOW}Warning: The suspicious device filter is made from the device profiles, set \"profiles\" as well as \"filter\".{Style.RESET_ALL}")
+            return None
+
+        suspicious_macs = profile_client.get_current_suspicious(sus_options)
+        version, listed = self.suspicious_filter_client.publish(suspicious_macs, float(squash_options.get('filter_error_rate', 0.001)), float(squash_options.get('filter_keep_days', 7)))
+        print(f"Suspicious device filter version {version} holds {listed} devices, {len(suspicious_macs)} found suspicious now.")
+        return version
+
+    def convert_attendance_to_historic(self, sus_options: dict, strength_options: dict, estimation_options: dict, push_to_db: bool = False, clear_db: bool = False, squash_options: dict = None) -> list[Density]:
         """ 
         :fn: convert_attendance_to_historic
         :date: 05/09/2025
@@ -107,19 +183,84 @@ class DatabaseClient:
         :param strength_options: Factor for strength
         :param push_to_db: Do we put the database elements into the database?
         :param clear_db: Do we clear the attendance database?
+        :param squash_options: How to squash, see "data/server/squashConfig.json", a full squash if None.
         :return: Returns the list of vaues gained from the function. 
         """
+        squash_options = dict() if squash_options is None else squash_options
+
         # Get list of nodes
         full_nodes = self.node_client.get(Node)
 
-        # Get the squashed data.
-        squashed = self.attendance_client.squash(full_nodes, sus_options, strength_options, estimation_options)
+        # Only read what was inserted since the last run.
+        if squash_options.get('incremental', False):
+            return self.convert_new_attendance_to_historic(full_nodes, sus_options, strength_options, estimation_options, push_to_db, clear_db, squash_options)
+
+        # Rollups are only written along with the density records.
+        rollup_client = self.get_rollup_client(push_to_db, squash_options)
+        profile_client = self.get_profile_client(push_to_db, squash_options)
+
+        # Get the squashed data, grouped by MongoDB or by us.
+        engine = squash_options.get('engine', 'python')
+        if engine == "aggregation":
+            squashed = self.attendance_client.aggregate_squash(full_nodes, sus_options, strength_options, estimation_options, rollup_client=rollup_client, profile_client=profile_client)
+        elif engine == "numpy":
+            squashed = self.attendance_client.numpy_squash(full_nodes, sus_options, strength_options, estimation_options, rollup_client, profile_client)
+        elif engine == "partitioned":
+            from src.database.NodeSquash import NodeSquash
+
+            workers = squash_options.get('workers')
+            squasher = NodeSquash(self.login_file, None if workers is None else int(workers))
+            squashed = squasher.squash(self.attendance_client, full_nodes, sus_options, strength_options, estimation_options, rollup_client, profile_client)
+        else:
+            squashed = self.attendance_client.squash(full_nodes, sus_options, strength_options, estimation_options, rollup_client, profile_client)
 
         # Convert the squashed data to Historic Data client
         if push_to_db:
             self.historic_client.insert_many(squashed)
+            self.publish_suspicious_filter(sus_options, squash_options)
 
         if clear_db:
             self.attendance_client.clear()
         
-        return squashed
\ No newline at end of file
+        return squashed
+
+    def convert_new_attendance_to_historic(self, full_nodes: list[Node], sus_options: dict, strength_options: dict, estimation_options: dict, push_to_db: bool, clear_db: bool, squash_options: dict) -> list[Density]:
+        """ 
+        :fn: convert_new_attendance_to_historic
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts the attendance stored since the last run to historic data, only rewriting the 30 minutes it falls in.
+        :param full_nodes: A list of all nodes.
+        :param sus_options: Factors for suspicion
+        :param strength_options: Factor for strength
+        :param push_to_db: Do we put the database elements (and the new watermark) into the database?
+        :param clear_db: Do we clear the attendance that was read?
+        :param squash_options: How to squash, see "data/server/squashConfig.json"
+        :return: Returns the density records of the buckets that changed.
+        """
+        squashed, buckets, cutoff, read_ids, documents = self.attendance_client.incremental_squash(
+            full_nodes, sus_options, strength_options, estimation_options, self.squash_state_client,
+            lookback_buckets=int(squash_options.get('lookback_buckets', 96)),
+            chunk_documents=int(squash_options.get('chunk_documents', 50000)),
+            engine=str(squash_options.get('engine', 'python')),
+            rollup_client=self.get_rollup_client(push_to_db, squash_options),
+            profile_client=self.get_profile_client(push_to_db, squash_options),
+            settle_seconds=float(squash_options.get('settle_seconds', 5))
+        )
+
+        # Nothing new since the last run.
+        if documents == 0:
+            return squashed
+
+        if push_to_db:
+            # The watermark moves last, so a crash means reading the same documents again instead of missing them.
+            self.squash_state_client.save_buckets(buckets)
+            self.historic_client.upsert_many(squashed)
+            self.squash_state_client.set_watermark("attendance", cutoff, documents)
+            self.publish_suspicious_filter(sus_options, squash_options)
+
+            # Only what was read, anything stored since is squashed next time.
+            if clear_db:
+                self.attendance_client.clear_read(read_ids, cutoff)
+
+        return squashed
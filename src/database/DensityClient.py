@@ -4,8 +4,11 @@
 :brief: This module defines all important functions for interacting with the external database.
 """
 from src.structures.density import Density
+from src.structures.hyperLogLog import HyperLogLog
 from src.database.ProtoClient import ClientDB as ProtoClient
 from pymongo import MongoClient
+from bson.objectid import ObjectId as ObjectID
+from datetime import datetime
 
 class DensityDB(ProtoClient):
     """
@@ -68,14 +71,96 @@ class DensityDB(ProtoClient):
             return
 
         
-        history = [ 0 ] * history_len
-        
-        # For each record
+        # Serialised as they are encoded, in unordered chunks so one bad record doesn't stop the rest.
+        documents = (density.serialise() for density in attendence_history)
+        self.report_ingest(self.bulk_ingest(documents), history_len)
+
+    def upsert_many(self, history: list[Density]):
+        """ 
+        :fn: upsert_many
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes density records, replacing any record already stored for the same node and 30 minutes.
+        :param history: The density records, e.g. the buckets an incremental squash changed.
+        """
+        from pymongo import ReplaceOne
+
+        if len(history) < 1:
+            return
+
+        requests = [ 0 ] * len(history)
         i = 0
-        while i < history_len:
-            attendance = attendence_history[i]
-            history[i] = attendance.serialise()
+        for density in history:
+            data = density.serialise()
+            requests[i] = ReplaceOne({ "node_id": data["node_id"], "date_time": data["date_time"] }, data, upsert=True)
             i += 1
-        
-        # Insert all into the list 
-        self.collection.insert_many(history)
+
+        # Order doesn't matter, each record is its own node and time.
+        self.collection.bulk_write(requests, ordered=False)
+
+    def insert_documents(self, documents: list[dict]):
+        """ 
+        :fn: insert_documents
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts already serialised density records, e.g. from the ingest gateway.
+        :param documents: The serialised density records.
+        """
+        if len(documents) < 1:
+            return
+
+        # Unordered, so one bad document doesn't stop the rest.
+        self.report_ingest(self.bulk_ingest(documents), len(documents))
+
+    def get_device_sketch(self, start: datetime, end: datetime, location_id: str = None, node_ids: list[str] = None) -> HyperLogLog:
+        """
+        :fn: get_device_sketch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Merges the device sketches of the density records in a time range, only the newest sketch of each node's 30 minutes is read.
+        :param start: The first time included.
+        :param end: The time the range stops before.
+        :param location_id: Only records of this location, every location if None.
+        :param node_ids: Only records of these nodes, every node if None.
+        :return: Returns one sketch of every device seen, it is empty if no record had a sketch.
+        """
+        query = { "date_time": { "$gte": start, "$lt": end }, "device_sketch": { "$exists": True } }
+        if location_id is not None:
+            query["location_id"] = ObjectID(location_id)
+        if node_ids is not None:
+            query["node_id"] = { "$in": [ ObjectID(node_id) for node_id in node_ids ] }
+
+        # BleSniffer nodes store the 30 minutes so far every scan, each holds the ones before it so only the newest is needed.
+        newest = dict()
+        for document in self.collection.find(query, { "node_id": 1, "date_time": 1 }):
+            key = (document.get("node_id"), Density.roundToLast30Minutes(document["date_time"]))
+            kept = newest.get(key)
+            if kept is None or document["date_time"] > kept[0]:
+                newest[key] = (document["date_time"], document["_id"])
+
+        # Union every sketch, a device seen by several nodes or in several periods is still counted once.
+        merged = None
+        for document in self.collection.find({ "_id": { "$in": [ kept[1] for kept in newest.values() ] } }, { "device_sketch": 1, "_id": 0 }):
+            sketch = HyperLogLog()
+            sketch.deserialise(document["device_sketch"])
+
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+
+        return HyperLogLog() if merged is None else merged
+
+    def count_unique_devices(self, start: datetime, end: datetime, location_id: str = None, node_ids: list[str] = None) -> int:
+        """
+        :fn: count_unique_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Estimates how many distinct devices were seen in a time range, e.g. in a building over a week.
+        :param start: The first time included.
+        :param end: The time the range stops before.
+        :param location_id: Only records of this location, every location if None.
+        :param node_ids: Only records of these nodes, every node if None.
+        :return: Returns the estimated number of distinct devices.
+        """
+        return self.get_device_sketch(start, end, location_id, node_ids).count()
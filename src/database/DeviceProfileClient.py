@@ -0,0 +1,274 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module keeps a profile of every device seen, updated with only the new attendance, so the suspicion rules don't need the raw attendance.
+"""
+from src.database.ProtoClient import ClientDB as ProtoClient
+from pymongo import MongoClient
+from datetime import datetime, timedelta
+
+class DeviceProfileDB(ProtoClient):
+    """
+    :class: DeviceProfileDB
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class handles the device profiles, one document per hashed device holding which 30 minutes of each day it was seen in.
+    """
+    def __init__(self, db_client: MongoClient, collection: str):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Initializes the DeviceProfileDB with a database client
+        :param db_client: The database client to use for operations.
+        :param collection: The name of the collection holding the profiles.
+        """
+        # We will store a copy of the client information, for use when we need access to information
+        self.db_client = db_client
+
+        # One document per device, keyed by its device id.
+        self.collection = self.db_client[collection]
+
+    def get_day(self, timestamp: datetime) -> str:
+        """
+        :fn: get_day
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The key of a day in a profile.
+        :param timestamp: Any time in the day.
+        :return: Returns the day as "YYYYMMDD"
+        """
+        return timestamp.strftime("%Y%m%d")
+
+    def get_fold_key(self, fold: dict) -> str:
+        """
+        :fn: get_fold_key
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The key of a read in a profile's "folded", the same for every try at the read.
+        :param fold: Which read, see AttendanceDB.fold_into_buckets()
+        :return: Returns a hex string, safe as a field name.
+        """
+        from bson import encode as bson_encode
+        from hashlib import md5
+
+        return md5(bson_encode(fold)).hexdigest()
+
+    def observe(self, freq: dict, fold: dict = None) -> set:
+        """
+        :fn: observe
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds new attendance to the profiles, a bucket seen again doesn't count twice.
+        :param freq: The new attendance's frequencies, timestamp->device->(first, last, packets) from get_frequencies()
+        :param fold: Which read the attendance came from, its packets are remembered so revert() can take them back out. See AttendanceDB.fold_into_buckets()
+        :return: Returns the device ids whose profiles changed.
+        """
+        from pymongo import UpdateOne
+
+        fold_key = None if fold is None else self.get_fold_key(fold)
+
+        # Everything one device gets this run, so each profile is written once.
+        updates = dict()
+        for timestamp, devices in freq.items():
+            day = self.get_day(timestamp)
+            slot = timestamp.hour * 2 + timestamp.minute // 30
+
+            for device_id, tpl in devices.items():
+                update = updates.get(device_id)
+                if update is None:
+                    update = updates[device_id] = { "$addToSet": dict(), "$min": { "first_seen": tpl[0] }, "$max": { "last_seen": tpl[1] }, "$inc": { "total_packets": 0 } }
+
+                # The 30 minutes of the day it was seen in.
+                slots = update["$addToSet"].setdefault(f"days.{day}.slots", { "$each": [] })["$each"]
+                if slot not in slots:
+                    slots.append(slot)
+
+                earliest, latest = f"days.{day}.earliest", f"days.{day}.latest"
+                update["$min"][earliest] = min(update["$min"].get(earliest, 24), tpl[0].hour)
+                update["$max"][latest] = max(update["$max"].get(latest, -1), tpl[1].hour)
+                update["$min"]["first_seen"] = min(update["$min"]["first_seen"], tpl[0])
+                update["$max"]["last_seen"] = max(update["$max"]["last_seen"], tpl[1])
+
+                packets = f"days.{day}.packets"
+                update["$inc"][packets] = update["$inc"].get(packets, 0) + int(tpl[2])
+                update["$inc"]["total_packets"] += int(tpl[2])
+
+                # Kept per read, the older reads' are dropped by refresh()
+                if fold_key is not None:
+                    update["$set"] = { "folded_from": fold }
+                    folded = f"folded.{fold_key}.{day}"
+                    update["$inc"][folded] = update["$inc"].get(folded, 0) + int(tpl[2])
+
+        if not updates:
+            return set()
+
+        requests = [ UpdateOne({ "_id": device_id }, update, upsert=True) for device_id, update in updates.items() ]
+        self.collection.bulk_write(requests, ordered=False)
+        return set(updates)
+
+    def refresh(self, device_ids: set, horizon_days: int, reference: datetime, chunk_devices: int = 10000):
+        """
+        :fn: refresh
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Works out the fields the suspicion rules query from the days within the horizon, and drops older days.
+        :param device_ids: The devices whose profiles changed.
+        :param horizon_days: How many days, up to the reference's, the rules look at.
+        :param reference: The newest attendance, the horizon ends on its day.
+        :param chunk_devices: The most profiles read at once.
+        """
+        from pymongo import UpdateOne
+
+        oldest_day = self.get_day(reference - timedelta(days=horizon_days - 1))
+        reference_day = self.get_day(reference)
+
+        device_ids = list(device_ids)
+        start = 0
+        while start < len(device_ids):
+            chunk = device_ids[start:start + chunk_devices]
+            start += chunk_devices
+
+            requests = []
+            for profile in self.collection.find({ "_id": { "$in": chunk } }, { "days": 1, "folded_from": 1, "folded": 1 }):
+                buckets_seen = 0
+                earliest_hour = 24
+                latest_hour = -1
+                stale = dict()
+
+                # Day keys sort the same as the days.
+                for day, seen in profile.get("days", dict()).items():
+                    if day < oldest_day:
+                        stale[f"days.{day}"] = ""
+                        continue
+                    buckets_seen += len(seen.get("slots", []))
+                    earliest_hour = min(earliest_hour, seen.get("earliest", 24))
+                    latest_hour = max(latest_hour, seen.get("latest", -1))
+
+                # Only the latest read could still be taken back out.
+                fold_key = None if profile.get("folded_from") is None else self.get_fold_key(profile["folded_from"])
+                for key in profile.get("folded", dict()):
+                    if key != fold_key:
+                        stale[f"folded.{key}"] = ""
+
+                update = { "$set": { "buckets_seen": buckets_seen, "earliest_hour": earliest_hour, "latest_hour": latest_hour, "refreshed_day": reference_day } }
+                if stale:
+                    update["$unset"] = stale
+                requests.append(UpdateOne({ "_id": profile["_id"] }, update))
+
+            if requests:
+                self.collection.bulk_write(requests, ordered=False)
+
+    def revert(self, fold: dict) -> int:
+        """
+        :fn: revert
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Takes the packets a read added back out of the profiles, done before the same read is squashed again after a crash.
+                The slots and times are left, the read finds them again.
+        :param fold: Which read, see AttendanceDB.fold_into_buckets()
+        :return: Returns how many profiles were changed.
+        """
+        from pymongo import UpdateOne
+
+        fold_key = self.get_fold_key(fold)
+
+        requests = []
+        for profile in self.collection.find({ "folded_from": fold }, { "days": 1, f"folded.{fold_key}": 1 }):
+            days = profile.get("days", dict())
+            packets = dict()
+            total = 0
+            for day, count in profile.get("folded", dict()).get(fold_key, dict()).items():
+                # A day already dropped from the profile has nothing to take them from.
+                if day in days:
+                    packets[f"days.{day}.packets"] = -count
+                total += count
+            packets["total_packets"] = -total
+
+            requests.append(UpdateOne({ "_id": profile["_id"] }, { "$inc": packets, "$unset": { "folded_from": "", "folded": "" } }))
+
+        if requests:
+            self.collection.bulk_write(requests, ordered=False)
+        return len(requests)
+
+    def get_suspicious(self, options: dict, since: datetime) -> set:
+        """
+        :fn: get_suspicious
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Evaluates the suspicion rules against the profiles, each rule is an indexed query.
+        :param options: The option for suspicious macs
+        :param since: Only devices seen since this time.
+        :return: Returns the set of suspicious device ids.
+        """
+        query = {
+            "last_seen": { "$gte": since },
+            "$or": [
+                { "buckets_seen": { "$gt": int(options['timestamp_occurances']) } },
+                { "earliest_hour": { "$lt": int(options['time']['earliest']) } },
+                { "latest_hour": { "$gt": int(options['time']['latest']) } }
+            ]
+        }
+        return { profile["_id"] for profile in self.collection.find(query, { "_id": 1 }) }
+
+    def evaluate(self, device_ids: set, options: dict, reference: datetime) -> set:
+        """
+        :fn: evaluate
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Refreshes the profiles that changed, and those last refreshed on an earlier day whose oldest days have left the horizon since,
+                then gets every suspicious device within the horizon.
+        :param device_ids: The devices observe() changed.
+        :param options: The option for suspicious macs, "profile_days" is the horizon.
+        :param reference: The newest attendance squashed.
+        :return: Returns the set of suspicious device ids.
+        """
+        horizon_days = int(options.get('profile_days', 2))
+        since = self.get_horizon_start(horizon_days, reference)
+
+        # A device not seen today still has the days that just left the horizon counted, until it is refreshed.
+        stale = self.get_stale(since, self.get_day(reference)) - set(device_ids)
+
+        self.refresh(set(device_ids) | stale, horizon_days, reference)
+        return self.get_suspicious(options, since)
+
+    def get_stale(self, since: datetime, reference_day: str) -> set:
+        """
+        :fn: get_stale
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The profiles within the horizon that were last refreshed before the reference's day.
+        :param since: The start of the horizon.
+        :param reference_day: The reference's day, from get_day()
+        :return: Returns their device ids.
+        """
+        query = { "last_seen": { "$gte": since }, "$or": [ { "refreshed_day": { "$lt": reference_day } }, { "refreshed_day": { "$exists": False } } ] }
+        return { profile["_id"] for profile in self.collection.find(query, { "_id": 1 }) }
+
+    def get_horizon_start(self, horizon_days: int, reference: datetime) -> datetime:
+        """
+        :fn: get_horizon_start
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The start of the first day the suspicion rules look at.
+        :param horizon_days: How many days, up to the reference's, the rules look at.
+        :param reference: The newest attendance squashed.
+        :return: Returns midnight of the first day.
+        """
+        return datetime(reference.year, reference.month, reference.day) - timedelta(days=horizon_days - 1)
+
+    def get_current_suspicious(self, options: dict) -> set:
+        """
+        :fn: get_current_suspicious
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets every suspicious device within the horizon of the newest profile, without refreshing any.
+        :param options: The option for suspicious macs, "profile_days" is the horizon.
+        :return: Returns the set of suspicious device ids.
+        """
+        newest = self.collection.find_one({}, { "last_seen": 1 }, sort=[ ("last_seen", -1) ])
+        if newest is None:
+            return set()
+
+        horizon_days = int(options.get('profile_days', 2))
+        return self.get_suspicious(options, self.get_horizon_start(horizon_days, newest["last_seen"]))
@@ -0,0 +1,75 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module defines all important functions for interacting with the external database.
+"""
+from src.structures.nodeEvent import NodeEvent
+from src.database.ProtoClient import ClientDB as ProtoClient
+from pymongo import MongoClient
+from bson.objectid import ObjectId as ObjectID
+
+class NodeEventDB(ProtoClient):
+    """
+    :class: NodeEventDB
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class handles interactions with the database for node events, the heartbeats and loop metrics each node sends.
+    """
+    def __init__(self, db_client: MongoClient, collection: str):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Initializes the NodeEventDB with a database client
+        :param db_client: The database client to use for operations.
+        :param collection: The name of the collection to use for node events.
+        """
+        # We will store a copy of the client information, for use when we need access to information
+        self.db_client = db_client
+
+        # This is the list of node events.
+        self.collection = self.db_client[collection]
+
+    def insert(self, node_event: NodeEvent):
+        """ 
+        :fn: insert
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts a node event into the database.
+        :param node_event: The structure of the node event we are inserting
+        """
+        # This is the query that we are going to use to find.
+        primary_key_query = { "node_id": node_event.node_id, "date_time": node_event.date_time }
+
+        # Create a new node event document, this will be inserted into the database.
+        self.insert_data(primary_key_query, node_event.serialise())
+
+    def insert_documents(self, documents: list[dict]):
+        """ 
+        :fn: insert_documents
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts already serialised node events, e.g. ones kept in a node's spool while the database was down.
+        :param documents: The serialised node events.
+        """
+        if len(documents) < 1:
+            return
+
+        self.report_ingest(self.bulk_ingest(documents), len(documents))
+
+    def get_latest(self, node_id: str, amount: int = 60) -> list[NodeEvent]:
+        """
+        :fn: get_latest
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets a node's most recent events, e.g. to see which of its stages is falling behind.
+        :param node_id: The node.
+        :param amount: How many events to get.
+        :return: Returns the events, newest first.
+        """
+        events = []
+        for data in self.collection.find({ "node_id": ObjectID(node_id) }).sort("date_time", -1).limit(amount):
+            event = NodeEvent()
+            event.deserialise(data)
+            events.append(event)
+        return events
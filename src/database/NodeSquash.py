@@ -0,0 +1,159 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module squashes the attendance of each node in its own process, only the suspicious devices are worked out across every node.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from src.structures.hyperLogLog import HyperLogLog
+
+def read_node_frequencies(login_file: str, node_id, strength_options: dict, rollup_minutes: int = None) -> tuple:
+    """
+    :fn: read_node_frequencies
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Reads one node's attendance and groups it every 30 minutes, this runs in a worker process.
+    :param login_file: The database login file, each worker has its own connection.
+    :param node_id: The node, as it is stored in the attendance.
+    :param strength_options: Options for including macs if they fit criteria
+    :param rollup_minutes: The length of the finest rollup, the node's devices are grouped by it as well if given.
+    :return: Returns (node_id, timestamp->device->(first, last, packets), timestamps the node has any entry at, rollup node devices or None)
+    """
+    from src.database.Client import DatabaseClient
+    from src.structures.attendanceBatch import AttendanceBatch, from_epoch
+
+    dbclient = DatabaseClient(login_file)
+    attendance_client = dbclient.attendance_client
+
+    entries = AttendanceBatch()
+    entries.deserialise(attendance_client.collection.find({ "node_id": node_id }, { "_id": 0 }))
+
+    # A node with only ignored entries still has a record, like the full squash.
+    present = { from_epoch(bucket * 1800) for bucket in { int(timestamp // 1800) for timestamp in entries.timestamps } }
+
+    rollup_devices = None if rollup_minutes is None else attendance_client.get_node_devices(entries, strength_options, rollup_minutes)
+    return (node_id, attendance_client.get_frequencies(entries, strength_options), present, rollup_devices)
+
+def count_node(node_id, freq: dict, timestamps: list, suspicious_macs: set) -> tuple:
+    """
+    :fn: count_node
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Counts and sketches the unsuspicious devices one node saw, this runs in a worker process.
+    :param node_id: The node.
+    :param freq: The node's frequencies, from read_node_frequencies()
+    :param timestamps: The timestamps the node gets a record at.
+    :param suspicious_macs: The mac addresses we do not trust, worked out from every node.
+    :return: Returns (node_id, timestamp->count, timestamp->HyperLogLog)
+    """
+    counts = dict()
+    sketches = dict()
+    for timestamp in timestamps:
+        devices = set(freq.get(timestamp, ())) - suspicious_macs
+        counts[timestamp] = len(devices)
+
+        # Only sketched if something counted, like get_device_sketches()
+        if devices:
+            sketch = sketches[timestamp] = HyperLogLog()
+            for device_id in devices:
+                sketch.add(device_id)
+
+    return (node_id, counts, sketches)
+
+def merge_frequencies(freqs: list[dict]) -> dict:
+    """
+    :fn: merge_frequencies
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Merges the frequencies of several nodes, into what get_frequencies() gives for all of them.
+    :param freqs: Each node's frequencies.
+    :return: Returns a dictionary of timestamps->hashes
+    """
+    merged = dict()
+    for freq in freqs:
+        for timestamp, devices in freq.items():
+            bucket = merged.get(timestamp)
+            if bucket is None:
+                merged[timestamp] = dict(devices)
+                continue
+
+            for mac_addr, tpl in devices.items():
+                previous = bucket.get(mac_addr)
+                if previous is None:
+                    bucket[mac_addr] = tpl
+                else:
+                    bucket[mac_addr] = (min(tpl[0], previous[0]), max(tpl[1], previous[1]), previous[2] + tpl[2])
+    return merged
+
+class NodeSquash:
+    """
+    :class: NodeSquash
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Squashes each node's attendance in a process pool, every node gets a count of the devices it saw instead of every device seen then.
+    """
+    def __init__(self, login_file: str, workers: int = None):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the squash, the pool is started for each run.
+        :param login_file: The database login file the workers connect with.
+        :param workers: How many processes to use, every core if None.
+        """
+        self.login_file = login_file
+        self.workers = workers if workers is not None else (cpu_count() or 1)
+
+    def squash(self, attendance_client, full_nodes: list, sus_options: dict, strength_options: dict, estimation_options: dict, rollup_client = None, profile_client = None) -> list:
+        """
+        :fn: squash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Squashes every node in parallel.
+        :param attendance_client: The attendance client, for the node ids and making the records.
+        :param full_nodes: A list of all nodes.
+        :param sus_options: The option for suspicious macs
+        :param strength_options: Options for including macs if they fit criteria
+        :param estimation_options: Options for estimating people from devices.
+        :param rollup_client: A RollupDB to add the attendance to, no rollups if None.
+        :param profile_client: A DeviceProfileDB to judge suspicion with, only this attendance is looked at if None.
+        :return: Returns an array of "Density" instances.
+        """
+        node_ids = attendance_client.collection.distinct("node_id")
+        if len(node_ids) < 1:
+            return []
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(node_ids))) as pool:
+            # Each node is read and grouped on its own.
+            rollup_minutes = None if rollup_client is None else rollup_client.base_minutes
+            futures = [ pool.submit(read_node_frequencies, self.login_file, node_id, strength_options, rollup_minutes) for node_id in node_ids ]
+            node_freqs = [ future.result() for future in futures ]
+
+            # Suspicion is about the device, so it is the only thing worked out from every node.
+            freq = merge_frequencies([ node_freq for _, node_freq, _, _ in node_freqs ])
+            suspicious_macs = attendance_client.find_suspicious_macs(sus_options, freq, profile_client)
+            print('Suspicious macs:', [mac for mac in suspicious_macs])
+
+            # Records are made for the same nodes and timestamps as the full squash.
+            futures = [
+                pool.submit(count_node, node_id, node_freq, [ timestamp for timestamp in present if timestamp in freq ], suspicious_macs)
+                for node_id, node_freq, present, _ in node_freqs
+            ]
+
+            nodes = dict()
+            sketches = dict()
+            for future in futures:
+                node_id, counts, node_sketches = future.result()
+                nodes[node_id] = counts
+                sketches[node_id] = node_sketches
+
+        # Each node's devices are its own, so they are only put together.
+        if rollup_client is not None:
+            rollup_devices = dict()
+            for _, _, _, node_rollup_devices in node_freqs:
+                for timestamp, node_devices in node_rollup_devices.items():
+                    rollup_devices.setdefault(timestamp, dict()).update(node_devices)
+            attendance_client.roll_up(rollup_client, rollup_devices, suspicious_macs, full_nodes, estimation_options)
+
+        return attendance_client.convert_mac_accesses_to_history(full_nodes, nodes, estimation_options, sketches)
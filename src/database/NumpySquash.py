@@ -0,0 +1,226 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module squashes attendance with NumPy, working on the columns of an AttendanceBatch instead of one record at a time.
+"""
+import numpy as np
+
+from src.structures.attendanceBatch import AttendanceBatch, STRENGTH_NONE, from_epoch
+from src.structures.hyperLogLog import HyperLogLog
+from src.structures.PacketType import PacketType
+
+# The length of a bucket, in seconds.
+BUCKET_SECONDS = 1800
+
+def get_counted_mask(strengths: np.ndarray, packet_types: np.ndarray, strength_options: dict) -> np.ndarray:
+    """
+    :fn: get_counted_mask
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Which records should_ignore_strength() would keep.
+    :param strengths: The strength column.
+    :param packet_types: The packet type column.
+    :param strength_options: Options for including macs if they fit criteria
+    :return: Returns a boolean mask of the records that count.
+    """
+    # Wi-Fi has its own bound, everything else uses bluetooth's.
+    minimum = np.where(
+        packet_types == PacketType.WIFI.value,
+        int(strength_options['wifi']['lowest']),
+        int(strength_options['bluetooth']['lowest'])
+    )
+
+    has_strength = strengths != STRENGTH_NONE
+    return np.where(has_strength, strengths >= minimum, bool(strength_options['include_null']))
+
+def group_by(keys: np.ndarray) -> tuple:
+    """
+    :fn: group_by
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Sorts records by a key, so each group can be reduced with ufunc.reduceat()
+    :param keys: One integer key per record.
+    :return: Returns (order, the start of each group in that order, each group's key)
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([ True ], sorted_keys[1:] != sorted_keys[:-1])))
+    return (order, starts, sorted_keys[starts])
+
+def get_hours(seconds: np.ndarray) -> np.ndarray:
+    """
+    :fn: get_hours
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: The hour of the day of each time, the same hour from_epoch(seconds).hour gives.
+    :param seconds: Seconds since the epoch.
+    :return: Returns the hours.
+    """
+    # Rounded to microseconds first, like from_epoch() does.
+    microseconds = np.round(seconds * 1000000).astype(np.int64)
+    return (microseconds // 3600000000) % 24
+
+def squash_batch(entries: AttendanceBatch, sus_options: dict, strength_options: dict, profile_client = None) -> tuple:
+    """
+    :fn: squash_batch
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Counts the unsuspicious devices of every node every 30 minutes, the same counts AttendanceDB.squash() makes.
+    :param entries: The attendance.
+    :param sus_options: The option for suspicious macs
+    :param strength_options: Options for including macs if they fit criteria
+    :param profile_client: A DeviceProfileDB to judge suspicion with, only this attendance is looked at if None.
+    :return: Returns (node_id->timestamp->count, node_id->timestamp->HyperLogLog, the suspicious macs)
+    """
+    if len(entries) == 0:
+        return (dict(), dict(), set())
+
+    # The batch's arrays are used in place, nothing is copied.
+    timestamps = np.frombuffer(entries.timestamps, dtype=np.float64)
+    strengths = np.frombuffer(entries.strengths, dtype=np.int32)
+    packet_types = np.frombuffer(entries.packet_types, dtype=np.uint8)
+    first_seen = np.frombuffer(entries.first_seen, dtype=np.float64)
+    last_seen = np.frombuffer(entries.last_seen, dtype=np.float64)
+    node_index = np.frombuffer(entries.node_index, dtype=np.uint32).astype(np.int64)
+    device_index = np.frombuffer(entries.device_index, dtype=np.uint32).astype(np.int64)
+
+    device_total = len(entries.device_ids)
+    node_total = len(entries.node_ids)
+
+    # Buckets are counted from the first, so the keys stay small.
+    buckets = np.floor_divide(timestamps, BUCKET_SECONDS).astype(np.int64)
+    first_bucket = buckets.min()
+    buckets -= first_bucket
+    bucket_total = int(buckets.max()) + 1
+
+    counted = get_counted_mask(strengths, packet_types, strength_options)
+
+    # Nothing counts, so there are no buckets to give records for.
+    if not counted.any():
+        return (dict(), dict(), set())
+
+    # Each device in each bucket, from the records that count.
+    pair_keys = buckets[counted] * device_total + device_index[counted]
+    order, starts, keys = group_by(pair_keys)
+    pair_bucket = keys // device_total
+    pair_device = keys % device_total
+    pair_first = np.minimum.reduceat(first_seen[counted][order], starts)
+    pair_last = np.maximum.reduceat(last_seen[counted][order], starts)
+
+    if profile_client is None:
+        # A device in too many buckets, or seen too early or late, is suspicious.
+        time_early = int(sus_options['time']['earliest'])
+        time_late = int(sus_options['time']['latest'])
+        max_timestamp_occurances = int(sus_options['timestamp_occurances'])
+
+        suspicious = np.bincount(pair_device, minlength=device_total) > max_timestamp_occurances
+        out_of_hours = (get_hours(pair_first) < time_early) | (get_hours(pair_last) > time_late)
+        suspicious[pair_device[out_of_hours]] = True
+    else:
+        # The profiles only need one row per bucket and device.
+        pair_packets = np.add.reduceat(np.frombuffer(entries.packet_counts, dtype=np.uint32)[counted][order].astype(np.int64), starts)
+        freq = get_pair_frequencies(entries, pair_bucket + first_bucket, pair_device, pair_first, pair_last, pair_packets)
+        suspicious_ids = profile_client.evaluate(profile_client.observe(freq), sus_options, max(freq))
+
+        suspicious = np.zeros(device_total, dtype=bool)
+        for device_id in suspicious_ids:
+            device = entries.device_lookup.get(device_id)
+            if device is not None:
+                suspicious[device] = True
+
+    # The unsuspicious devices of each bucket, every node in the bucket gets the same count like squash() gives.
+    trusted = ~suspicious[pair_device]
+    totals = np.bincount(pair_bucket[trusted], minlength=bucket_total)
+    has_entries = np.bincount(pair_bucket, minlength=bucket_total) > 0
+
+    # Every node with an entry in a bucket, counted or not.
+    presence = np.unique(buckets * node_total + node_index)
+    presence_bucket = presence // node_total
+    presence_node = presence % node_total
+
+    timestamps_of = dict()
+    nodes = dict()
+    for bucket, node in zip(presence_bucket.tolist(), presence_node.tolist()):
+        if not has_entries[bucket]:
+            continue
+        timestamp = timestamps_of.get(bucket)
+        if timestamp is None:
+            timestamp = timestamps_of[bucket] = from_epoch((bucket + int(first_bucket)) * BUCKET_SECONDS)
+        nodes.setdefault(entries.node_ids[node], dict())[timestamp] = int(totals[bucket])
+
+    sketches = get_sketches(entries, buckets[counted], node_index[counted], device_index[counted], suspicious, int(first_bucket), timestamps_of)
+    suspicious_macs = { entries.device_ids[device] for device in np.flatnonzero(suspicious).tolist() }
+    return (nodes, sketches, suspicious_macs)
+
+def get_pair_frequencies(entries: AttendanceBatch, pair_bucket: np.ndarray, pair_device: np.ndarray, pair_first: np.ndarray, pair_last: np.ndarray, pair_packets: np.ndarray) -> dict:
+    """
+    :fn: get_pair_frequencies
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Turns the grouped bucket and device rows back into what AttendanceDB.get_frequencies() gives.
+    :param entries: The attendance, for its device ids.
+    :param pair_bucket: The bucket of each row, in buckets since the epoch.
+    :param pair_device: The device of each row.
+    :param pair_first: When each row's device was first seen, in seconds.
+    :param pair_last: When each row's device was last seen, in seconds.
+    :param pair_packets: How many packets each row holds.
+    :return: Returns a dictionary of timestamps->hashes
+    """
+    freq = dict()
+    timestamps_of = dict()
+    for bucket, device, first, last, packets in zip(pair_bucket.tolist(), pair_device.tolist(), pair_first.tolist(), pair_last.tolist(), pair_packets.tolist()):
+        timestamp = timestamps_of.get(bucket)
+        if timestamp is None:
+            timestamp = timestamps_of[bucket] = from_epoch(bucket * BUCKET_SECONDS)
+            freq[timestamp] = dict()
+        freq[timestamp][entries.device_ids[device]] = (from_epoch(first), from_epoch(last), packets)
+    return freq
+
+def get_sketches(entries: AttendanceBatch, buckets: np.ndarray, node_index: np.ndarray, device_index: np.ndarray, suspicious: np.ndarray, first_bucket: int, timestamps_of: dict) -> dict:
+    """
+    :fn: get_sketches
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Sketches the unsuspicious devices each node saw every 30 minutes, each device is only hashed once.
+    :param entries: The attendance, for its node and device ids.
+    :param buckets: The bucket of each counted record, from the first bucket.
+    :param node_index: The node of each counted record.
+    :param device_index: The device of each counted record.
+    :param suspicious: Whether each device is suspicious.
+    :param first_bucket: The first bucket, in buckets since the epoch.
+    :param timestamps_of: bucket -> timestamp, added to as needed.
+    :return: Returns a dictionary of node_id->timestamp->HyperLogLog
+    """
+    sketches = dict()
+
+    trusted = ~suspicious[device_index]
+    if not trusted.any():
+        return sketches
+
+    # Where each device lands in a sketch.
+    template = HyperLogLog()
+    positions = np.array([ template.position(device_id) for device_id in entries.device_ids ], dtype=np.int64).reshape(-1, 2)
+    registers, ranks = positions[:, 0], positions[:, 1].astype(np.uint8)
+
+    # One group per node and bucket.
+    node_total = len(entries.node_ids)
+    order, starts, keys = group_by(buckets[trusted] * node_total + node_index[trusted])
+    devices = device_index[trusted][order]
+    ends = np.append(starts[1:], len(devices))
+
+    for key, start, end in zip(keys.tolist(), starts.tolist(), ends.tolist()):
+        bucket, node = divmod(key, node_total)
+        group = devices[start:end]
+
+        sketch_registers = np.zeros(template.register_count, dtype=np.uint8)
+        np.maximum.at(sketch_registers, registers[group], ranks[group])
+
+        sketch = HyperLogLog(template.precision)
+        sketch.registers = bytearray(sketch_registers.tobytes())
+
+        timestamp = timestamps_of.get(bucket)
+        if timestamp is None:
+            timestamp = timestamps_of[bucket] = from_epoch((bucket + first_bucket) * BUCKET_SECONDS)
+        sketches.setdefault(entries.node_ids[node], dict())[timestamp] = sketch
+
+    return sketches
@@ -3,6 +3,11 @@
 :date: 22/08/2025
 :brief: This module defines how a client should interact with the database
 """
+from bson import encode as bson_encode
+from bson.raw_bson import RawBSONDocument
+
+# Write errors that will fail the same way again: duplicate key, bad value, document too large and failed validation.
+PERMANENT_WRITE_ERRORS = { 2, 121, 10334, 11000 }
 
 class ClientDB:
     """
@@ -27,6 +32,146 @@ class ClientDB:
         # Create a new node document, this will be inserted into the database.
         self.collection.insert_one(data)
 
+    def encode_chunks(self, documents, chunk_bytes: int = 4 * 1024 * 1024, chunk_documents: int = 10000):
+        """
+        :fn: encode_chunks
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Encodes documents to BSON as they come, handing them over in chunks so only one chunk is held at a time.
+        :param documents: Any iterable of documents, e.g. a generator.
+        :param chunk_bytes: The most encoded bytes in one chunk.
+        :param chunk_documents: The most documents in one chunk.
+        :return: Yields lists of RawBSONDocument
+        """
+        chunk = []
+        size = 0
+        for document in documents:
+            encoded = bson_encode(document)
+
+            # Start a new chunk if this document won't fit.
+            if chunk and (size + len(encoded) > chunk_bytes or len(chunk) >= chunk_documents):
+                yield chunk
+                chunk = []
+                size = 0
+
+            chunk.append(RawBSONDocument(encoded))
+            size += len(encoded)
+
+        if chunk:
+            yield chunk
+
+    def write_chunk(self, chunk: list, retries: int = 3) -> tuple:
+        """
+        :fn: write_chunk
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts one chunk unordered, trying again with only the documents that failed for a reason that might go away.
+        :param chunk: The encoded documents.
+        :param retries: How many more times failed documents are sent.
+        :return: Returns (inserted, failed)
+        """
+        from pymongo.errors import BulkWriteError
+        from colorama import Fore, Style
+        from time import sleep as time_sleep
+
+        inserted = 0
+        failed = 0
+        attempt = 0
+        while chunk:
+            # Wait a little longer before each retry.
+            if attempt > 0:
+                time_sleep(0.5 * 2 ** (attempt - 1))
+
+            try:
+                # Nothing failed, so the whole chunk is what was inserted.
+                self.insert_chunk(chunk)
+                return (inserted + len(chunk), failed)
+            except BulkWriteError as e:
+                details = e.details
+                inserted += details.get('nInserted', 0) + details.get('nUpserted', 0)
+
+                # Only the documents that failed are looked at again, the rest are stored.
+                retry = []
+                for error in details.get('writeErrors', []):
+                    if error.get('code') in PERMANENT_WRITE_ERRORS or attempt >= retries:
+                        failed += 1
+                        print(f"{Fore.YELLOW}Warning: a document was not inserted into {self.collection.name}: {error.get('errmsg')}{Style.RESET_ALL}")
+                    else:
+                        retry.append(chunk[error['index']])
+
+                chunk = retry
+                attempt += 1
+
+        return (inserted, failed)
+
+    def insert_chunk(self, chunk: list):
+        """
+        :fn: insert_chunk
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes one chunk unordered, clients that stamp their documents as they are stored write it their own way.
+        :param chunk: The encoded documents.
+        :return: Raises a BulkWriteError naming each document (by its index) that failed.
+        """
+        # Raw documents have no _id yet, the server gives them one.
+        self.collection.insert_many(chunk, ordered=False)
+
+    def bulk_ingest(self, documents, chunk_bytes: int = 4 * 1024 * 1024, chunk_documents: int = 10000, retries: int = 3, timer = None) -> tuple:
+        """
+        :fn: bulk_ingest
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Inserts any amount of documents in size bounded, unordered chunks, so one bad document doesn't stop the rest.
+        :param documents: Any iterable of documents, e.g. a generator.
+        :param chunk_bytes: The most encoded bytes in one insert.
+        :param chunk_documents: The most documents in one insert.
+        :param retries: How many times documents that failed for a reason that might go away are sent again.
+        :param timer: A StageTimer, if given encoding is timed as "serialise" and writing as "insert".
+        :return: Returns (inserted, failed), connection errors are raised.
+        """
+        inserted = 0
+        failed = 0
+
+        # Without a timer there is nothing to split up.
+        if timer is None:
+            for chunk in self.encode_chunks(documents, chunk_bytes, chunk_documents):
+                chunk_inserted, chunk_failed = self.write_chunk(chunk, retries)
+                inserted += chunk_inserted
+                failed += chunk_failed
+            return (inserted, failed)
+
+        # The documents are made and encoded lazily, so each chunk is timed as it is pulled.
+        chunks = self.encode_chunks(documents, chunk_bytes, chunk_documents)
+        while True:
+            with timer.stage("serialise"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            with timer.stage("insert"):
+                chunk_inserted, chunk_failed = self.write_chunk(chunk, retries)
+            inserted += chunk_inserted
+            failed += chunk_failed
+
+            timer.count("documents_inserted", chunk_inserted)
+            timer.count("bytes_inserted", sum(len(document.raw) for document in chunk))
+        return (inserted, failed)
+
+    def report_ingest(self, result: tuple, total: int):
+        """
+        :fn: report_ingest
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Warns if bulk_ingest() couldn't insert everything.
+        :param result: The (inserted, failed) bulk_ingest() gave back.
+        :param total: How many documents were given to bulk_ingest()
+        """
+        from colorama import Fore, Style
+
+        inserted, failed = result
+        if failed > 0:
+            print(f"{Fore.YELLOW}Warning: {failed} of {total} documents were not inserted into {self.collection.name}, {inserted} were.{Style.RESET_ALL}")
+
     def get(self, database_class: type, query: dict = {}):
         """
         :fn: get
@@ -0,0 +1,251 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module keeps density rolled up at several resolutions, each tier built from the one below so long ranges read few documents.
+"""
+from src.database.ProtoClient import ClientDB as ProtoClient
+from src.structures.density import Density
+from src.structures.hyperLogLog import HyperLogLog
+from src.structures.node import Node
+from src.structures.rollup import Rollup
+from pymongo import MongoClient
+from bson.objectid import ObjectId as ObjectID
+from datetime import datetime, timedelta
+
+# Each tier's name and length in minutes, finest first. The lengths divide a day, and each divides the next.
+ROLLUP_TIERS = (
+    ("5m", 5),
+    ("30m", 30),
+    ("1h", 60),
+    ("1d", 1440)
+)
+
+class RollupDB(ProtoClient):
+    """
+    :class: RollupDB
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class handles the rollup tiers, one collection each keyed by node and time.
+    """
+    def __init__(self, db_client: MongoClient, collections: dict):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Initializes the RollupDB with a database client
+        :param db_client: The database client to use for operations.
+        :param collections: The login file's collections, each tier's is "rollup" and the tier's name.
+        """
+        # We will store a copy of the client information, for use when we need access to information
+        self.db_client = db_client
+
+        # One collection per tier.
+        self.tier_collections = dict()
+        for name, minutes in ROLLUP_TIERS:
+            self.tier_collections[name] = self.db_client[collections.get(f"rollup{name}", f"densityRollup{name}")]
+
+        # The finest tier, the one built from attendance.
+        self.base_tier, self.base_minutes = ROLLUP_TIERS[0]
+        self.collection = self.tier_collections[self.base_tier]
+
+    def roll_up(self, node_devices: dict, suspicious_macs: set, full_nodes: list[Node], estimation_factor: float):
+        """
+        :fn: roll_up
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds newly squashed attendance to the base tier, then rebuilds only the periods above it that changed.
+        :param node_devices: The devices each node saw, in base tier periods. From AttendanceDB.get_node_devices()
+        :param suspicious_macs: The mac addresses we do not trust.
+        :param full_nodes: A list of all nodes, for their locations.
+        :param estimation_factor: Devices per person.
+        """
+        locations = { str(node.id): node.location_id for node in full_nodes }
+
+        changed = self.write_base(node_devices, suspicious_macs, locations, estimation_factor)
+
+        # Each tier is built from the one below, never from attendance.
+        i = 1
+        while i < len(ROLLUP_TIERS) and changed:
+            below = ROLLUP_TIERS[i - 1][0]
+            name, minutes = ROLLUP_TIERS[i]
+            changed = self.build_tier(below, name, minutes, changed, locations, estimation_factor)
+            i += 1
+
+    def write_base(self, node_devices: dict, suspicious_macs: set, locations: dict, estimation_factor: float) -> set:
+        """
+        :fn: write_base
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Merges the unsuspicious devices into the base tier, a period already stored keeps the devices it had.
+        :param node_devices: timestamp->node_id->set of device ids
+        :param suspicious_macs: The mac addresses we do not trust.
+        :param locations: node_id -> location_id
+        :param estimation_factor: Devices per person.
+        :return: Returns the (node_id, timestamp) of every period written.
+        """
+        sketches = dict()
+        for timestamp, nodes in node_devices.items():
+            for node_id, devices in nodes.items():
+                counted = devices - suspicious_macs
+                if not counted:
+                    continue
+
+                sketch = HyperLogLog()
+                for device_id in counted:
+                    sketch.add(device_id)
+                sketches[(str(node_id), timestamp)] = sketch
+
+        if not sketches:
+            return set()
+
+        # Squashing the same attendance again (or more of a period) only adds to the sketch.
+        for rollup in self.get_periods(self.base_tier, sketches.keys()):
+            sketches[(str(rollup.node_id), rollup.timestamp)].merge(rollup.device_sketch)
+
+        rollups = [
+            Rollup(timestamp, node_id, locations.get(node_id), sketch, None, estimation_factor)
+            for (node_id, timestamp), sketch in sketches.items()
+        ]
+        self.replace(self.base_tier, rollups)
+        return set(sketches)
+
+    def build_tier(self, below: str, name: str, minutes: int, changed: set, locations: dict, estimation_factor: float) -> set:
+        """
+        :fn: build_tier
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Rebuilds the periods of a tier whose periods below changed, from every period below them.
+        :param below: The name of the tier below.
+        :param name: The name of the tier being built.
+        :param minutes: The length of its periods.
+        :param changed: The (node_id, timestamp) of the periods below that changed.
+        :param locations: node_id -> location_id
+        :param estimation_factor: Devices per person.
+        :return: Returns the (node_id, timestamp) of every period written.
+        """
+        parents = { (node_id, Density.roundToLastMinutes(timestamp, minutes)) for node_id, timestamp in changed }
+
+        # Read each node's periods below in one range, then split them into their parents.
+        children = dict()
+        by_node = dict()
+        for node_id, timestamp in parents:
+            by_node.setdefault(node_id, []).append(timestamp)
+
+        length = timedelta(minutes=minutes)
+        for node_id, timestamps in by_node.items():
+            for rollup in self.get(below, min(timestamps), max(timestamps) + length, [ node_id ]):
+                key = (node_id, Density.roundToLastMinutes(rollup.timestamp, minutes))
+                if key in parents:
+                    children.setdefault(key, []).append(rollup)
+
+        rollups = []
+        for (node_id, timestamp), rollups_below in children.items():
+            sketch = HyperLogLog()
+            peak = 0
+            for rollup in rollups_below:
+                sketch.merge(rollup.device_sketch)
+                peak = max(peak, rollup.peak_entries)
+            rollups.append(Rollup(timestamp, node_id, locations.get(node_id), sketch, peak, estimation_factor))
+
+        self.replace(name, rollups)
+        return set(children)
+
+    def get_periods(self, tier: str, keys) -> list[Rollup]:
+        """
+        :fn: get_periods
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the stored rollups of some nodes and periods.
+        :param tier: The tier's name.
+        :param keys: The (node_id, timestamp) of each period.
+        :return: Returns the rollups that exist.
+        """
+        by_node = dict()
+        for node_id, timestamp in keys:
+            by_node.setdefault(node_id, []).append(timestamp)
+
+        rollups = []
+        for node_id, timestamps in by_node.items():
+            for data in self.tier_collections[tier].find({ "node_id": ObjectID(node_id), "date_time": { "$in": timestamps } }, { "_id": 0 }):
+                rollup = Rollup()
+                rollup.deserialise(data)
+                rollups.append(rollup)
+        return rollups
+
+    def replace(self, tier: str, rollups: list[Rollup]):
+        """
+        :fn: replace
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes rollups, replacing what is stored for the same node and period.
+        :param tier: The tier's name.
+        :param rollups: The rollups.
+        """
+        from pymongo import ReplaceOne
+
+        if len(rollups) < 1:
+            return
+
+        requests = [ 0 ] * len(rollups)
+        i = 0
+        for rollup in rollups:
+            data = rollup.serialise()
+            requests[i] = ReplaceOne({ "node_id": data["node_id"], "date_time": data["date_time"] }, data, upsert=True)
+            i += 1
+
+        # Order doesn't matter, each rollup is its own node and period.
+        self.tier_collections[tier].bulk_write(requests, ordered=False)
+
+    def clear(self):
+        """ 
+        :fn: clear
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Clears every tier.
+        """
+        for collection in self.tier_collections.values():
+            collection.delete_many({})
+
+    def get(self, tier: str, start: datetime, end: datetime, node_ids: list[str] = None, location_id: str = None) -> list[Rollup]:
+        """
+        :fn: get
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the rollups of a tier in a time range, e.g. the hours of a week for a chart.
+        :param tier: The tier's name, see ROLLUP_TIERS.
+        :param start: The first time included.
+        :param end: The time the range stops before.
+        :param node_ids: Only rollups of these nodes, every node if None.
+        :param location_id: Only rollups of this location, every location if None.
+        :return: Returns the rollups in time order.
+        """
+        query = { "date_time": { "$gte": start, "$lt": end } }
+        if node_ids is not None:
+            query["node_id"] = { "$in": [ ObjectID(node_id) for node_id in node_ids ] }
+        if location_id is not None:
+            query["location_id"] = ObjectID(location_id)
+
+        rollups = []
+        for data in self.tier_collections[tier].find(query, { "_id": 0 }).sort("date_time", 1):
+            rollup = Rollup()
+            rollup.deserialise(data)
+            rollups.append(rollup)
+        return rollups
+
+    def count_unique_devices(self, tier: str, start: datetime, end: datetime, node_ids: list[str] = None, location_id: str = None) -> int:
+        """
+        :fn: count_unique_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Estimates how many distinct devices were seen in a time range, merging one tier's sketches.
+        :param tier: The tier's name, see ROLLUP_TIERS.
+        :param start: The first time included.
+        :param end: The time the range stops before.
+        :param node_ids: Only rollups of these nodes, every node if None.
+        :param location_id: Only rollups of this location, every location if None.
+        :return: Returns the estimated number of distinct devices.
+        """
+        merged = HyperLogLog()
+        for rollup in self.get(tier, start, end, node_ids, location_id):
+            merged.merge(rollup.device_sketch)
+        return merged.count()
@@ -0,0 +1,159 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module keeps what the incremental squash needs between runs, how far it has read and what each 30 minutes held.
+"""
+from src.database.ProtoClient import ClientDB as ProtoClient
+from pymongo import MongoClient
+from datetime import datetime
+
+class SquashStateDB(ProtoClient):
+    """
+    :class: SquashStateDB
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class handles the squash's watermark, and the devices folded into each 30 minute bucket so far.
+    """
+    def __init__(self, db_client: MongoClient, collection: str, bucket_collection: str):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Initializes the SquashStateDB with a database client
+        :param db_client: The database client to use for operations.
+        :param collection: The name of the collection holding the watermarks.
+        :param bucket_collection: The name of the collection holding the buckets.
+        """
+        # We will store a copy of the client information, for use when we need access to information
+        self.db_client = db_client
+
+        # One document per squash, holding the last attendance _id it read.
+        self.collection = self.db_client[collection]
+
+        # One document per 30 minutes, holding every device seen then and which nodes saw them.
+        self.bucket_collection = self.db_client[bucket_collection]
+
+    def get_watermark(self, name: str = "attendance"):
+        """
+        :fn: get_watermark
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: How far the squash has read.
+        :param name: Which squash, so more than one can keep its own place.
+        :return: Returns the "ingested_at" everything before has been read, or None if it has never run (or ran before attendance was stamped).
+        """
+        state = self.collection.find_one({ "_id": name })
+        return None if state is None else state.get("ingested_through")
+
+    def set_watermark(self, name: str, ingested_through: datetime, documents: int):
+        """
+        :fn: set_watermark
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Remembers how far the squash has read, only once everything before it is stored.
+        :param name: Which squash.
+        :param ingested_through: The attendance stamped before this has been read.
+        :param documents: How many documents this run read, kept for checking on the squash.
+        """
+        self.collection.update_one(
+            { "_id": name },
+            { "$set": { "ingested_through": ingested_through, "last_run": datetime.now(), "last_documents": documents } },
+            upsert=True
+        )
+
+    def get_resume_token(self, name: str = "stream"):
+        """
+        :fn: get_resume_token
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Where the streaming squash stopped reading the attendance change stream.
+        :param name: Which stream.
+        :return: Returns the change stream's resume token, or None if it has never run.
+        """
+        state = self.collection.find_one({ "_id": name })
+        return None if state is None else state.get("resume_token")
+
+    def set_resume_token(self, name: str, resume_token, documents: int):
+        """
+        :fn: set_resume_token
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Remembers where the streaming squash stopped, only once everything before it is stored.
+        :param name: Which stream.
+        :param resume_token: The change stream's resume token.
+        :param documents: How many documents this flush read, kept for checking on the stream.
+        """
+        self.collection.update_one(
+            { "_id": name },
+            { "$set": { "resume_token": resume_token, "last_run": datetime.now(), "last_documents": documents } },
+            upsert=True
+        )
+
+    def get_buckets(self, timestamps: list[datetime]) -> dict:
+        """
+        :fn: get_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the stored buckets of some timestamps.
+        :param timestamps: The starts of the buckets.
+        :return: Returns timestamp -> bucket document, buckets that don't exist yet are left out.
+        """
+        buckets = dict()
+        for bucket in self.bucket_collection.find({ "date_time": { "$in": list(timestamps) } }, { "_id": 0 }):
+            buckets[bucket["date_time"]] = bucket
+        return buckets
+
+    def get_bucket_devices(self, start: datetime, end: datetime) -> dict:
+        """
+        :fn: get_bucket_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the devices of every bucket between two times, what the suspicion rules look at.
+        :param start: The first bucket, inclusive.
+        :param end: The last bucket, inclusive.
+        :return: Returns timestamp -> device_id -> [ first seen, last seen, packet count ]
+        """
+        freq = dict()
+        for bucket in self.bucket_collection.find({ "date_time": { "$gte": start, "$lte": end } }, { "_id": 0, "date_time": 1, "devices": 1 }):
+            freq[bucket["date_time"]] = bucket["devices"]
+        return freq
+
+    def save_buckets(self, buckets: list[dict]):
+        """
+        :fn: save_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Replaces the buckets that changed, each is written whole.
+        :param buckets: The bucket documents.
+        """
+        from pymongo import ReplaceOne
+
+        if len(buckets) < 1:
+            return
+
+        requests = [ ReplaceOne({ "date_time": bucket["date_time"] }, bucket, upsert=True) for bucket in buckets ]
+        self.bucket_collection.bulk_write(requests, ordered=False)
+
+    def revert_buckets(self, fold: dict) -> int:
+        """
+        :fn: revert_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Takes the packets a read added back out of its buckets, done before the same read is squashed again after a crash.
+                Who was seen is left, the read finds them again.
+        :param fold: Which read, see AttendanceDB.fold_into_buckets()
+        :return: Returns how many buckets were changed.
+        """
+        from pymongo import UpdateOne
+
+        requests = []
+        for bucket in self.bucket_collection.find({ "folded_from": fold }, { "_id": 0, "date_time": 1, "folded": 1 }):
+            update = { "$unset": { "folded_from": "", "folded": "" } }
+            packets = { f"devices.{mac}.2": -count for mac, count in bucket.get("folded", dict()).items() if count }
+            if packets:
+                update["$inc"] = packets
+            requests.append(UpdateOne({ "date_time": bucket["date_time"] }, update))
+
+        if requests:
+            self.bucket_collection.bulk_write(requests, ordered=False)
+        return len(requests)
@@ -0,0 +1,132 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module publishes the suspicious devices as a versioned Bloom filter, so the nodes can drop them before uploading.
+"""
+from src.database.ProtoClient import ClientDB as ProtoClient
+from src.structures.bloomFilter import BloomFilter
+from pymongo import MongoClient
+from datetime import datetime, timedelta
+from hashlib import blake2b
+
+class SuspiciousFilterDB(ProtoClient):
+    """
+    :class: SuspiciousFilterDB
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class handles the suspicious device filters, one document per version with the newest being the one nodes use.
+    """
+    def __init__(self, db_client: MongoClient, collection: str, device_collection: str = "suspiciousDevices"):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Initializes the SuspiciousFilterDB with a database client
+        :param db_client: The database client to use for operations.
+        :param collection: The name of the collection holding the filters.
+        :param device_collection: The name of the collection holding how long each device stays in the filter, only the server publishing uses it.
+        """
+        # We will store a copy of the client information, for use when we need access to information
+        self.db_client = db_client
+
+        # One document per version of the filter.
+        self.collection = self.db_client[collection]
+
+        # One document per device in the filter, holding when it leaves.
+        self.device_collection = self.db_client[device_collection]
+
+    def get_checksum(self, device_ids: set) -> str:
+        """
+        :fn: get_checksum
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Identifies a set of devices, so the same set isn't published twice.
+        :param device_ids: The suspicious device ids.
+        :return: Returns a hex digest of the sorted ids.
+        """
+        return blake2b("\n".join(sorted(device_ids)).encode('utf-8'), digest_size=16).hexdigest()
+
+    def list_devices(self, device_ids: set, keep_days: float) -> set:
+        """
+        :fn: list_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Keeps every device found suspicious in the filter for keep_days from now, and lets go of those whose time is up.
+        :param device_ids: The devices found suspicious now.
+        :param keep_days: How long a device stays after it was last found suspicious.
+        :return: Returns every device that should be in the filter.
+        """
+        from pymongo import UpdateOne
+
+        now = datetime.now()
+        until = now + timedelta(days=keep_days)
+
+        # Found again, so the time it leaves moves on.
+        if device_ids:
+            self.device_collection.bulk_write([ UpdateOne({ "_id": device_id }, { "$max": { "listed_until": until } }, upsert=True) for device_id in device_ids ], ordered=False)
+        self.device_collection.delete_many({ "listed_until": { "$lt": now } })
+
+        return { device["_id"] for device in self.device_collection.find({}, { "_id": 1 }) }
+
+    def publish(self, device_ids: set, error_rate: float = 0.001, keep_days: float = 7, keep_versions: int = 5) -> tuple:
+        """
+        :fn: publish
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stores a new version of the filter, unless the newest already holds the same devices.
+                Nodes drop what is in the filter, so its devices stop looking suspicious. Each one is kept for keep_days after it last did.
+        :param device_ids: The devices found suspicious now.
+        :param error_rate: How often a device that isn't suspicious is found in the filter, and dropped by a node.
+        :param keep_days: How long a device stays in the filter after it was last found suspicious.
+        :param keep_versions: How many versions are kept, older ones are deleted.
+        :return: Returns (the version the nodes should have, how many devices it holds)
+        """
+        device_ids = self.list_devices(device_ids, keep_days)
+        checksum = self.get_checksum(device_ids)
+
+        latest = self.collection.find_one({}, { "version": 1, "checksum": 1 }, sort=[ ("version", -1) ])
+        if latest is not None and latest.get("checksum") == checksum:
+            return (latest["version"], len(device_ids))
+
+        bloom = BloomFilter(len(device_ids), error_rate)
+        for device_id in device_ids:
+            bloom.add(device_id)
+
+        version = 1 if latest is None else latest["version"] + 1
+        self.collection.insert_one({
+            "version": version,
+            "date_time": datetime.now(),
+            "devices": len(device_ids),
+            "error_rate": float(error_rate),
+            "checksum": checksum,
+            "filter": bloom.serialise()
+        })
+
+        # Nodes only ever want the newest, a few are kept to look back at.
+        self.collection.delete_many({ "version": { "$lte": version - keep_versions } })
+        return (version, len(device_ids))
+
+    def get_latest(self, newer_than: int = 0) -> dict | None:
+        """
+        :fn: get_latest
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the newest filter.
+        :param newer_than: The version already held, 0 if none is.
+        :return: Returns the filter's document, or None if there isn't a newer one.
+        """
+        return self.collection.find_one({ "version": { "$gt": int(newer_than) } }, sort=[ ("version", -1) ])
+
+    def fetch(self, version: int) -> tuple | None:
+        """
+        :fn: fetch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the newest filter for a node that connects to MongoDB itself, the same as GatewayClient.get_filter()
+        :param version: The version the node holds, 0 if none.
+        :return: Returns (version, serialised filter), or None if the node's is the newest.
+        """
+        latest = self.get_latest(version)
+        if latest is None:
+            return None
+        return (latest["version"], bytes(latest["filter"]))
@@ -98,4 +98,39 @@ class Graphing:
         plt.title("Total Node Records")
         plt.xlabel("Nodes")
         plt.ylabel("Total Records")
-        return plt
\ No newline at end of file
+        return plt
+
+    def create_node_peak_activity(self, nodes: list[Node], rollups: list):
+        """
+        :fn: create_node_peak_activity
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates a line graph for each node, showing the most devices it saw at once in each rollup period.
+        :param nodes: The nodes that we are reading from
+        :param rollups: The rollups of one tier we are plotting, in time order.
+        :return: Returns a plot class, please use .show() on the variable to show the graph.
+        """
+        import matplotlib.dates as mpltdates # Used to show dates on matplotlib
+
+        # One line per node, timestamp-peak
+        for node in nodes:
+            quantities = [] # This is y, the peak devices of each period.
+            timestamps = [] # This is x, the start of each period.
+
+            for rollup in rollups:
+                if str(rollup.node_id) == str(node.id):
+                    quantities.append(rollup.peak_entries)
+                    timestamps.append(rollup.timestamp)
+
+            # Nodes that saw nothing in the range get no line.
+            if timestamps:
+                plt.plot(mpltdates.date2num(timestamps), quantities, label=f"Node ID#{node.id}")
+
+        plt.gca().xaxis.set_major_formatter(mpltdates.DateFormatter('%Y-%m-%d %H:%M'))
+        plt.gcf().autofmt_xdate()
+
+        plt.title("Peak Devices per Node")
+        plt.xlabel("Timestamp")
+        plt.ylabel("Peak Amount of Devices")
+        plt.legend()
+        return plt
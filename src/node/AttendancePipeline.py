@@ -0,0 +1,219 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module streams packets from a live capture into attendance batches, without writing and re-reading a capture file.
+"""
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+from time import monotonic as time_monotonic
+
+from src.structures.attendance import Attendance
+
+class AttendancePipeline:
+    """
+    :class: AttendancePipeline
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Runs capture, conversion and insertion concurrently, joined by bounded queues.
+    """
+    def __init__(self, sniffer, sink, batch_size: int = 500, queue_batches: int = 4, flush_seconds: float = 5.0):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the pipeline, no threads are started until run() is called.
+        :param sniffer: The sniffer that we are capturing packets with.
+        :param sink: A function that takes a list of attendance records, called once per batch (e.g. the database insert).
+        :param batch_size: The maximum amount of attendance records in one batch.
+        :param queue_batches: How many batches can be waiting before the capture is made to wait.
+        :param flush_seconds: The longest time a partial batch is held before it is sent to the sink.
+        """
+        self.sniffer = sniffer
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+
+        # Raw packets from the capture thread, and finished batches from the conversion thread.
+        # Both are bounded, so a slow database slows the capture instead of filling memory.
+        self.packet_queue = Queue(maxsize=batch_size * queue_batches)
+        self.batch_queue  = Queue(maxsize=queue_batches)
+
+        # Set when any stage wants every other stage to stop.
+        self.stop_event = Event()
+
+        # The first exception raised by a worker thread, re-raised in run().
+        self.error = None
+
+        # True if the capture stopped by itself, without an error or being told to.
+        self.capture_ended = False
+
+        # True while run() is still taking batches off the batch queue.
+        self.draining = False
+
+        # Counters, used for the status line at the end of each batch.
+        self.total_packets = 0
+        self.total_skipped = 0
+        self.total_batches = 0
+
+    def capture_worker(self):
+        """
+        :fn: capture_worker
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Captures packets from the live interface and places them in the packet queue.
+        """
+        try:
+            self.sniffer.stream_packets(self.packet_queue, self.stop_event)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            # The capture can also just end (e.g. tshark exits cleanly), the rest is still drained before run() restarts it.
+            if not self.stop_event.is_set():
+                self.capture_ended = True
+            self.stop_event.set()
+
+    def convert_worker(self):
+        """
+        :fn: convert_worker
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts packets to attendance records, and groups them into batches for the sink.
+        """
+        batch = []
+        batch_started = time_monotonic()
+
+        try:
+            while not self.stop_event.is_set():
+                # Wait for a packet, but wake up sometimes so old partial batches get flushed.
+                try:
+                    packet = self.packet_queue.get(timeout=0.5)
+                except Empty:
+                    packet = None
+
+                if packet is not None:
+                    attendance = self.convert_packet(packet)
+                    if attendance is not None:
+                        batch.append(attendance)
+
+                # Send the batch if it is full, or if it has waited too long.
+                batch_age = time_monotonic() - batch_started
+                if len(batch) >= self.batch_size or (batch and batch_age >= self.flush_seconds):
+                    self.put_batch(batch)
+                    batch = []
+                    batch_started = time_monotonic()
+                elif not batch:
+                    batch_started = time_monotonic()
+        except Exception as e:
+            self.fail(e)
+
+        # Whatever is left over is still worth saving.
+        while self.error is None:
+            try:
+                packet = self.packet_queue.get_nowait()
+            except Empty:
+                break
+            attendance = self.convert_packet(packet)
+            if attendance is not None:
+                batch.append(attendance)
+        i = 0
+        while i < len(batch):
+            self.put_batch(batch[i:i + self.batch_size])
+            i += self.batch_size
+
+    def convert_packet(self, packet) -> Attendance | None:
+        """
+        :fn: convert_packet
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts one packet, skipping packets that do not have a source address.
+        :param packet: The packet from the capture.
+        :return: Returns the attendance record, or None if the packet cannot be used.
+        """
+        try:
+            attendance = self.sniffer.convert_packet_to_attendance(packet)
+        except (AttributeError, KeyError):
+            # Control frames and other packets without a source address.
+            attendance = None
+
+        if attendance is None:
+            self.total_skipped += 1
+        return attendance
+
+    def put_batch(self, batch: list[Attendance]):
+        """
+        :fn: put_batch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Places a batch on the batch queue, waiting if the sink has fallen behind.
+        :param batch: The batch of attendance records.
+        """
+        while True:
+            try:
+                self.batch_queue.put(batch, timeout=0.5)
+                return
+            except Full:
+                # If the sink has stopped, nobody will take this batch.
+                if self.stop_event.is_set() and not self.draining:
+                    return
+
+    def fail(self, error: Exception):
+        """
+        :fn: fail
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Records an error from a worker thread, and stops the pipeline.
+        :param error: The exception that was raised.
+        """
+        if self.error is None:
+            self.error = error
+        self.stop_event.set()
+
+    def run(self, duration: float = None):
+        """
+        :fn: run
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Starts the capture and conversion threads, and sends batches to the sink on this thread.
+        :param duration: How long to run for in seconds, None to run until stopped or an error happens.
+        """
+        self.stop_event.clear()
+        self.error = None
+        self.capture_ended = False
+        self.draining = True
+
+        capture_thread = Thread(target=self.capture_worker, name="pipeline-capture", daemon=True)
+        convert_thread = Thread(target=self.convert_worker, name="pipeline-convert", daemon=True)
+        capture_thread.start()
+        convert_thread.start()
+
+        started = time_monotonic()
+        try:
+            while True:
+                # Stop capturing once we are out of time.
+                if duration is not None and (time_monotonic() - started) >= duration:
+                    self.stop_event.set()
+
+                try:
+                    batch = self.batch_queue.get(timeout=0.5)
+                except Empty:
+                    # Only finish once the converter has flushed its last batch.
+                    if self.stop_event.is_set() and not convert_thread.is_alive():
+                        break
+                    continue
+
+                self.total_batches += 1
+                self.total_packets += len(batch)
+                print(f"Streaming batch #{self.total_batches}: {len(batch)} records ({self.total_skipped} packets skipped so far)")
+                self.sink(batch)
+        finally:
+            # Make sure every thread is told to finish, even when we are interrupted.
+            self.draining = False
+            self.stop_event.set()
+            capture_thread.join(timeout=5)
+            convert_thread.join(timeout=5)
+
+        # Let the caller deal with capture errors (e.g. restart tshark).
+        if self.error is not None:
+            raise self.error
+        if self.capture_ended:
+            raise RuntimeError("The capture ended")
@@ -0,0 +1,43 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module holds the few fields of a packet that the node needs, without a full dissection tree.
+"""
+from datetime import datetime
+from src.structures.PacketType import PacketType
+
+class DecodedPacket:
+    """
+    :class: DecodedPacket
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: A decoded packet, only the timestamp, packet type, source address and signal strength.
+    """
+    __slots__ = ('timestamp', 'packet_type', 'mac_address', 'signal')
+
+    def __init__(self, timestamp: float, packet_type: PacketType, mac_address: str, signal: int | None = None):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates a decoded packet.
+        :param timestamp: The time the packet was captured, in seconds since the epoch.
+        :param packet_type: The type of packet (bluetooth/wifi/ethernet)
+        :param mac_address: The source address, formatted like "aa:bb:cc:dd:ee:ff"
+        :param signal: The signal strength in dBm, None if the capture did not record it.
+        """
+        self.timestamp = timestamp
+        self.packet_type = packet_type
+        self.mac_address = mac_address
+        self.signal = signal
+
+    @property
+    def sniff_time(self) -> datetime:
+        """
+        :fn: sniff_time
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The capture time as a local datetime, the same as pyshark's packet.sniff_time
+        :return: Returns the capture time.
+        """
+        return datetime.fromtimestamp(self.timestamp)
@@ -0,0 +1,161 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module keeps the server's suspicious device filter on the node, so those devices are dropped before they are uploaded.
+"""
+from colorama import Fore, Style
+from os import makedirs, replace as replace_file
+from os.path import dirname, exists as file_exists
+from time import monotonic
+
+from src.structures.attendanceBatch import AttendanceBatch
+from src.structures.bloomFilter import BloomFilter
+
+class DeviceFilter:
+    """
+    :class: DeviceFilter
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Holds the newest suspicious device filter, asking for a newer one every refresh_seconds and keeping it on disk for restarts.
+    """
+    def __init__(self, fetch, refresh_seconds: float = 300, cache_file: str = ""):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the filter, reading the one kept on disk if there is one. Nothing is dropped until a filter is held.
+        :param fetch: A function taking the version held and giving (version, serialised filter), or None if there isn't a newer one.
+                      GatewayClient.get_filter() or SuspiciousFilterDB.fetch()
+        :param refresh_seconds: How often to ask for a newer filter.
+        :param cache_file: Where the filter is kept between runs, not kept if empty.
+        """
+        self.fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.cache_file = cache_file
+
+        self.version = 0
+        self.bloom = None
+        self.next_refresh = None
+
+        # Counted as they are dropped.
+        self.total_dropped = 0
+
+        if cache_file and file_exists(cache_file):
+            self.load_cache()
+
+    def load_cache(self):
+        """
+        :fn: load_cache
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads the filter kept on disk, so a restarted node filters before it can reach the server.
+        """
+        from bson import decode as bson_decode
+
+        try:
+            with open(self.cache_file, "rb") as file:
+                cached = bson_decode(file.read())
+            bloom = BloomFilter()
+            bloom.deserialise(cached["filter"])
+        except Exception as e:
+            print(f"{Fore.YELLOW}Warning: The suspicious device filter in {self.cache_file} could not be read, waiting for a new one: {e}{Style.RESET_ALL}")
+            return
+
+        self.bloom = bloom
+        self.version = int(cached["version"])
+
+    def save_cache(self, data: bytes):
+        """
+        :fn: save_cache
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Keeps the filter on disk, written beside it first so a crash never leaves half a file.
+        :param data: The serialised filter.
+        """
+        from bson import encode as bson_encode
+
+        directory = dirname(self.cache_file)
+        if directory:
+            makedirs(directory, exist_ok=True)
+
+        temporary = self.cache_file + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(bson_encode({ "version": self.version, "filter": data }))
+        replace_file(temporary, self.cache_file)
+
+    def refresh(self):
+        """
+        :fn: refresh
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Asks for a newer filter if it has been refresh_seconds since the last time, the one held is kept if that fails.
+        """
+        now = monotonic()
+        if self.next_refresh is not None and now < self.next_refresh:
+            return
+        self.next_refresh = now + self.refresh_seconds
+
+        try:
+            fetched = self.fetch(self.version)
+            if fetched is None:
+                return
+
+            version, data = fetched
+            bloom = BloomFilter()
+            bloom.deserialise(data)
+        except Exception as e:
+            print(f"{Fore.YELLOW}Warning: A newer suspicious device filter could not be fetched, keeping version {self.version}: {e}{Style.RESET_ALL}")
+            return
+
+        # Swapped in whole, so a scan reading it from another thread sees one filter or the other.
+        self.bloom = bloom
+        self.version = int(version)
+        print(f"Suspicious device filter is now version {self.version}.")
+
+        if self.cache_file:
+            try:
+                self.save_cache(data)
+            except OSError as e:
+                print(f"{Fore.YELLOW}Warning: The suspicious device filter could not be kept in {self.cache_file}: {e}{Style.RESET_ALL}")
+
+    def is_suspicious(self, device_id: str) -> bool:
+        """
+        :fn: is_suspicious
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Whether a device is in the filter.
+        :param device_id: The device id (already a hash of the MAC address).
+        :return: Returns True if it should be dropped, always False until a filter is held.
+        """
+        bloom = self.bloom
+        return bloom is not None and device_id in bloom
+
+    def drop(self, packets: AttendanceBatch | list):
+        """
+        :fn: drop
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Drops the attendance of every device in the filter, checking each device once.
+        :param packets: A batch, or a list of attendance records.
+        :return: Returns the attendance that is left, of the same kind.
+        """
+        if self.bloom is None or len(packets) == 0:
+            return packets
+
+        if isinstance(packets, AttendanceBatch):
+            dropped = { device_id for device_id in packets.device_ids if self.is_suspicious(device_id) }
+            if not dropped:
+                return packets
+            kept = packets.without_devices(dropped)
+        else:
+            verdicts = dict()
+            kept = []
+            for attendance in packets:
+                verdict = verdicts.get(attendance.device_id)
+                if verdict is None:
+                    verdict = verdicts[attendance.device_id] = self.is_suspicious(attendance.device_id)
+                if not verdict:
+                    kept.append(attendance)
+
+        self.total_dropped += len(packets) - len(kept)
+        return kept
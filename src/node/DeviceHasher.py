@@ -0,0 +1,106 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module turns MAC addresses into device ids, shared by every sniffer so they all agree on a device's id.
+"""
+from functools import lru_cache
+from time import perf_counter, process_time
+import hashlib
+
+# The hashing modes we know, "md5" and "sha256" give the same ids as the sniffers used to.
+HASH_MODES = ("md5", "sha256", "blake2b")
+
+class DeviceHasher:
+    """
+    :class: DeviceHasher
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Hashes MAC addresses into device ids, remembering recent addresses so repeats cost a dictionary lookup.
+    """
+    def __init__(self, mode: str = "blake2b", salt: str = "", cache_size: int = 4096):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the hasher.
+        :param mode: "blake2b" (keyed with the salt), "md5" (the old Sniffer ids) or "sha256" (the old BleSniffer ids)
+        :param salt: The secret mixed into each hash, nodes that should agree on ids must share it.
+        :param cache_size: How many MAC addresses to remember, the least recently seen are forgotten first.
+        """
+        if mode not in HASH_MODES:
+            raise ValueError(f"Unknown hash mode \"{mode}\", expected one of {HASH_MODES}")
+
+        self.mode = mode
+        self.salt = salt
+        self.cache_size = cache_size
+        self.salt_bytes = salt.encode('utf-8')
+
+        # blake2b takes the salt as its key, which can only be 64 bytes long.
+        if mode == "blake2b" and len(self.salt_bytes) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise ValueError(f"The blake2b salt can be at most {hashlib.blake2b.MAX_KEY_SIZE} bytes.")
+
+        # How long has been spent hashing addresses that weren't cached, wall and CPU, for the node's loop metrics.
+        self.hash_seconds = 0.0
+        self.hash_cpu_seconds = 0.0
+
+        # The same, added up from the worker processes of a ParallelReader.
+        self.worker_hash_seconds = 0.0
+        self.worker_hash_cpu_seconds = 0.0
+
+        # The cache lives on this instance, so two hashers with different salts never share ids.
+        self.cached_hash = lru_cache(maxsize=cache_size)(self.timed_compute_hash)
+
+    def hash(self, mac_address: str) -> str:
+        """
+        :fn: hash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the device id of a MAC address.
+        :param mac_address: The MAC address, as the capture gave it.
+        :return: Returns the device id as a hex string.
+        """
+        return self.cached_hash(mac_address)
+
+    def timed_compute_hash(self, mac_address: str) -> str:
+        """
+        :fn: timed_compute_hash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Hashes a MAC address without the cache, adding the time taken to hash_seconds and hash_cpu_seconds.
+        :param mac_address: The MAC address, as the capture gave it.
+        :return: Returns the device id as a hex string.
+        """
+        started = perf_counter()
+        started_cpu = process_time()
+        device_id = self.compute_hash(mac_address)
+        self.hash_cpu_seconds += process_time() - started_cpu
+        self.hash_seconds += perf_counter() - started
+        return device_id
+
+    def compute_hash(self, mac_address: str) -> str:
+        """
+        :fn: compute_hash
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Hashes a MAC address without the cache.
+        :param mac_address: The MAC address, as the capture gave it.
+        :return: Returns the device id as a hex string.
+        """
+        if self.mode == "md5":
+            return hashlib.md5(mac_address.encode('utf-8')).hexdigest()
+        if self.mode == "sha256":
+            return hashlib.sha256((self.salt + mac_address).encode()).hexdigest()
+
+        # Wireshark prints addresses in lower case and bleak in upper case, so they are made the same first.
+        normalised = mac_address.strip().lower().replace('-', ':')
+        return hashlib.blake2b(normalised.encode('utf-8'), key=self.salt_bytes, digest_size=16).hexdigest()
+
+    def cache_info(self):
+        """
+        :fn: cache_info
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: How well the cache is doing.
+        :return: Returns the hits, misses, maximum size and current size of the cache.
+        """
+        return self.cached_hash.cache_info()
@@ -0,0 +1,123 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module sends a node's documents to the ingest gateway, instead of each node holding its own connection to MongoDB.
+"""
+from bson import encode as bson_encode, decode as bson_decode
+from zlib import compress as zlib_compress, decompressobj
+
+# What the gateway accepts, each is stored by a different client on the server.
+GATEWAY_KINDS = ( "attendance", "summaries", "nodeEvents", "density" )
+
+def encode_payload(node_id: str, batches: dict) -> bytes:
+    """
+    :fn: encode_payload
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Packs documents for the gateway, BSON keeps the dates and object ids and zlib makes it small.
+    :param node_id: The node sending them, only used by the gateway for its counts.
+    :param batches: kind -> list of documents, kind is one of GATEWAY_KINDS
+    :return: Returns the compressed payload.
+    """
+    return zlib_compress(bson_encode({ "node_id": str(node_id), "batches": batches }))
+
+def decode_payload(payload: bytes, max_bytes: int) -> dict:
+    """
+    :fn: decode_payload
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Unpacks a payload from encode_payload()
+    :param payload: The compressed payload.
+    :param max_bytes: The most the payload may decompress to, so a small request can't use all the gateway's memory.
+    :return: Returns { "node_id": ..., "batches": { kind: [documents] } }
+    """
+    decompressor = decompressobj()
+    data = decompressor.decompress(payload, max_bytes)
+    if decompressor.unconsumed_tail:
+        raise ValueError(f"The payload is larger than {max_bytes} bytes once decompressed.")
+    return bson_decode(data)
+
+class GatewayClient:
+    """
+    :class: GatewayClient
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Posts batches of documents to the ingest gateway over HTTP.
+    """
+    def __init__(self, url: str, node_id: str, timeout: float = 10.0, token: str = ""):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the client, nothing is sent until send() is called.
+        :param url: The gateway's ingest url, e.g. "http://10.51.33.30:8470/ingest"
+        :param node_id: The node we are sending for.
+        :param timeout: How long to wait for the gateway, in seconds.
+        :param token: The shared token the gateway expects, empty if it doesn't check one.
+        """
+        self.url = url
+        self.node_id = node_id
+        self.timeout = timeout
+        self.token = token
+
+    def send(self, batches: dict):
+        """
+        :fn: send
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Sends documents to the gateway, which queues them and answers before they are written.
+        :param batches: kind -> list of documents, kind is one of GATEWAY_KINDS
+        :return: Raises an exception if the gateway didn't accept them, so a spool keeps them.
+        """
+        from urllib.request import Request, urlopen
+
+        # Nothing to send.
+        batches = { kind: documents for kind, documents in batches.items() if documents }
+        if not batches:
+            return
+
+        headers = { "Content-Type": "application/bson", "Content-Encoding": "deflate" }
+        if self.token:
+            headers["X-Gateway-Token"] = self.token
+
+        request = Request(self.url, data=encode_payload(self.node_id, batches), headers=headers, method="POST")
+
+        # Anything but a 2xx is raised as an HTTPError by urlopen.
+        with urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def get_filter(self, version: int) -> tuple | None:
+        """
+        :fn: get_filter
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Asks the gateway for a newer suspicious device filter, from "/filter" beside the ingest url.
+        :param version: The version the node holds, 0 if none.
+        :return: Returns (version, serialised filter), or None if the node's is the newest.
+        """
+        from urllib.parse import urljoin
+        from urllib.request import Request, urlopen
+
+        headers = dict()
+        if self.token:
+            headers["X-Gateway-Token"] = self.token
+
+        request = Request(f"{urljoin(self.url, 'filter')}?version={int(version)}", headers=headers, method="GET")
+
+        # 204 means there is nothing newer.
+        with urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+            if response.status == 204:
+                return None
+            return (int(response.headers["X-Filter-Version"]), body)
+
+    def sink(self, kind: str):
+        """
+        :fn: sink
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: A function that sends a list of documents of one kind, in place of a database client's insert function.
+        :param kind: One of GATEWAY_KINDS
+        :return: Returns the function.
+        """
+        return lambda documents: self.send({ kind: documents })
@@ -0,0 +1,158 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module parses large pcapng captures (or many ring buffer segments) across processes, using the native reader.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from src.node.DeviceHasher import DeviceHasher
+from src.node.PcapngReader import PcapngReader
+from src.structures.attendanceBatch import AttendanceBatch
+
+def parse_range(input_file: str, preamble: list[tuple], start: int, end: int, node_id: str, hash_mode: str, hash_salt: str, hash_cache_size: int) -> tuple:
+    """
+    :fn: parse_range
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Converts one range of a capture to attendance, this runs in a worker process.
+    :param input_file: The pcapng file.
+    :param preamble: The section header and interface blocks the range depends on, from PcapngReader.split_ranges()
+    :param start: The offset of the first block of the range.
+    :param end: The offset the range stops at.
+    :param node_id: The node that captured it.
+    :param hash_mode: The node's hash mode, so the device ids match a serial parse.
+    :param hash_salt: The node's hash salt.
+    :param hash_cache_size: How many MAC addresses the worker's hasher remembers.
+    :return: Returns (batch, total packets, skipped packets, hash seconds, hash CPU seconds)
+    """
+    hasher = DeviceHasher(mode=hash_mode, salt=hash_salt, cache_size=hash_cache_size)
+    reader = PcapngReader(input_file)
+
+    packets = AttendanceBatch()
+    for packet in reader.read_range(preamble, start, end):
+        signal = packet.signal
+        packets.append(
+            packet.sniff_time,                                  # Timestamp of the packet.
+            node_id,                                            # The node associated with this sniffer.
+            hasher.hash(packet.mac_address),                    # The hashed MAC Address.
+            None if signal is None else int(signal),            # DBM signal, might be None
+            packet.packet_type                                  # The type of packet (bluetooth/wifi/ethernet)
+        )
+    return (packets, reader.total_packets, reader.total_skipped, hasher.hash_seconds, hasher.hash_cpu_seconds)
+
+class ParallelReader:
+    """
+    :class: ParallelReader
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Splits captures at pcapng block boundaries, parses the parts in a process pool and merges them in timestamp order.
+    """
+    def __init__(self, node_id: str, hasher: DeviceHasher, workers: int = None, parts_per_worker: int = 4):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the reader, the pool is started for each read.
+        :param node_id: The node that captured the files.
+        :param hasher: The hasher whose mode and salt the workers copy, their hashing time is added to its worker_hash_seconds.
+        :param workers: How many processes to use, every core if None.
+        :param parts_per_worker: How many ranges each worker gets, more evens out ranges that parse slower.
+        """
+        self.node_id = node_id
+        self.hasher = hasher
+        self.workers = workers if workers is not None else (cpu_count() or 1)
+        self.parts_per_worker = parts_per_worker
+
+        # Counters of the last read, like PcapngReader's, and how long its workers spent hashing.
+        self.total_packets = 0
+        self.total_skipped = 0
+        self.hash_seconds = 0.0
+        self.hash_cpu_seconds = 0.0
+
+    def read_file(self, input_file: str) -> AttendanceBatch:
+        """
+        :fn: read_file
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Parses one capture in parallel.
+        :param input_file: The pcapng file.
+        :return: Returns the attendance of every packet with a source address, in timestamp order.
+        """
+        return self.read_files([ input_file ])
+
+    def read_files(self, input_files: list[str]) -> AttendanceBatch:
+        """
+        :fn: read_files
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Parses many captures (e.g. dumpcap ring segments) in parallel, large ones are split as well.
+        :param input_files: The pcapng files.
+        :return: Returns the attendance of every packet with a source address, in timestamp order.
+        """
+        # Split everything up front, so the pool is shared between the files.
+        parts = self.workers * self.parts_per_worker
+        tasks = []
+        for input_file in input_files:
+            for preamble, start, end in PcapngReader(input_file).split_ranges(parts):
+                tasks.append((input_file, preamble, start, end))
+
+        self.total_packets = 0
+        self.total_skipped = 0
+        self.hash_seconds = 0.0
+        self.hash_cpu_seconds = 0.0
+        packets = AttendanceBatch()
+        if not tasks:
+            return packets
+
+        hasher = self.hasher
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+            futures = [
+                pool.submit(parse_range, input_file, preamble, start, end, self.node_id, hasher.mode, hasher.salt, hasher.cache_size)
+                for input_file, preamble, start, end in tasks
+            ]
+
+            # Merged in the order they were split, so a capture that was already in order stays in order.
+            for future in futures:
+                batch, total, skipped, hash_seconds, hash_cpu_seconds = future.result()
+                packets.extend(batch)
+                self.total_packets += total
+                self.total_skipped += skipped
+                self.hash_seconds += hash_seconds
+                self.hash_cpu_seconds += hash_cpu_seconds
+
+        # Kept on the hasher as well, the node's loop metrics read it from there.
+        hasher.worker_hash_seconds += self.hash_seconds
+        hasher.worker_hash_cpu_seconds += self.hash_cpu_seconds
+
+        # Captures aren't always in order, nor are segments from different runs.
+        packets.sort_by_time()
+        return packets
+
+
+# Reprocesses archived captures, e.g. on the server.
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from time import perf_counter
+
+    parser = ArgumentParser(description="Parse pcapng captures across processes and optionally insert the attendance.")
+    parser.add_argument("input_files", nargs="+")
+    parser.add_argument("--node-id", required=True, help="The node that captured the files.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use, every core by default.")
+    parser.add_argument("--hash-mode", default="md5")
+    parser.add_argument("--hash-salt", default="")
+    parser.add_argument("--insert", help="A database login file, the attendance is inserted if given.")
+    arguments = parser.parse_args()
+
+    reader = ParallelReader(arguments.node_id, DeviceHasher(arguments.hash_mode, arguments.hash_salt), arguments.workers)
+
+    started = perf_counter()
+    packets = reader.read_files(arguments.input_files)
+    elapsed = perf_counter() - started
+    print(f"Parsed {reader.total_packets} packets ({len(packets)} with a source address) from {len(arguments.input_files)} files in {elapsed:.2f}s with {reader.workers} workers.")
+
+    if arguments.insert:
+        from src.database.Client import DatabaseClient
+
+        dbclient = DatabaseClient(arguments.insert)
+        dbclient.attendance_client.insert_many(packets)
@@ -0,0 +1,454 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module reads pcapng capture files without tshark, only decoding the header fields the node needs.
+"""
+from mmap import mmap, ACCESS_READ
+from struct import unpack_from
+
+from src.node.DecodedPacket import DecodedPacket
+from src.structures.PacketType import PacketType
+
+# pcapng block types.
+BLOCK_SECTION_HEADER   = 0x0A0D0D0A
+BLOCK_INTERFACE        = 0x00000001
+BLOCK_SIMPLE_PACKET    = 0x00000003
+BLOCK_ENHANCED_PACKET  = 0x00000006
+BYTE_ORDER_MAGIC       = 0x1A2B3C4D
+
+# Interface description options that change how timestamps are read.
+OPTION_END_OF_OPTIONS  = 0
+OPTION_IF_TSRESOL      = 9
+OPTION_IF_TSOFFSET     = 14
+
+# Link layer types (https://www.tcpdump.org/linktypes.html)
+LINKTYPE_ETHERNET              = 1
+LINKTYPE_IEEE802_11            = 105
+LINKTYPE_IEEE802_11_RADIOTAP   = 127
+LINKTYPE_BLUETOOTH_LE_LL       = 251
+LINKTYPE_BLUETOOTH_LE_LL_PHDR  = 256
+
+# The access address used by every bluetooth LE advertising packet.
+BTLE_ADVERTISING_ACCESS_ADDRESS = 0x8E89BED6
+
+class PcapngReader:
+    """
+    :class: PcapngReader
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Walks the blocks of a pcapng file, decoding the radiotap, 802.11, ethernet and bluetooth LE headers of each packet.
+    """
+    def __init__(self, input_file: str):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the reader, the file is not opened until we iterate over it.
+        :param input_file: The pcapng file to read.
+        """
+        self.input_file = input_file
+
+        # The byte order of the current section, "<" or ">"
+        self.endian = "<"
+
+        # The interfaces of the current section, each is (link type, timestamp units per second, timestamp offset)
+        self.interfaces = []
+
+        # Counters, how many packets were read and how many could not be used.
+        self.total_packets = 0
+        self.total_skipped = 0
+
+    def __iter__(self):
+        """
+        :fn: __iter__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Iterates over every decoded packet in the file.
+        :return: Returns a generator of decoded packets.
+        """
+        return self.read_packets()
+
+    def read_packets(self):
+        """
+        :fn: read_packets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads every packet in the file, packets without a source address are skipped.
+        :return: Returns a generator of decoded packets.
+        """
+        with open(self.input_file, 'rb') as file:
+            # An empty capture has nothing to map.
+            file.seek(0, 2)
+            if file.tell() == 0:
+                return
+
+            with mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield from self.read_blocks(view, 0, len(view))
+                finally:
+                    view.release()
+
+    def read_range(self, preamble: list[tuple], start: int, end: int):
+        """
+        :fn: read_range
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads the packets of one range from split_ranges(), its section and interface blocks are read first.
+        :param preamble: The (offset, length) of the section header and interface blocks the range depends on.
+        :param start: The offset of the first block of the range.
+        :param end: The offset the range stops at.
+        :return: Returns a generator of decoded packets.
+        """
+        with open(self.input_file, 'rb') as file:
+            with mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    # These only set up the byte order and interfaces, they have no packets.
+                    for offset, length in preamble:
+                        yield from self.read_blocks(view, offset, offset + length)
+                    yield from self.read_blocks(view, start, end)
+                finally:
+                    view.release()
+
+    def split_ranges(self, parts: int) -> list[tuple]:
+        """
+        :fn: split_ranges
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Splits the file at block boundaries into ranges of roughly the same size, only the block headers are read.
+        :param parts: How many ranges to aim for.
+        :return: Returns a list of (preamble, start, end), each can be read on its own by read_range()
+        """
+        ranges = []
+        with open(self.input_file, 'rb') as file:
+            file.seek(0, 2)
+            size = file.tell()
+            if size == 0:
+                return ranges
+
+            with mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+                target = max(size // max(parts, 1), 1)
+                endian = "<"
+
+                # The section header and interfaces of the current section, each range needs them.
+                preamble = []
+                range_start = 0
+                range_preamble = []
+
+                offset = 0
+                while offset + 12 <= size:
+                    block_type = unpack_from(endian + 'I', mapped, offset)[0]
+                    if block_type == BLOCK_SECTION_HEADER:
+                        endian = "<" if unpack_from('<I', mapped, offset + 8)[0] == BYTE_ORDER_MAGIC else ">"
+
+                    block_length = unpack_from(endian + 'I', mapped, offset + 4)[0]
+                    if block_length < 12 or offset + block_length > size:
+                        break
+
+                    # Start a new range at this block once the current one is big enough.
+                    if offset - range_start >= target:
+                        ranges.append((range_preamble, range_start, offset))
+                        range_start = offset
+                        range_preamble = list(preamble)
+
+                    # A new section forgets the interfaces before it.
+                    if block_type == BLOCK_SECTION_HEADER:
+                        preamble = [ (offset, block_length) ]
+                    elif block_type == BLOCK_INTERFACE:
+                        preamble.append((offset, block_length))
+
+                    offset += block_length
+
+                ranges.append((range_preamble, range_start, offset))
+        return ranges
+
+    def read_blocks(self, view: memoryview, start: int, end: int):
+        """
+        :fn: read_blocks
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Walks the blocks between two offsets, keeping track of section and interface blocks as they appear.
+        :param view: The bytes of the capture file.
+        :param start: The offset of the first block.
+        :param end: The offset to stop at.
+        :return: Returns a generator of decoded packets.
+        """
+        offset = start
+        while offset + 12 <= end:
+            # The section header is the same in either byte order, its length is not.
+            block_type = unpack_from(self.endian + 'I', view, offset)[0]
+            if block_type == BLOCK_SECTION_HEADER:
+                self.read_section_header(view, offset)
+
+            block_length = unpack_from(self.endian + 'I', view, offset + 4)[0]
+
+            # A truncated or broken block, the rest of the file can't be trusted.
+            if block_length < 12 or offset + block_length > end:
+                break
+
+            if block_type == BLOCK_ENHANCED_PACKET:
+                packet = self.read_enhanced_packet(view, offset)
+                self.total_packets += 1
+                if packet is None:
+                    self.total_skipped += 1
+                else:
+                    yield packet
+            elif block_type == BLOCK_INTERFACE:
+                self.read_interface(view, offset, block_length)
+
+            # Simple packet blocks have no timestamp, and every other block has nothing we need.
+            offset += block_length
+
+    def read_section_header(self, view: memoryview, offset: int):
+        """
+        :fn: read_section_header
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Starts a new section, the byte order can change and the interfaces are reset.
+        :param view: The bytes of the capture file.
+        :param offset: The offset of the section header block.
+        """
+        if unpack_from('<I', view, offset + 8)[0] == BYTE_ORDER_MAGIC:
+            self.endian = "<"
+        elif unpack_from('>I', view, offset + 8)[0] == BYTE_ORDER_MAGIC:
+            self.endian = ">"
+        else:
+            raise ValueError(f"\"{self.input_file}\" is not a pcapng file.")
+
+        self.interfaces = []
+
+    def read_interface(self, view: memoryview, offset: int, block_length: int):
+        """
+        :fn: read_interface
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads an interface description block, the link type and how its timestamps are stored.
+        :param view: The bytes of the capture file.
+        :param offset: The offset of the interface description block.
+        :param block_length: The total length of the block.
+        """
+        link_type = unpack_from(self.endian + 'H', view, offset + 8)[0]
+
+        # By default timestamps are in microseconds.
+        units_per_second = 1000000
+        timestamp_offset = 0
+
+        # Walk the options, they are padded to 4 bytes.
+        option_offset = offset + 16
+        options_end = offset + block_length - 4
+        while option_offset + 4 <= options_end:
+            code, length = unpack_from(self.endian + 'HH', view, option_offset)
+            value_offset = option_offset + 4
+
+            if code == OPTION_END_OF_OPTIONS:
+                break
+            elif code == OPTION_IF_TSRESOL and length >= 1:
+                resolution = view[value_offset]
+                # The high bit says if this is a power of 2 or a power of 10.
+                if resolution & 0x80:
+                    units_per_second = 2 ** (resolution & 0x7F)
+                else:
+                    units_per_second = 10 ** resolution
+            elif code == OPTION_IF_TSOFFSET and length >= 8:
+                timestamp_offset = unpack_from(self.endian + 'q', view, value_offset)[0]
+
+            option_offset = value_offset + ((length + 3) & ~3)
+
+        self.interfaces.append((link_type, units_per_second, timestamp_offset))
+
+    def read_enhanced_packet(self, view: memoryview, offset: int) -> DecodedPacket | None:
+        """
+        :fn: read_enhanced_packet
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads an enhanced packet block and decodes the packet inside it.
+        :param view: The bytes of the capture file.
+        :param offset: The offset of the enhanced packet block.
+        :return: Returns the decoded packet, or None if it has no source address.
+        """
+        interface_id, timestamp_high, timestamp_low, captured_length = unpack_from(self.endian + 'IIII', view, offset + 8)
+
+        # A packet for an interface we haven't seen, the file is broken.
+        if interface_id >= len(self.interfaces):
+            return None
+
+        link_type, units_per_second, timestamp_offset = self.interfaces[interface_id]
+        timestamp = ((timestamp_high << 32) | timestamp_low) / units_per_second + timestamp_offset
+
+        data_offset = offset + 28
+        data = view[data_offset:data_offset + captured_length]
+        return decode_packet(link_type, data, timestamp)
+
+
+def format_mac_address(data: memoryview, offset: int) -> str:
+    """
+    :fn: format_mac_address
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Formats 6 bytes as a MAC address, the same way wireshark does ("aa:bb:cc:dd:ee:ff").
+    :param data: The bytes of the packet.
+    :param offset: Where the address starts.
+    :return: Returns the formatted MAC address.
+    """
+    return data[offset:offset + 6].hex(':')
+
+
+def format_reversed_mac_address(data: memoryview, offset: int) -> str:
+    """
+    :fn: format_reversed_mac_address
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Formats 6 little endian bytes as a MAC address, bluetooth LE stores addresses backwards.
+    :param data: The bytes of the packet.
+    :param offset: Where the address starts.
+    :return: Returns the formatted MAC address.
+    """
+    return bytes(data[offset:offset + 6])[::-1].hex(':')
+
+
+def decode_packet(link_type: int, data: memoryview, timestamp: float) -> DecodedPacket | None:
+    """
+    :fn: decode_packet
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Decodes one packet, the same way the pyshark backend would pick its type, source address and signal.
+    :param link_type: The link type of the interface the packet was captured on.
+    :param data: The bytes of the packet.
+    :param timestamp: The time the packet was captured, in seconds since the epoch.
+    :return: Returns the decoded packet, or None if it has no source address.
+    """
+    if link_type == LINKTYPE_ETHERNET:
+        # Destination then source.
+        if len(data) < 12:
+            return None
+        return DecodedPacket(timestamp, PacketType.ETHERNET, format_mac_address(data, 6))
+
+    elif link_type == LINKTYPE_IEEE802_11_RADIOTAP:
+        return decode_radiotap(data, timestamp)
+
+    elif link_type == LINKTYPE_IEEE802_11:
+        mac_address = decode_80211_source(data, 0)
+        return None if mac_address is None else DecodedPacket(timestamp, PacketType.WIFI, mac_address)
+
+    elif link_type == LINKTYPE_BLUETOOTH_LE_LL:
+        mac_address = decode_btle_source(data, 0)
+        return None if mac_address is None else DecodedPacket(timestamp, PacketType.BLUETOOTH, mac_address)
+
+    elif link_type == LINKTYPE_BLUETOOTH_LE_LL_PHDR:
+        # 10 byte header, the signal is only there if the flags say it is.
+        if len(data) < 10:
+            return None
+        signal = unpack_from('<b', data, 1)[0]
+        flags = unpack_from('<H', data, 8)[0]
+        mac_address = decode_btle_source(data, 10)
+        if mac_address is None:
+            return None
+        return DecodedPacket(timestamp, PacketType.BLUETOOTH, mac_address, signal if (flags & 0x0002) else None)
+
+    # We don't know what we have.
+    return None
+
+
+def decode_radiotap(data: memoryview, timestamp: float) -> DecodedPacket | None:
+    """
+    :fn: decode_radiotap
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Reads the antenna signal from a radiotap header, then the source address of the 802.11 frame after it.
+    :param data: The bytes of the packet.
+    :param timestamp: The time the packet was captured, in seconds since the epoch.
+    :return: Returns the decoded packet, or None if it has no source address.
+    """
+    if len(data) < 8:
+        return None
+
+    header_length, present = unpack_from('<HI', data, 2)
+
+    # Skip any extra present words, the fields come after all of them.
+    field_offset = 8
+    present_word = present
+    while present_word & 0x80000000:
+        if field_offset + 4 > header_length:
+            return None
+        present_word = unpack_from('<I', data, field_offset)[0]
+        field_offset += 4
+
+    # Walk the fields before the antenna signal, each is aligned to its own size.
+    signal = None
+    if present & 0x20:
+        if present & 0x01:   # TSFT, 8 bytes aligned to 8
+            field_offset = ((field_offset + 7) & ~7) + 8
+        if present & 0x02:   # Flags, 1 byte
+            field_offset += 1
+        if present & 0x04:   # Rate, 1 byte
+            field_offset += 1
+        if present & 0x08:   # Channel, 4 bytes aligned to 2
+            field_offset = ((field_offset + 1) & ~1) + 4
+        if present & 0x10:   # FHSS, 2 bytes
+            field_offset += 2
+        if field_offset < header_length:
+            signal = unpack_from('<b', data, field_offset)[0]
+
+    mac_address = decode_80211_source(data, header_length)
+    if mac_address is None:
+        return None
+    return DecodedPacket(timestamp, PacketType.WIFI, mac_address, signal)
+
+
+def decode_80211_source(data: memoryview, offset: int) -> str | None:
+    """
+    :fn: decode_80211_source
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Gets the source address (wlan.sa) of an 802.11 frame, which address it is depends on the frame type and direction.
+    :param data: The bytes of the packet.
+    :param offset: Where the 802.11 frame starts.
+    :return: Returns the source address, or None for frames without one (e.g. control frames)
+    """
+    if len(data) < offset + 16:
+        return None
+
+    frame_type = (data[offset] >> 2) & 0x03
+    to_ds = data[offset + 1] & 0x01
+    from_ds = data[offset + 1] & 0x02
+
+    # Management frames, the source is always address 2.
+    if frame_type == 0:
+        return format_mac_address(data, offset + 10)
+
+    # Data frames, the source moves depending on the distribution system bits.
+    if frame_type == 2:
+        if not from_ds:
+            return format_mac_address(data, offset + 10)
+        if not to_ds:
+            if len(data) < offset + 22:
+                return None
+            return format_mac_address(data, offset + 16)
+        if len(data) < offset + 30:
+            return None
+        return format_mac_address(data, offset + 24)
+
+    # Control and extension frames don't have a source address.
+    return None
+
+
+def decode_btle_source(data: memoryview, offset: int) -> str | None:
+    """
+    :fn: decode_btle_source
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Gets the sending device's address from a bluetooth LE advertising channel packet.
+    :param data: The bytes of the packet.
+    :param offset: Where the link layer packet (the access address) starts.
+    :return: Returns the address, or None for data channel packets which don't carry one.
+    """
+    if len(data) < offset + 12:
+        return None
+
+    access_address = unpack_from('<I', data, offset)[0]
+    if access_address != BTLE_ADVERTISING_ACCESS_ADDRESS:
+        return None
+
+    # Every advertising PDU starts with the sender's address (AdvA, ScanA or InitA).
+    return format_reversed_mac_address(data, offset + 6)
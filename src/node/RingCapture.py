@@ -0,0 +1,196 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module runs dumpcap with a ring buffer, so the next capture segment is written while the last one is parsed.
+"""
+from json import load as json_load, dump as json_dump
+from os import listdir, makedirs, remove as file_remove, replace as file_replace
+from os.path import basename, dirname, exists as file_exists, join as path_join, splitext
+from subprocess import Popen, DEVNULL
+from time import time as time_now
+import re
+
+class RingCapture:
+    """
+    :class: RingCapture
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Keeps dumpcap writing segments, and tracks which segments have been processed by their run and sequence number.
+    """
+    def __init__(self, dumpcap_path: str, interface: str, output_file: str, segment_seconds: int, segment_files: int, state_file: str):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the ring capture, dumpcap is not started until start() is called.
+        :param dumpcap_path: The dumpcap (or tshark) executable.
+        :param interface: The network interface to capture packets on.
+        :param output_file: The capture file name, segments are named after it (e.g. capture_<run>_00001_<time>.pcapng)
+        :param segment_seconds: How many seconds each segment covers.
+        :param segment_files: How many segments dumpcap keeps before it overwrites the oldest.
+        :param state_file: The JSON file that remembers the last processed segment of each run.
+        """
+        self.dumpcap_path = dumpcap_path
+        self.interface = interface
+        self.segment_seconds = segment_seconds
+        self.segment_files = segment_files
+        self.state_file = state_file
+
+        # Segments are written next to the output file.
+        self.directory = dirname(output_file) or "."
+        self.stem, self.suffix = splitext(basename(output_file))
+        self.suffix = self.suffix or ".pcapng"
+
+        # dumpcap names each segment <prefix>_<sequence>_<YYYYmmddHHMMSS><suffix>, our prefix also has the run.
+        self.segment_pattern = re.compile(rf"^{re.escape(self.stem)}_(\d+)_(\d+)_(\d{{14}}){re.escape(self.suffix)}$")
+
+        # The run we are writing now, dumpcap restarts its sequence numbers each time it starts.
+        self.run_id = None
+        self.process = None
+
+        # The last processed sequence number of each run.
+        self.processed = self.load_state()
+
+    def load_state(self) -> dict:
+        """
+        :fn: load_state
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads which segments have been processed, so nothing is parsed twice after a crash.
+        :return: Returns a dictionary of run -> last processed sequence number.
+        """
+        if not file_exists(self.state_file):
+            return dict()
+
+        with open(self.state_file, 'r') as file:
+            state = json_load(file)
+        return { int(run): int(sequence) for run, sequence in state.get('runs', {}).items() }
+
+    def save_state(self):
+        """
+        :fn: save_state
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes which segments have been processed, replacing the file in one step so a crash can't leave half of it.
+        """
+        temporary_file = self.state_file + ".tmp"
+        with open(temporary_file, 'w') as file:
+            json_dump({ 'runs': { str(run): sequence for run, sequence in self.processed.items() } }, file)
+        file_replace(temporary_file, self.state_file)
+
+    def start(self):
+        """
+        :fn: start
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Starts dumpcap writing a new run of segments.
+        """
+        makedirs(self.directory, exist_ok=True)
+
+        self.run_id = int(time_now())
+        prefix_file = path_join(self.directory, f"{self.stem}_{self.run_id}{self.suffix}")
+
+        print(f"Ring capture over interface \"{self.interface}\", {self.segment_seconds} second segments placed in \"{self.directory}\"")
+        self.process = Popen([
+            self.dumpcap_path,
+            '-i', self.interface,
+            '-w', prefix_file,
+            '-F', 'pcapng',
+            '-b', f'duration:{self.segment_seconds}',
+            '-b', f'files:{self.segment_files}',
+            '-q'
+        ], stdout=DEVNULL, stderr=DEVNULL)
+
+    def stop(self):
+        """
+        :fn: stop
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stops dumpcap, the segment it was writing becomes complete.
+        """
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+
+    def is_running(self) -> bool:
+        """
+        :fn: is_running
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Is dumpcap still capturing?
+        :return: Returns true if dumpcap is running.
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def list_segments(self) -> list[tuple]:
+        """
+        :fn: list_segments
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Finds every segment on disk.
+        :return: Returns a sorted list of (run, sequence, path)
+        """
+        segments = []
+        for file_name in listdir(self.directory):
+            match = self.segment_pattern.match(file_name)
+            if match is not None:
+                segments.append((int(match.group(1)), int(match.group(2)), path_join(self.directory, file_name)))
+        segments.sort()
+        return segments
+
+    def completed_segments(self) -> list[tuple]:
+        """
+        :fn: completed_segments
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Finds the segments that dumpcap has finished with and we haven't processed, oldest first.
+        :return: Returns a list of (run, sequence, path)
+        """
+        segments = self.list_segments()
+
+        # The newest segment of the running capture is still being written.
+        if self.is_running():
+            newest = max((segment for segment in segments if segment[0] == self.run_id), default=None)
+            if newest is not None:
+                segments.remove(newest)
+
+        completed = []
+        for run, sequence, path in segments:
+            last_processed = self.processed.get(run, 0)
+
+            # Processed, but we crashed before it was removed.
+            if sequence <= last_processed:
+                file_remove(path)
+                continue
+
+            completed.append((run, sequence, path))
+        return completed
+
+    def mark_processed(self, run: int, sequence: int, path: str):
+        """
+        :fn: mark_processed
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Remembers that a segment has been processed, then removes it.
+        :param run: The run the segment belongs to.
+        :param sequence: The sequence number of the segment.
+        :param path: The segment file.
+        """
+        # If dumpcap overwrote segments before we got to them, say so.
+        last_processed = self.processed.get(run, 0)
+        if sequence > last_processed + 1:
+            print(f"Warning: ring capture segments {last_processed + 1} to {sequence - 1} of run {run} were overwritten before they were processed.")
+
+        self.processed[run] = sequence
+
+        # Forget runs that have nothing left on disk, apart from the one we're writing.
+        runs_on_disk = { segment[0] for segment in self.list_segments() }
+        for old_run in list(self.processed):
+            if old_run != run and old_run != self.run_id and old_run not in runs_on_disk:
+                del self.processed[old_run]
+
+        self.save_state()
+
+        if file_exists(path):
+            file_remove(path)
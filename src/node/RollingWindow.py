@@ -0,0 +1,104 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module remembers which devices were seen within the last few minutes, forgetting them without looking at every device.
+"""
+from heapq import heappush, heappop
+
+class RollingWindow:
+    """
+    :class: RollingWindow
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Keeps when each device was last seen, with the devices grouped by that second so expiring only touches the devices that expired.
+    """
+    def __init__(self, window_seconds: int):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty window.
+        :param window_seconds: How long a device is remembered after it was last seen.
+        """
+        self.window_seconds = window_seconds
+
+        # device -> the epoch second it was last seen
+        self.last_seen = dict()
+
+        # epoch second -> the devices last seen in it, and a heap of those seconds so the oldest is found first.
+        self.buckets = dict()
+        self.bucket_heap = []
+
+    def __len__(self) -> int:
+        """
+        :fn: __len__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: How many devices are in the window.
+        :return: Returns the number of distinct devices.
+        """
+        return len(self.last_seen)
+
+    def __contains__(self, device_id: str) -> bool:
+        """
+        :fn: __contains__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Is a device in the window?
+        :param device_id: The device.
+        :return: Returns true if the device hasn't expired.
+        """
+        return device_id in self.last_seen
+
+    def touch(self, device_id: str, epoch: int):
+        """
+        :fn: touch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Records that a device was seen.
+        :param device_id: The device.
+        :param epoch: When it was seen, in whole seconds.
+        """
+        previous = self.last_seen.get(device_id)
+
+        # Already seen this second (or later, if the clock stepped back), nothing moves.
+        if previous is not None and previous >= epoch:
+            return
+
+        # Take it out of the second it was last seen in.
+        if previous is not None:
+            bucket = self.buckets[previous]
+            bucket.discard(device_id)
+            if not bucket:
+                del self.buckets[previous]
+
+        # And put it in this second, starting the second if it's new.
+        bucket = self.buckets.get(epoch)
+        if bucket is None:
+            bucket = self.buckets[epoch] = set()
+            heappush(self.bucket_heap, epoch)
+        bucket.add(device_id)
+
+        self.last_seen[device_id] = epoch
+
+    def expire(self, now_epoch: int) -> int:
+        """
+        :fn: expire
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Forgets every device last seen before the window.
+        :param now_epoch: The current time, in whole seconds.
+        :return: Returns how many devices were forgotten.
+        """
+        cutoff = now_epoch - self.window_seconds
+        expired = 0
+
+        while self.bucket_heap and self.bucket_heap[0] < cutoff:
+            second = heappop(self.bucket_heap)
+
+            # The second may already be gone if all of its devices were seen again.
+            for device_id in self.buckets.pop(second, ()):
+                del self.last_seen[device_id]
+                expired += 1
+
+        return expired
@@ -8,7 +8,12 @@ from pyshark import LiveCapture, FileCapture
 from pyshark.packet.packet import Packet
 from pyshark.capture.capture import TSharkCrashException
 from src.structures.attendance import Attendance
+from src.structures.attendanceSummary import AttendanceSummary
+from src.structures.attendanceBatch import AttendanceBatch, from_epoch
+from src.structures.density import Density
 from src.structures.PacketType import PacketType
+from src.node.DecodedPacket import DecodedPacket
+from src.node.DeviceHasher import DeviceHasher
 
 class Sniffer:
     """
@@ -74,6 +79,59 @@ class Sniffer:
         self.use_timeout         = bool(config['use_timeout'])
         self.default_timeout     = int (config["timeout"])
 
+        # What reads the capture file, "pyshark" dissects with tshark, "native" decodes the headers in python, "fields" uses tshark's field output.
+        self.parser_backend      = str (config.get('parser_backend', 'pyshark'))
+
+        # The "native" backend splits captures at least this big across this many processes.
+        self.parse_workers        = int(config.get('parse_workers', 1))
+        self.parse_parallel_bytes = int(config.get('parse_parallel_bytes', 64 * 1024 * 1024))
+
+        # The "fields" backend needs tshark itself, tshark_path is often dumpcap.
+        self.fields_tshark_path  = str (config.get('fields_tshark_path', 'tshark'))
+
+        # How MAC addresses become device ids, "md5" keeps the ids this node has always made.
+        # BleSniffer nodes given the same "blake2b" salt will make the same ids for the same device.
+        self.device_hasher = DeviceHasher(
+            mode=str(config.get('hash_mode', 'md5')),
+            salt=str(config.get('hash_salt', '')),
+            cache_size=int(config.get('hash_cache_size', 4096))
+        )
+
+        # Collapse packets into one summary per device, per 30 minutes, before they are uploaded.
+        self.summarise_before_upload = bool(config.get('summarise_before_upload', False))
+
+        # Keep captures on disk until the database has them, an empty directory sends them straight to the database.
+        self.spool_directory     = str(config.get('spool_directory', ''))
+        self.spool_segment_bytes = int(config.get('spool_segment_bytes', 4 * 1024 * 1024))
+        self.spool_max_bytes     = int(config.get('spool_max_bytes', 256 * 1024 * 1024))
+        self.spool_flush_batch   = int(config.get('spool_flush_batch', 5000))
+
+        # Send to the ingest gateway instead of MongoDB, an empty url connects to MongoDB directly.
+        self.gateway_url         = str  (config.get('gateway_url', ''))
+        self.gateway_timeout     = float(config.get('gateway_timeout', 10.0))
+        self.gateway_token       = str  (config.get('gateway_token', ''))
+
+        # Drop the devices the server finds suspicious before uploading, asking for its newest filter this often. 0 uploads every device.
+        self.filter_refresh_seconds = float(config.get('filter_refresh_seconds', 0))
+        self.filter_cache_file      = str  (config.get('filter_cache_file', './data/node/filter.bson'))
+
+        # How the node captures, "file" writes a capture file and reads it back, "stream" converts packets as they arrive,
+        # "ring" keeps dumpcap writing segments while the last one is read.
+        self.capture_mode        = str (config.get('capture_mode', 'file'))
+
+        # Ring buffer options, how long each segment is, how many dumpcap keeps and where processed segments are remembered.
+        self.ring_segment_seconds = int(config.get('ring_segment_seconds', self.default_timeout))
+        self.ring_segment_files   = int(config.get('ring_segment_files', 10))
+        self.ring_state_file      = str(config.get('ring_state_file', './data/captures/ring_state.json'))
+
+        # Streaming options, how big a batch is, how many batches can queue up and how long a partial batch can wait.
+        self.stream_batch_size    = int  (config.get('stream_batch_size', 500))
+        self.stream_queue_batches = int  (config.get('stream_queue_batches', 4))
+        self.stream_flush_seconds = float(config.get('stream_flush_seconds', 5.0))
+
+        # How many loops of timing metrics the node keeps in memory.
+        self.metrics_history      = int  (config.get('metrics_history', 60))
+
     def __del__(self):
         """
         :fn: __del__
@@ -87,6 +145,9 @@ class Sniffer:
         # If we have a file capture instance, stop it.
         if hasattr(self, 'file_capture'):
             self.file_capture.close()
+        # If we have a streaming capture instance, stop it.
+        if getattr(self, 'stream_capture', None) is not None:
+            self.stream_capture.close()
 
     def start_tshark(self, interface: str, output_file: str):
         """
@@ -170,7 +231,87 @@ class Sniffer:
             # We have finished capturing packets, return to the function that called this.
             self.capture.close()
            
-    def get_packets_from_file(self, output_file: str = None)-> list[Attendance]:
+    def create_ring_capture(self):
+        """
+        :fn: create_ring_capture
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates a ring buffer capture from this sniffer's config.
+        :return: Returns the ring capture, it has not been started.
+        """
+        from src.node.RingCapture import RingCapture
+
+        return RingCapture(
+            self.tshark_path,
+            self.interface,
+            self.output_file,
+            self.ring_segment_seconds,
+            self.ring_segment_files,
+            self.ring_state_file
+        )
+
+    def stream_packets(self, packet_queue, stop_event):
+        """
+        :fn: stream_packets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Captures packets continuously, placing each packet in a queue as soon as it arrives. Nothing is written to a file.
+        :param packet_queue: The bounded queue that packets are placed in, this blocks when the queue is full.
+        :param stop_event: The event that tells the capture to stop.
+        """
+        print(f"Streaming packets over interface \"{self.interface}\"")
+
+        # tshark's field output is already decoded, so it skips pyshark entirely.
+        if self.parser_backend == "fields":
+            from src.node.TsharkFieldsReader import TsharkFieldsReader
+            packets = TsharkFieldsReader(self.fields_tshark_path).read_live(self.interface)
+            try:
+                self.put_packets(packets, packet_queue, stop_event)
+            finally:
+                packets.close()
+            return
+
+        # The capture is created on this thread, as pyshark needs an event loop on the thread that uses it.
+        self.stream_capture = LiveCapture(
+            interface=self.interface,
+            tshark_path=self.tshark_path,
+            use_json=self.use_json
+        )
+
+        if self.debug_mode:
+            self.stream_capture.set_debug()
+
+        try:
+            self.put_packets(self.stream_capture.sniff_continuously(), packet_queue, stop_event)
+        finally:
+            self.stream_capture.close()
+            self.stream_capture = None
+
+    def put_packets(self, packets, packet_queue, stop_event):
+        """
+        :fn: put_packets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Places each packet in the queue as it arrives, until we are told to stop.
+        :param packets: An iterable of packets from the capture.
+        :param packet_queue: The bounded queue that packets are placed in, this blocks when the queue is full.
+        :param stop_event: The event that tells the capture to stop.
+        """
+        from queue import Full
+
+        for packet in packets:
+            # Wait for space in the queue, but give up if we've been told to stop.
+            while not stop_event.is_set():
+                try:
+                    packet_queue.put(packet, timeout=0.5)
+                    break
+                except Full:
+                    pass
+
+            if stop_event.is_set():
+                break
+
+    def get_packets_from_file(self, output_file: str = None)-> AttendanceBatch:
         """
         :fn: get_packets_from_file
         :date: 27/08/2025
@@ -178,36 +319,136 @@ class Sniffer:
         :brief: Gets the list of packets from a previously defined output file
         :param output_file: The file to read the captured packets from.
         """
-        if True:
+        # If the output file is not defined, use the one defined in the constructor
+        if output_file is None:
+            output_file = self.output_file
+
+        # Decode the file ourselves, without starting tshark.
+        if self.parser_backend == "native":
+            return self.get_packets_from_file_native(output_file)
+
+        # Only ask tshark for the columns we need.
+        if self.parser_backend == "fields":
+            return self.get_packets_from_file_fields(output_file)
+
+        # Create the file capture instance
+        self.file_capture = FileCapture(
+            input_file=output_file, 
+            #use_json=True, 
+            #include_raw=True, 
+            tshark_path=self.tshark_path)
+        
+        # Load the packets into the program, if not activated the packets won't be read.
+        self.file_capture.load_packets()
 
-            # If the output file is not defined, use the one defined in the constructor
-            if output_file is None:
-                output_file = self.output_file
+        packets = AttendanceBatch()
+        for packet in self.file_capture:
+            # get the attendance instance of this packet...
+            packets.append_attendance(self.convert_packet_to_attendance(packet))
+        return packets
 
-            # Create the file capture instance
-            self.file_capture = FileCapture(
-                input_file=output_file, 
-                #use_json=True, 
-                #include_raw=True, 
-                tshark_path=self.tshark_path)
-            
-            # Load the packets into the program, if not activated the packets won't be read.
-            self.file_capture.load_packets()
-
-            len_file_capture = len(self.file_capture)
-            packets = [ 0 ] * len_file_capture
-            i = 0
-            for packet in self.file_capture:
-                # get the attendance instance of this packet...
-                attendance = self.convert_packet_to_attendance(packet)
-
-                # If we have space in the array, use it, otherwise append.
-                if i < len_file_capture:
-                    packets[i] = attendance
-                else:
-                    packets.append(attendance)
-                i += 1
-            return packets
+    def get_packets_from_file_native(self, output_file: str) -> AttendanceBatch:
+        """
+        :fn: get_packets_from_file_native
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the list of packets from a capture file, using the python pcapng reader instead of tshark.
+        :param output_file: The file to read the captured packets from.
+        :return: Returns the attendance of every packet with a source address.
+        """
+        from src.node.PcapngReader import PcapngReader
+        from os.path import getsize as file_size
+
+        # Large captures (e.g. a backfill) are split across processes.
+        if self.parse_workers > 1 and file_size(output_file) >= self.parse_parallel_bytes:
+            from src.node.ParallelReader import ParallelReader
+
+            reader = ParallelReader(self.node_id, self.device_hasher, self.parse_workers)
+            packets = reader.read_file(output_file)
+        else:
+            reader = PcapngReader(output_file)
+            packets = AttendanceBatch()
+            for packet in reader:
+                self.append_decoded_to_batch(packets, packet)
+
+        if reader.total_skipped > 0:
+            print(f"Skipped {reader.total_skipped} of {reader.total_packets} packets without a source address.")
+        return packets
+
+    def get_packets_from_file_fields(self, output_file: str) -> AttendanceBatch:
+        """
+        :fn: get_packets_from_file_fields
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gets the list of packets from a capture file, reading tshark's field output instead of full dissections.
+        :param output_file: The file to read the captured packets from.
+        :return: Returns the attendance of every packet with a source address.
+        """
+        from src.node.TsharkFieldsReader import TsharkFieldsReader
+
+        reader = TsharkFieldsReader(self.fields_tshark_path)
+        packets = AttendanceBatch()
+        for packet in reader.read_file(output_file):
+            self.append_decoded_to_batch(packets, packet)
+
+        if reader.total_skipped > 0:
+            print(f"Skipped {reader.total_skipped} of {reader.total_packets} packets without a source address.")
+        return packets
+
+    def summarise_attendance(self, packets: AttendanceBatch | list[Attendance]) -> list[AttendanceSummary]:
+        """
+        :fn: summarise_attendance
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Collapses attendance records into one summary per device, per 30 minutes, the same grouping the server's squash uses.
+        :param packets: The attendance records to collapse.
+        :return: Returns the summaries, one per (30 minute period, device)
+        """
+        if isinstance(packets, AttendanceBatch):
+            return self.summarise_batch(packets)
+
+        summaries = dict()
+
+        for attendance in packets:
+            # The same 30 minute buckets the server uses.
+            timestamp = Density.roundToLast30Minutes(attendance.timestamp)
+            key = (timestamp, attendance.device_id)
+
+            summary = summaries.get(key)
+            if summary is None:
+                summary = AttendanceSummary(timestamp, attendance.node_id, attendance.device_id, attendance.packet_type)
+                summaries[key] = summary
+            summary.add(attendance)
+
+        return list(summaries.values())
+
+    def summarise_batch(self, packets: AttendanceBatch) -> list[AttendanceSummary]:
+        """
+        :fn: summarise_batch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Collapses a batch into one summary per device, per 30 minutes, reading its columns directly.
+        :param packets: The batch to collapse.
+        :return: Returns the summaries, one per (30 minute period, device)
+        """
+        summaries = dict()
+
+        # 30 minutes are 1800 seconds, so the bucket is found without building a datetime per packet.
+        timestamps, device_index = packets.timestamps, packets.device_index
+        length = len(packets)
+        i = 0
+        while i < length:
+            seconds = timestamps[i]
+            key = (int(seconds // 1800), device_index[i])
+
+            summary = summaries.get(key)
+            if summary is None:
+                summary = AttendanceSummary(from_epoch(key[0] * 1800), packets.get_node_id(i), packets.get_device_id(i), PacketType(packets.packet_types[i]))
+                summaries[key] = summary
+            summary.add_packet(from_epoch(seconds), packets.get_strength(i))
+            i += 1
+
+        return list(summaries.values())
 
     def is_packet_bluetooth(self, packet: Packet) -> bool:
         """
@@ -252,7 +493,7 @@ class Sniffer:
         packet_type = self.get_packet_type(packet)
 
         if packet_type is PacketType.BLUETOOTH:
-            return packet.blte.src # Bluetooth Source
+            return packet.btle.advertising_address # Bluetooth Source
         elif packet_type is PacketType.ETHERNET:
             return packet.eth.src # Ethernet Source
         elif packet_type is PacketType.WIFI:
@@ -290,19 +531,68 @@ class Sniffer:
         :brief: Converts a packet to an attendance record, suitable for database insertion.
         :param output_file: The file to read the captured packets from.
         """
-        # Hashing algorithm...
-        from hashlib import md5 as hash_md5
+        # Packets from the "fields" backend are already decoded.
+        if isinstance(packet, DecodedPacket):
+            return self.convert_decoded_to_attendance(packet)
 
         # Packet information 
         packet_type = self.get_packet_type(packet)
         raw_mac_addr = self.get_packet_mac_address(packet)
-        utf_mac_addr = raw_mac_addr.encode('utf-8')
-        hashed_mac_addr = str(hash_md5(utf_mac_addr).hexdigest())
         signal = self.get_signal(packet)
+
+        return self.create_attendance(packet.sniff_time, packet_type, raw_mac_addr, signal)
+
+    def convert_decoded_to_attendance(self, packet: DecodedPacket) -> Attendance:
+        """
+        :fn: convert_decoded_to_attendance
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts a packet from the python pcapng reader to an attendance record.
+        :param packet: The decoded packet.
+        :return: Returns the attendance record.
+        """
+        return self.create_attendance(packet.sniff_time, packet.packet_type, packet.mac_address, packet.signal)
+
+    def append_decoded_to_batch(self, packets: AttendanceBatch, packet: DecodedPacket):
+        """
+        :fn: append_decoded_to_batch
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Hashes the MAC address of a decoded packet and adds it to a batch, no Attendance object is made.
+        :param packets: The batch to add to.
+        :param packet: The decoded packet.
+        """
+        signal = packet.signal
+        packets.append(
+            packet.sniff_time,                                  # Timestamp of the packet.
+            self.node_id,                                       # The node associated with this sniffer.
+            self.device_hasher.hash(packet.mac_address),        # The hashed MAC Address.
+            None if signal is None else int(signal),            # DBM signal, might be None
+            packet.packet_type                                  # The type of packet (bluetooth/wifi/ethernet)
+        )
+
+    def create_attendance(self, sniff_time, packet_type: PacketType, raw_mac_addr: str, signal) -> Attendance:
+        """
+        :fn: create_attendance
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Hashes the MAC address and creates the attendance record, whichever backend read the packet.
+        :param sniff_time: The time the packet was captured.
+        :param packet_type: The type of packet (bluetooth/wifi/ethernet)
+        :param raw_mac_addr: The MAC address of the sender, this is hashed before it is stored.
+        :param signal: The signal strength, might be None
+        :return: Returns the attendance record.
+        """
+        # The same few hundred addresses repeat, so this is usually a cache lookup.
+        hashed_mac_addr = self.device_hasher.hash(raw_mac_addr)
+
+        # Dissected fields come back as strings, the database wants a number.
+        if signal is not None:
+            signal = int(signal)
         
         # This is our attendance record
         attendance_record = Attendance(
-            packet.sniff_time, # Timestamp, if we have a packet timestamp, use it.
+            sniff_time,        # Timestamp, if we have a packet timestamp, use it.
             self.node_id,      # Node ID, if we have a node associated with this sniffer, add it.
             hashed_mac_addr,   # If the Packet has a MAC Address, add it.
             signal,            # DBM signal, might be None
@@ -0,0 +1,382 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module keeps captured documents on the node's disk until the database has them, so nothing is lost while MongoDB is unreachable.
+"""
+from json import load as json_load, dump as json_dump
+from os import listdir, makedirs, fsync, remove as file_remove, replace as file_replace
+from os.path import basename, exists as file_exists, getsize, join as path_join
+from struct import pack, unpack_from, calcsize
+from threading import Lock, Thread, Event
+from zlib import crc32
+
+from bson import encode as bson_encode, decode as bson_decode
+
+from src.database.ProtoClient import PERMANENT_WRITE_ERRORS
+
+# Every record is its length, a checksum of the document, then the BSON document.
+RECORD_HEADER = '<II'
+RECORD_HEADER_SIZE = calcsize(RECORD_HEADER)
+SEGMENT_SUFFIX = '.spool'
+
+class Spool:
+    """
+    :class: Spool
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: An append-only queue of documents, stored as numbered segment files with a saved read position.
+    """
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, max_bytes: int = 256 * 1024 * 1024):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Opens (or creates) a spool, any half written record from a crash is cut off.
+        :param directory: The folder the segments are kept in, one folder per spool.
+        :param segment_bytes: How big a segment gets before a new one is started.
+        :param max_bytes: The most the spool can hold, the oldest segments are dropped past this.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.offset_file = path_join(directory, 'offset.json')
+
+        # The writer and the flusher share the files.
+        self.lock = Lock()
+
+        # Set whenever something is appended, so the flusher doesn't have to poll.
+        self.appended = Event()
+
+        makedirs(directory, exist_ok=True)
+
+        # Where the flusher has been acknowledged up to, (segment, byte offset)
+        self.read_position = self.load_offset()
+
+        # Continue writing the newest segment, after cutting off anything a crash left half written.
+        segments = self.list_segments()
+        self.write_segment = segments[-1] if segments else self.read_position[0]
+        self.repair_segment(self.write_segment)
+        self.write_file = open(self.segment_path(self.write_segment), 'ab')
+
+    def segment_path(self, segment: int) -> str:
+        """
+        :fn: segment_path
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The file name of a segment.
+        :param segment: The segment number.
+        :return: Returns the path of the segment.
+        """
+        return path_join(self.directory, f"{segment:010d}{SEGMENT_SUFFIX}")
+
+    def list_segments(self) -> list[int]:
+        """
+        :fn: list_segments
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Finds the segments on disk.
+        :return: Returns the sorted segment numbers.
+        """
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def load_offset(self) -> tuple:
+        """
+        :fn: load_offset
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads the last acknowledged position, so a restart carries on from there.
+        :return: Returns (segment, byte offset)
+        """
+        if not file_exists(self.offset_file):
+            segments = self.list_segments()
+            return (segments[0] if segments else 0, 0)
+
+        with open(self.offset_file, 'r') as file:
+            offset = json_load(file)
+        return (int(offset['segment']), int(offset['offset']))
+
+    def save_offset(self):
+        """
+        :fn: save_offset
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes the acknowledged position, replacing the file in one step.
+        """
+        temporary_file = self.offset_file + '.tmp'
+        with open(temporary_file, 'w') as file:
+            json_dump({ 'segment': self.read_position[0], 'offset': self.read_position[1] }, file)
+            file.flush()
+            fsync(file.fileno())
+        file_replace(temporary_file, self.offset_file)
+
+    def repair_segment(self, segment: int):
+        """
+        :fn: repair_segment
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Cuts a segment off after its last complete record.
+        :param segment: The segment number.
+        """
+        path = self.segment_path(segment)
+        if not file_exists(path):
+            return
+
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        end = 0
+        while end + RECORD_HEADER_SIZE <= len(data):
+            length, checksum = unpack_from(RECORD_HEADER, data, end)
+            record_end = end + RECORD_HEADER_SIZE + length
+            if record_end > len(data) or crc32(data[end + RECORD_HEADER_SIZE:record_end]) != checksum:
+                break
+            end = record_end
+
+        if end < len(data):
+            print(f"Warning: spool segment {segment} had {len(data) - end} bytes of a half written record, removing them.")
+            with open(path, 'r+b') as file:
+                file.truncate(end)
+
+    def append(self, documents: list[dict]):
+        """
+        :fn: append
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds documents to the end of the spool, they are on disk (fsync) when this returns.
+        :param documents: The documents to keep until the database has them.
+        """
+        if len(documents) < 1:
+            return
+
+        # Encode before taking the lock, so the flusher isn't held up.
+        records = [ 0 ] * len(documents)
+        i = 0
+        for document in documents:
+            encoded = bson_encode(document)
+            records[i] = pack(RECORD_HEADER, len(encoded), crc32(encoded)) + encoded
+            i += 1
+
+        with self.lock:
+            for record in records:
+                # Start a new segment once this one is big enough.
+                if self.write_file.tell() >= self.segment_bytes:
+                    self.roll_segment()
+                self.write_file.write(record)
+
+            # One fsync for the whole batch.
+            self.write_file.flush()
+            fsync(self.write_file.fileno())
+
+            self.enforce_size_cap()
+
+        self.appended.set()
+
+    def roll_segment(self):
+        """
+        :fn: roll_segment
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Closes the current segment and starts the next one. The lock must be held.
+        """
+        self.write_file.flush()
+        fsync(self.write_file.fileno())
+        self.write_file.close()
+
+        self.write_segment += 1
+        self.write_file = open(self.segment_path(self.write_segment), 'ab')
+
+    def enforce_size_cap(self):
+        """
+        :fn: enforce_size_cap
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Drops the oldest segments if the spool is bigger than its cap. The lock must be held.
+        """
+        segments = self.list_segments()
+        total_bytes = sum(getsize(self.segment_path(segment)) for segment in segments)
+
+        for segment in segments:
+            # Never drop the segment we are writing.
+            if total_bytes <= self.max_bytes or segment == self.write_segment:
+                break
+
+            size = getsize(self.segment_path(segment))
+            print(f"Warning: the spool is over {self.max_bytes} bytes, dropping segment {segment} ({size} bytes) that never reached the database.")
+            file_remove(self.segment_path(segment))
+            total_bytes -= size
+
+            # If we were part way through it, carry on from the next segment.
+            if self.read_position[0] <= segment:
+                self.read_position = (segment + 1, 0)
+                self.save_offset()
+
+    def read(self, max_records: int) -> tuple:
+        """
+        :fn: read
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads documents after the acknowledged position, nothing is removed until acknowledge() is called.
+        :param max_records: The most documents to read.
+        :return: Returns (documents, position), pass the position to acknowledge() once the documents are stored.
+        """
+        documents = []
+
+        with self.lock:
+            segment, offset = self.read_position
+
+            while len(documents) < max_records and segment <= self.write_segment:
+                path = self.segment_path(segment)
+                data = b''
+                if file_exists(path):
+                    with open(path, 'rb') as file:
+                        file.seek(offset)
+                        data = file.read()
+
+                position = 0
+                while len(documents) < max_records and position + RECORD_HEADER_SIZE <= len(data):
+                    length, checksum = unpack_from(RECORD_HEADER, data, position)
+                    record_end = position + RECORD_HEADER_SIZE + length
+                    encoded = data[position + RECORD_HEADER_SIZE:record_end]
+
+                    # A damaged record, nothing after it in this segment can be trusted.
+                    if record_end > len(data) or crc32(encoded) != checksum:
+                        print(f"Warning: spool segment {segment} is damaged at byte {offset + position}, skipping the rest of it.")
+                        position = len(data)
+                        if segment == self.write_segment:
+                            self.roll_segment()
+                        break
+
+                    documents.append(bson_decode(encoded))
+                    position = record_end
+                offset += position
+
+                # Stop here if we filled up, or this is the segment still being written.
+                if len(documents) >= max_records or segment == self.write_segment:
+                    break
+
+                segment, offset = segment + 1, 0
+
+        return documents, (segment, offset)
+
+    def acknowledge(self, position: tuple):
+        """
+        :fn: acknowledge
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Marks everything before a position as stored, and removes segments that are finished with.
+        :param position: The position returned by read()
+        """
+        with self.lock:
+            self.read_position = position
+            self.save_offset()
+
+            for segment in self.list_segments():
+                if segment < position[0] and segment != self.write_segment:
+                    file_remove(self.segment_path(segment))
+
+    def pending_bytes(self) -> int:
+        """
+        :fn: pending_bytes
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Roughly how much is waiting to be sent.
+        :return: Returns the bytes after the acknowledged position.
+        """
+        with self.lock:
+            total_bytes = 0
+            for segment in self.list_segments():
+                if segment >= self.read_position[0]:
+                    total_bytes += getsize(self.segment_path(segment))
+            return total_bytes - self.read_position[1]
+
+    def close(self):
+        """
+        :fn: close
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Closes the segment being written.
+        """
+        with self.lock:
+            self.write_file.close()
+
+
+class SpoolFlusher(Thread):
+    """
+    :class: SpoolFlusher
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: A background thread that drains a spool into the database, waiting longer between tries while the database is down.
+    """
+    def __init__(self, spool: Spool, sink, batch_size: int = 5000, interval: float = 2.0, max_backoff: float = 60.0):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the flusher, call start() to run it.
+        :param spool: The spool to drain.
+        :param sink: A function that stores a list of documents, it should raise if they weren't stored.
+        :param batch_size: The most documents sent in one write.
+        :param interval: How long to wait when the spool is empty.
+        :param max_backoff: The longest wait between tries while the sink is failing.
+        """
+        super().__init__(name=f"spool-flusher-{basename(spool.directory)}", daemon=True)
+        self.spool = spool
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.stop_event = Event()
+
+    def run(self):
+        """
+        :fn: run
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Sends batches until stopped, a full batch is followed straight away by the next so a backlog drains quickly.
+        """
+        from pymongo.errors import BulkWriteError
+
+        backoff = self.interval
+
+        while not self.stop_event.is_set():
+            documents, position = self.spool.read(self.batch_size)
+
+            # Nothing to send, wait for the next append.
+            if len(documents) < 1:
+                self.spool.appended.wait(self.interval)
+                self.spool.appended.clear()
+                continue
+
+            try:
+                self.sink(documents)
+            except BulkWriteError as e:
+                # Only documents that will fail the same way again are left, so they are dropped like write_chunk() does.
+                # Otherwise the batch is sent again, summaries already merged aren't merged twice.
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') not in PERMANENT_WRITE_ERRORS for error in errors):
+                    print(f"[Spool] Flush of {len(documents)} documents partly failed, trying again in {backoff:.0f}s: {len(errors)} not written")
+                    self.stop_event.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                for error in errors:
+                    print(f"[Spool] Dropping a document that can't be written: {error.get('errmsg')}")
+            except Exception as e:
+                print(f"[Spool] Flush of {len(documents)} documents failed, trying again in {backoff:.0f}s: {e}")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            self.spool.acknowledge(position)
+            backoff = self.interval
+
+    def stop(self, timeout: float = 10.0):
+        """
+        :fn: stop
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stops the flusher, anything not sent stays in the spool for next time.
+        :param timeout: How long to wait for a write in progress.
+        """
+        self.stop_event.set()
+        self.spool.appended.set()
+        self.join(timeout)
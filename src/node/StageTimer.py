@@ -0,0 +1,202 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module times each stage of a node's loop, and keeps the last few loops so we can see which stage holds a node back.
+"""
+from collections import deque
+from time import perf_counter, process_time
+
+def peak_rss_kb() -> int:
+    """
+    :fn: peak_rss_kb
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: The most memory this process has used.
+    :return: Returns the peak resident set size in kilobytes, or 0 where it can't be read.
+    """
+    try:
+        from resource import getrusage, RUSAGE_SELF
+    except ImportError:
+        # Windows doesn't have the resource module.
+        return 0
+    from sys import platform
+
+    # macOS reports bytes, Linux kilobytes.
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform == "darwin" else peak
+
+class StageTimer:
+    """
+    :class: StageTimer
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Adds up the wall and CPU time of named stages, and counts things like packets and bytes, for one loop.
+    """
+    def __init__(self):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Starts timing a loop.
+        """
+        # stage -> [wall seconds, cpu seconds], in the order the stages first ran.
+        self.stages = dict()
+
+        # name -> amount, e.g. packets and bytes.
+        self.counts = dict()
+
+        self.started_wall = perf_counter()
+        self.started_cpu = process_time()
+
+    def stage(self, name: str) -> 'StageTimer.Stage':
+        """
+        :fn: stage
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Times a stage, use it as "with timer.stage('parse'):", a stage that runs more than once is added up.
+        :param name: The name of the stage.
+        :return: Returns a context manager that times its block.
+        """
+        return StageTimer.Stage(self, name)
+
+    def add(self, name: str, wall_seconds: float, cpu_seconds: float):
+        """
+        :fn: add
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds time to a stage, for time that was measured elsewhere.
+        :param name: The name of the stage.
+        :param wall_seconds: The wall time to add.
+        :param cpu_seconds: The CPU time to add.
+        """
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = self.stages[name] = [ 0.0, 0.0 ]
+        totals[0] += wall_seconds
+        totals[1] += cpu_seconds
+
+    def count(self, name: str, amount: int):
+        """
+        :fn: count
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds to a counter.
+        :param name: The name of the counter.
+        :param amount: How much to add.
+        """
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def finish(self) -> dict:
+        """
+        :fn: finish
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stops timing the loop.
+        :return: Returns the loop's metrics, stored with the NodeEvent.
+        """
+        return {
+            "wall_seconds": perf_counter() - self.started_wall,
+            "cpu_seconds": process_time() - self.started_cpu,
+            "stages": { name: { "wall_seconds": totals[0], "cpu_seconds": totals[1] } for name, totals in self.stages.items() },
+            "counts": dict(self.counts),
+            "peak_rss_kb": peak_rss_kb()
+        }
+
+    class Stage:
+        """
+        :class: Stage
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Times one block of code for a StageTimer.
+        """
+        def __init__(self, timer: 'StageTimer', name: str):
+            """
+            :fn: __init__
+            :date: 17/10/2026
+            :author: Cameron Sims
+            :brief: Creates the stage, timing starts when the block is entered.
+            :param timer: The timer the time is added to.
+            :param name: The name of the stage.
+            """
+            self.timer = timer
+            self.name = name
+
+        def __enter__(self):
+            self.started_wall = perf_counter()
+            self.started_cpu = process_time()
+            return self
+
+        def __exit__(self, exception_type, exception, trace):
+            self.timer.add(self.name, perf_counter() - self.started_wall, process_time() - self.started_cpu)
+            return False
+
+
+class MetricsRegistry:
+    """
+    :class: MetricsRegistry
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Keeps the metrics of the last few loops in memory.
+    """
+    def __init__(self, size: int = 60):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty registry.
+        :param size: How many loops are kept, the oldest are forgotten first.
+        """
+        self.loops = deque(maxlen=size)
+
+    def record(self, metrics: dict):
+        """
+        :fn: record
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Remembers a loop's metrics.
+        :param metrics: The metrics from StageTimer.finish()
+        """
+        self.loops.append(metrics)
+
+    def averages(self) -> dict:
+        """
+        :fn: averages
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The mean wall and CPU time of each stage over the loops kept.
+        :return: Returns stage -> (mean wall seconds, mean cpu seconds)
+        """
+        totals = dict()
+        for metrics in self.loops:
+            for name, stage in metrics["stages"].items():
+                total = totals.setdefault(name, [ 0.0, 0.0, 0 ])
+                total[0] += stage["wall_seconds"]
+                total[1] += stage["cpu_seconds"]
+                total[2] += 1
+        return { name: (total[0] / total[2], total[1] / total[2]) for name, total in totals.items() }
+
+    def slowest_stage(self) -> str | None:
+        """
+        :fn: slowest_stage
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Which stage takes the longest on average, apart from capturing which is meant to take its whole timeout.
+        :return: Returns the stage name, or None before any loop is recorded.
+        """
+        averages = { name: times for name, times in self.averages().items() if name != "capture" }
+        if not averages:
+            return None
+        return max(averages, key=lambda name: averages[name][0])
+
+    def summary(self, metrics: dict) -> str:
+        """
+        :fn: summary
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: A one line summary of a loop, for the node's output.
+        :param metrics: The metrics from StageTimer.finish()
+        :return: Returns the summary.
+        """
+        stages = " ".join(f"{name}={stage['wall_seconds']:.2f}s" for name, stage in metrics["stages"].items())
+        counts = " ".join(f"{name}={amount}" for name, amount in metrics["counts"].items())
+        return f"Loop took {metrics['wall_seconds']:.2f}s ({stages}) {counts} peak_rss={metrics['peak_rss_kb'] / 1024:.1f}MB, slowest stage recently: {self.slowest_stage()}"
@@ -0,0 +1,148 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module reads packets through tshark's field output, instead of building a full dissection for every packet.
+"""
+from subprocess import Popen, PIPE, DEVNULL
+
+from src.node.DecodedPacket import DecodedPacket
+from src.structures.PacketType import PacketType
+
+# The columns we ask tshark for, in the order they are printed.
+FIELDS = [
+    'frame.time_epoch',
+    'btle.advertising_address',
+    'eth.src',
+    'wlan.sa',
+    'radiotap.dbm_antsignal',
+    'btle_rf.signal_dbm',
+]
+
+class TsharkFieldsReader:
+    """
+    :class: TsharkFieldsReader
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Runs tshark with "-T fields" and turns each tab separated line into a decoded packet.
+    """
+    def __init__(self, tshark_path: str = "tshark"):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the reader.
+        :param tshark_path: The tshark executable, this has to be tshark and not dumpcap.
+        """
+        self.tshark_path = tshark_path
+
+        # The running tshark process, if there is one.
+        self.process = None
+
+        # Counters, how many lines were read and how many could not be used.
+        self.total_packets = 0
+        self.total_skipped = 0
+
+    def build_command(self, source: list[str]) -> list[str]:
+        """
+        :fn: build_command
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Builds the tshark command line.
+        :param source: The arguments that say where packets come from, e.g. [ '-r', 'capture.pcapng' ]
+        :return: Returns the full command.
+        """
+        command = [ self.tshark_path, '-n', '-l' ] + source + [
+            '-T', 'fields',
+            '-E', 'separator=/t',
+            '-E', 'occurrence=f',
+            '-E', 'header=n',
+        ]
+        for field in FIELDS:
+            command += [ '-e', field ]
+        return command
+
+    def read_file(self, input_file: str):
+        """
+        :fn: read_file
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads every packet in a capture file.
+        :param input_file: The capture file to read.
+        :return: Returns a generator of decoded packets.
+        """
+        return self.read_command(self.build_command([ '-r', input_file ]))
+
+    def read_live(self, interface: str):
+        """
+        :fn: read_live
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads packets from an interface as they are captured, until the generator is closed.
+        :param interface: The interface to capture on.
+        :return: Returns a generator of decoded packets.
+        """
+        return self.read_command(self.build_command([ '-i', interface ]))
+
+    def read_command(self, command: list[str]):
+        """
+        :fn: read_command
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Runs tshark and parses its output line by line, tshark is stopped when the generator is closed.
+        :param command: The tshark command to run.
+        :return: Returns a generator of decoded packets.
+        """
+        self.process = Popen(command, stdout=PIPE, stderr=DEVNULL, text=True, bufsize=1)
+        try:
+            for line in self.process.stdout:
+                packet = self.parse_line(line)
+                self.total_packets += 1
+                if packet is None:
+                    self.total_skipped += 1
+                else:
+                    yield packet
+
+            # tshark finished by itself, make sure it didn't fail.
+            return_code = self.process.wait()
+            if return_code != 0:
+                raise RuntimeError(f"tshark exited with code {return_code}: {' '.join(command)}")
+        finally:
+            if self.process.poll() is None:
+                self.process.terminate()
+                self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+    def parse_line(self, line: str) -> DecodedPacket | None:
+        """
+        :fn: parse_line
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Turns one line of tshark output into a decoded packet, the columns are read in the same order as get_packet_type.
+        :param line: The tab separated line.
+        :return: Returns the decoded packet, or None if it has no source address.
+        """
+        columns = line.rstrip('\n').split('\t')
+        if len(columns) < len(FIELDS):
+            return None
+
+        time_epoch, btle_address, eth_source, wlan_source, radiotap_signal, btle_signal = columns[:len(FIELDS)]
+
+        # If we have a bluetooth layer, then ethernet, then Wi-Fi.
+        if btle_address:
+            packet_type, mac_address = PacketType.BLUETOOTH, btle_address
+        elif eth_source:
+            packet_type, mac_address = PacketType.ETHERNET, eth_source
+        elif wlan_source:
+            packet_type, mac_address = PacketType.WIFI, wlan_source
+        else:
+            return None
+
+        # Radiotap first, bluetooth always has a signal if the capture recorded one.
+        signal = None
+        if radiotap_signal:
+            signal = int(radiotap_signal)
+        elif btle_signal:
+            signal = int(btle_signal)
+
+        return DecodedPacket(float(time_epoch), packet_type, mac_address, signal)
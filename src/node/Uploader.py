@@ -0,0 +1,164 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module sends what the node captured to the database (or the ingest gateway), either straight away or through the on-disk spool.
+"""
+from os.path import join as path_join
+
+from src.database.Client import DatabaseClient
+from src.node.DeviceFilter import DeviceFilter
+from src.node.GatewayClient import GatewayClient
+from src.node.Sniffer import Sniffer
+from src.node.Spool import Spool, SpoolFlusher
+from src.node.StageTimer import StageTimer
+from src.structures.attendanceBatch import AttendanceBatch
+from src.structures.nodeEvent import NodeEvent
+
+class Uploader:
+    """
+    :class: Uploader
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Uploads attendance from the sniffer, when a spool is configured every capture is written to disk first and flushed in the background.
+    """
+    def __init__(self, sniffer: Sniffer, dbclient: DatabaseClient = None):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the uploader, starting the spool flushers if the sniffer has a spool directory.
+        :param sniffer: The sniffer whose config we follow.
+        :param dbclient: The database client to insert into, None when the sniffer sends to a gateway.
+        """
+        self.sniffer = sniffer
+        self.dbclient = dbclient
+
+        # With a gateway the node never connects to MongoDB itself.
+        self.gateway = None
+        if sniffer.gateway_url:
+            self.gateway = GatewayClient(sniffer.gateway_url, sniffer.node_id, sniffer.gateway_timeout, sniffer.gateway_token)
+
+        # The server's suspicious devices, dropped before anything is uploaded. Asked for where the uploads go.
+        self.device_filter = None
+        if sniffer.filter_refresh_seconds > 0:
+            fetch = self.gateway.get_filter if self.gateway is not None else dbclient.suspicious_filter_client.fetch
+            self.device_filter = DeviceFilter(fetch, sniffer.filter_refresh_seconds, sniffer.filter_cache_file)
+
+        # Spools and their flushers, by what they hold.
+        self.spools = dict()
+        self.flushers = dict()
+
+        if sniffer.spool_directory:
+            # All are opened, so anything left over from before a config change still gets sent.
+            if self.gateway is not None:
+                self.open_spool("attendance", self.gateway.sink("attendance"))
+                self.open_spool("summaries", self.gateway.sink("summaries"))
+                self.open_spool("events", self.gateway.sink("nodeEvents"))
+            else:
+                attendance_client = dbclient.attendance_client
+                self.open_spool("attendance", attendance_client.insert_documents)
+                self.open_spool("summaries", attendance_client.insert_summary_documents)
+                self.open_spool("events", dbclient.node_event_client.insert_documents)
+
+    def open_spool(self, name: str, sink):
+        """
+        :fn: open_spool
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Opens one spool and starts the thread that drains it.
+        :param name: What the spool holds, this is also its folder name.
+        :param sink: The function that stores a list of documents from this spool.
+        """
+        spool = Spool(
+            path_join(self.sniffer.spool_directory, name),
+            segment_bytes=self.sniffer.spool_segment_bytes,
+            max_bytes=self.sniffer.spool_max_bytes
+        )
+        flusher = SpoolFlusher(spool, sink, batch_size=self.sniffer.spool_flush_batch)
+        flusher.start()
+
+        self.spools[name] = spool
+        self.flushers[name] = flusher
+
+    def upload(self, packets: list, timer: StageTimer = None):
+        """
+        :fn: upload
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Uploads captured packets, without the suspicious devices and summarised first if the sniffer is configured to.
+        :param packets: The attendance records that were captured.
+        :param timer: Times the filter, summarise, serialise, spool, send and insert stages, optional.
+        """
+        # Nobody reads the times if no timer was given.
+        timer = timer if timer is not None else StageTimer()
+
+        # Every capture backend ends up here, so this is the one place they are dropped.
+        if self.device_filter is not None:
+            with timer.stage("filter"):
+                self.device_filter.refresh()
+                amount = len(packets)
+                packets = self.device_filter.drop(packets)
+            timer.count("dropped", amount - len(packets))
+
+        if self.sniffer.summarise_before_upload:
+            with timer.stage("summarise"):
+                summaries = self.sniffer.summarise_attendance(packets)
+            print(f"Uploading {len(summaries)} summaries of {len(packets)} packets...")
+
+            if "summaries" in self.spools:
+                with timer.stage("serialise"):
+                    documents = [ summary.serialise() for summary in summaries ]
+                with timer.stage("spool"):
+                    self.spools["summaries"].append(documents)
+            elif self.gateway is not None:
+                with timer.stage("serialise"):
+                    documents = [ summary.serialise() for summary in summaries ]
+                with timer.stage("send"):
+                    self.gateway.send({ "summaries": documents })
+            else:
+                with timer.stage("insert"):
+                    self.dbclient.attendance_client.insert_summaries(summaries)
+        else:
+            print(f"Uploading {len(packets)} packets...")
+
+            if "attendance" in self.spools:
+                # Batches serialise straight from their columns, the streaming pipeline still hands over lists.
+                with timer.stage("serialise"):
+                    documents = packets.serialise() if isinstance(packets, AttendanceBatch) else [ attendance.serialise() for attendance in packets ]
+                with timer.stage("spool"):
+                    self.spools["attendance"].append(documents)
+            elif self.gateway is not None:
+                with timer.stage("serialise"):
+                    documents = packets.serialise() if isinstance(packets, AttendanceBatch) else [ attendance.serialise() for attendance in packets ]
+                with timer.stage("send"):
+                    self.gateway.send({ "attendance": documents })
+            else:
+                # Serialising and inserting happen chunk by chunk, so the client times them.
+                self.dbclient.attendance_client.insert_many(packets, timer=timer)
+
+    def upload_event(self, event: NodeEvent):
+        """
+        :fn: upload_event
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Uploads a node event, through the spool if there is one.
+        :param event: The event, usually carrying the last loop's metrics.
+        """
+        if "events" in self.spools:
+            self.spools["events"].append([ event.serialise() ])
+        elif self.gateway is not None:
+            self.gateway.send({ "nodeEvents": [ event.serialise() ] })
+        else:
+            self.dbclient.node_event_client.insert(event)
+
+    def close(self):
+        """
+        :fn: close
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stops the flushers, anything not yet sent stays in the spool for next time.
+        """
+        for flusher in self.flushers.values():
+            flusher.stop()
+        for spool in self.spools.values():
+            spool.close()
@@ -4,44 +4,107 @@
 :brief: This module initializes the client and sets up the main application.
 """
 from colorama import Fore, Back, Style
+from datetime import datetime
+from os.path import getsize as file_size, exists as file_exists
 import traceback
 
 from pyshark.capture.capture import TSharkCrashException
 from src.database.Client import DatabaseClient
 from src.node.Sniffer import Sniffer
+from src.node.AttendancePipeline import AttendancePipeline
+from src.node.Uploader import Uploader
+from src.node.StageTimer import StageTimer, MetricsRegistry
+from src.structures.nodeEvent import NodeEvent
 
 NODE_INFO_FNAME = "./data/node/nodeInfo.json"
 SNIFFING_FNAME  = "./data/node/sniffingConfig.json"
 DBLOGIN_FNAME   = "./data/database/dbLogin_prod_node_lab_a.json"
 
-def node_loop(sniffer: Sniffer, dbclient: DatabaseClient, max_loops: int, insert_into_db: bool, use_params: bool):
+def parse_capture(sniffer: Sniffer, timer: StageTimer, capture_file: str = None):
+    """
+    :fn: parse_capture:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Reads the packets from a capture file, timing the hashing apart from the rest of the parsing.
+    :param sniffer: The sniffer instance we're using
+    :param timer: The loop's timer.
+    :param capture_file: The capture to read, the sniffer's output file if None.
+    :return: Returns the packets.
+    """
+    capture_file = sniffer.output_file if capture_file is None else capture_file
+    if file_exists(capture_file):
+        timer.count("capture_bytes", file_size(capture_file))
+
+    hasher = sniffer.device_hasher
+    before = (hasher.hash_seconds, hasher.hash_cpu_seconds, hasher.worker_hash_seconds, hasher.worker_hash_cpu_seconds)
+    with timer.stage("parse"):
+        packets = sniffer.get_packets_from_file(capture_file)
+    hashing = hasher.hash_seconds - before[0]
+    hashing_cpu = hasher.hash_cpu_seconds - before[1]
+
+    # Hashing in this process happens while parsing, so it is taken back out of the parse time.
+    timer.add("parse", -hashing, -hashing_cpu)
+
+    # Parallel workers hash in their own processes, so that time was never part of the parse stage and is only added.
+    timer.add("hash", hashing + hasher.worker_hash_seconds - before[2], hashing_cpu + hasher.worker_hash_cpu_seconds - before[3])
+    timer.count("packets", len(packets))
+    return packets
+
+def report_metrics(sniffer: Sniffer, uploader: Uploader, registry: MetricsRegistry, timer: StageTimer, packets: list, insert_into_db: bool):
+    """
+    :fn: report_metrics:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Finishes timing a loop, prints a summary and sends it to the database as a node event.
+    :param sniffer: The sniffer instance we're using
+    :param uploader: Sends the event to the database.
+    :param registry: The metrics of the last few loops.
+    :param timer: The loop's timer.
+    :param packets: The packets the loop read.
+    :param insert_into_db: Boolean, should we add the event into the database?
+    """
+    metrics = timer.finish()
+    registry.record(metrics)
+    print(registry.summary(metrics))
+
+    if insert_into_db:
+        uploader.upload_event(NodeEvent(sniffer.node_id, True, len(packets) > 0, datetime.now(), metrics))
+
+def node_loop(sniffer: Sniffer, uploader: Uploader, max_loops: int, insert_into_db: bool, use_params: bool):
     """
     :fn: node_loop:
     :date: 05/09/2025
     :author: Cameron Sims
     :brief: This function is the loop for the node, this can be exited by CTRL+C
     :param sniffer: The sniffer instance we're using
-    :param dbclient: The database client to read to.
+    :param uploader: Sends the packets we read to the database.
     :param max_loops: The maximum amount of loops to run, -1 for infinite.
     :param insert_into_db: Boolean, should we add the packets we read into the database? (Should be True in production!)
     :param use_params: Used if we want to use tshark more directly, helps with some errors to do with capture files.
     """
+    # How long each stage took over the last few loops.
+    registry = MetricsRegistry(sniffer.metrics_history)
+
     i = 0
     while max_loops < 0 or i < max_loops:
         try:
+            timer = StageTimer()
+
             # Start the sniffer, save to file.
             print("Start Sniffing...")
-            sniffer.start_sniffing(use_params=use_params)
+            with timer.stage("capture"):
+                sniffer.start_sniffing(use_params=use_params)
 
             # Read the packets from what the sniffer inserted.
             print("Reading Packets from File...")
-            packets = sniffer.get_packets_from_file()
+            packets = parse_capture(sniffer, timer)
 
             # Read into the packet
             if insert_into_db:
                 # Insert all packets into the database.
-                print("Inserting Packets into Database...")
-                dbclient.attendance_client.insert_many(packets)
+                uploader.upload(packets, timer)
+
+            report_metrics(sniffer, uploader, registry, timer, packets, insert_into_db)
 
         except TSharkCrashException:
             # Handle known tshark crash by reinitializing the sniffer and continuing
@@ -59,6 +122,120 @@ def node_loop(sniffer: Sniffer, dbclient: DatabaseClient, max_loops: int, insert
         # Increment the loop amount
         i += 1
 
+def node_stream_loop(sniffer: Sniffer, uploader: Uploader, insert_into_db: bool):
+    """
+    :fn: node_stream_loop:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This function streams packets straight from the capture into the database, this can be exited by CTRL+C
+    :param sniffer: The sniffer instance we're using
+    :param uploader: Sends the packets we read to the database.
+    :param insert_into_db: Boolean, should we add the packets we read into the database? (Should be True in production!)
+    """
+    from time import monotonic, sleep as time_sleep
+
+    # Where each batch of attendance goes.
+    def insert_batch(batch: list):
+        if insert_into_db:
+            uploader.upload(batch)
+
+    # Doubled after each restart like the spool flusher's, so a capture that keeps failing doesn't spin.
+    backoff = 1.0
+    max_backoff = 60.0
+
+    while True:
+        started = monotonic()
+        pipeline = AttendancePipeline(
+            sniffer, insert_batch,
+            batch_size=sniffer.stream_batch_size,
+            queue_batches=sniffer.stream_queue_batches,
+            flush_seconds=sniffer.stream_flush_seconds
+        )
+
+        try:
+            # Runs until the capture stops or something goes wrong.
+            print("Start Streaming...")
+            pipeline.run()
+        except TSharkCrashException:
+            # Handle known tshark crash by reinitializing the sniffer and continuing
+            print(f'{Back.YELLOW}Tshark crashed! Restarting...{Style.RESET_ALL}')
+            sniffer = Sniffer(SNIFFING_FNAME, NODE_INFO_FNAME)
+        except KeyboardInterrupt:
+            # Allow graceful exit from the loop on Ctrl+C
+            print('Loop exiting due to Keyboard Interrupt...')
+            break
+        except Exception as e:
+            # Catch-all for unexpected exceptions in the loop to avoid process crash
+            print(f"{Back.RED}Unhandled exception in node_stream_loop: {e}{Style.RESET_ALL}")
+            traceback.print_exc()
+
+        # A stream that ran for a while was healthy, so it is restarted quickly again.
+        if monotonic() - started >= max_backoff:
+            backoff = 1.0
+
+        print(f"Restarting the stream in {backoff:.0f}s...")
+        try:
+            time_sleep(backoff)
+        except KeyboardInterrupt:
+            print('Loop exiting due to Keyboard Interrupt...')
+            break
+        backoff = min(backoff * 2, max_backoff)
+
+def node_ring_loop(sniffer: Sniffer, uploader: Uploader, insert_into_db: bool):
+    """
+    :fn: node_ring_loop:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This function reads and uploads each finished ring buffer segment while dumpcap writes the next, this can be exited by CTRL+C
+    :param sniffer: The sniffer instance we're using
+    :param uploader: Sends the packets we read to the database.
+    :param insert_into_db: Boolean, should we add the packets we read into the database? (Should be True in production!)
+    """
+    from time import sleep as time_sleep
+
+    # How long each stage took over the last few segments.
+    registry = MetricsRegistry(sniffer.metrics_history)
+
+    ring = sniffer.create_ring_capture()
+    ring.start()
+
+    try:
+        while True:
+            try:
+                # Parse every segment dumpcap has finished, oldest first.
+                for run, sequence, path in ring.completed_segments():
+                    print(f"Reading Packets from Segment {run}#{sequence}...")
+
+                    # dumpcap captures while we parse, so there is no capture stage here.
+                    timer = StageTimer()
+                    packets = parse_capture(sniffer, timer, path)
+
+                    if insert_into_db:
+                        uploader.upload(packets, timer)
+
+                    # Only once it is uploaded, so a crash means it is read again instead of lost.
+                    ring.mark_processed(run, sequence, path)
+                    report_metrics(sniffer, uploader, registry, timer, packets, insert_into_db)
+
+                # If dumpcap stopped, start a new run.
+                if not ring.is_running():
+                    print(f'{Back.YELLOW}dumpcap stopped! Restarting...{Style.RESET_ALL}')
+                    ring.start()
+
+                time_sleep(1)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                # Catch-all for unexpected exceptions in the loop to avoid process crash
+                print(f"{Back.RED}Unhandled exception in node_ring_loop: {e}{Style.RESET_ALL}")
+                traceback.print_exc()
+                time_sleep(1)
+    except KeyboardInterrupt:
+        # Allow graceful exit from the loop on Ctrl+C
+        print('Loop exiting due to Keyboard Interrupt...')
+    finally:
+        ring.stop()
+
 
 def node_main(max_loops: int, insert_into_db: bool, use_params: bool):
     """
@@ -79,11 +256,20 @@ def node_main(max_loops: int, insert_into_db: bool, use_params: bool):
 
     # Clear the attendance client, we don't want any data from previous hours to intersect.
     dbclient = None
+    uploader = None
     try:
-        dbclient = DatabaseClient(DBLOGIN_FNAME)
+        # Nodes that send to the ingest gateway don't need their own connection to MongoDB.
+        if not sniffer.gateway_url:
+            dbclient = DatabaseClient(DBLOGIN_FNAME)
+        uploader = Uploader(sniffer, dbclient)
 
-        # Enter the loop
-        node_loop(sniffer, dbclient, max_loops, insert_into_db, use_params)
+        # Enter the loop, streaming and ring captures run until stopped so they ignore the loop count.
+        if sniffer.capture_mode == "stream":
+            node_stream_loop(sniffer, uploader, insert_into_db)
+        elif sniffer.capture_mode == "ring":
+            node_ring_loop(sniffer, uploader, insert_into_db)
+        else:
+            node_loop(sniffer, uploader, max_loops, insert_into_db, use_params)
     except ServerSelectionTimeoutError as e:
         ip = getattr(dbclient, 'ip_address', 'unknown')
         print(f"{Back.RED}Error: Cannot find the server, are you sure you're connected and the MongoDB is at \"{ip}\"{Style.RESET_ALL}")
@@ -95,6 +281,10 @@ def node_main(max_loops: int, insert_into_db: bool, use_params: bool):
         print(f"{Back.RED}Unhandled exception in node_main: {e}{Style.RESET_ALL}")
         traceback.print_exc()
         successfully_exited = False
+    finally:
+        # Anything still spooled is sent next time the node starts.
+        if uploader is not None:
+            uploader.close()
 
     colour_code = f"{Fore.GREEN}{Back.RESET}" if successfully_exited else f"{Fore.RED}{Back.RESET}"
     print(f"{colour_code}Node has finished execution!{Style.RESET_ALL}")
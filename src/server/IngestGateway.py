@@ -0,0 +1,410 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is the ingest gateway, nodes post compressed batches to it and it writes them to MongoDB in bulk over one pooled connection.
+"""
+import asyncio
+from colorama import Fore, Back, Style
+from hmac import compare_digest
+from json import load as json_load, dumps as json_dumps
+from time import monotonic
+from urllib.parse import parse_qs
+
+from src.database.Client import DatabaseClient
+from src.database.ProtoClient import PERMANENT_WRITE_ERRORS
+from src.node.GatewayClient import GATEWAY_KINDS, decode_payload
+
+DBLOGIN_FNAME = "./data/database/dbLogin.json"
+GATEWAY_FNAME = "./data/server/gateway.json"
+
+# The reason phrase sent with each status we answer with.
+HTTP_REASONS = {
+    200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"
+}
+
+class IngestGateway:
+    """
+    :class: IngestGateway
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Accepts batches from every node, coalesces them by kind and bulk writes them from one writer.
+    """
+    def __init__(self, dbclient: DatabaseClient, config: dict):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the gateway, call run() to start it.
+        :param dbclient: The database client, the only connection to MongoDB.
+        :param config: The gateway config, see "data/server/gateway.json"
+        """
+        self.dbclient = dbclient
+
+        self.host                = str  (config.get('host', '0.0.0.0'))
+        self.port                = int  (config.get('port', 8470))
+        self.token               = str  (config.get('token', ''))
+        self.max_body_bytes      = int  (config.get('max_body_bytes', 8 * 1024 * 1024))
+        self.max_decoded_bytes   = int  (config.get('max_decoded_bytes', 64 * 1024 * 1024))
+        self.max_queue_documents = int  (config.get('max_queue_documents', 500000))
+        self.flush_documents     = int  (config.get('flush_documents', 20000))
+        self.flush_seconds       = float(config.get('flush_seconds', 5.0))
+
+        # How long the newest suspicious device filter is served before MongoDB is asked again, so every node asking doesn't.
+        self.filter_cache_seconds = float(config.get('filter_cache_seconds', 30.0))
+        self.filter = None
+        self.filter_checked = None
+
+        # Where each kind of document is written.
+        self.sinks = {
+            "attendance": dbclient.attendance_client.insert_documents,
+            "summaries": dbclient.attendance_client.insert_summary_documents,
+            "nodeEvents": dbclient.node_event_client.insert_documents,
+            "density": dbclient.historic_client.insert_documents
+        }
+
+        # Documents waiting to be written, by kind.
+        self.pending = { kind: [] for kind in GATEWAY_KINDS }
+        self.pending_documents = 0
+
+        # For the health endpoint.
+        self.started = monotonic()
+        self.accepted_documents = 0
+        self.written_documents = 0
+        self.rejected_requests = 0
+        self.nodes_seen = set()
+
+        # Set when enough documents are waiting that the writer shouldn't wait out flush_seconds.
+        self.flush_event = None
+
+    def accept(self, payload: dict) -> int:
+        """
+        :fn: accept
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Queues the documents of a decoded payload.
+        :param payload: The payload from decode_payload()
+        :return: Returns the HTTP status to answer with.
+        """
+        batches = payload.get("batches")
+        if not isinstance(batches, dict) or any(kind not in self.pending for kind in batches):
+            return 400
+
+        # Too much waiting, the node keeps its documents (in its spool) and tries later.
+        amount = sum(len(documents) for documents in batches.values())
+        if self.pending_documents + amount > self.max_queue_documents:
+            return 503
+
+        for kind, documents in batches.items():
+            self.pending[kind].extend(documents)
+        self.pending_documents += amount
+        self.accepted_documents += amount
+        self.nodes_seen.add(payload.get("node_id"))
+
+        if self.pending_documents >= self.flush_documents:
+            self.flush_event.set()
+        return 202
+
+    def write(self, pending: dict) -> dict:
+        """
+        :fn: write
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes the coalesced documents, one bulk write per kind. Runs on a worker thread.
+        :param pending: kind -> list of documents
+        :return: Returns the documents that couldn't be written, by kind.
+        """
+        from pymongo.errors import BulkWriteError
+
+        failed = dict()
+        for kind, documents in pending.items():
+            if not documents:
+                continue
+            try:
+                self.sinks[kind](documents)
+                self.written_documents += len(documents)
+            except BulkWriteError as e:
+                # Only the documents that failed are kept, and only if they might not fail again. Summaries sent again aren't merged twice.
+                errors = e.details.get('writeErrors', [])
+                retry = []
+                for error in errors:
+                    if error.get('code') in PERMANENT_WRITE_ERRORS:
+                        print(f"{Fore.YELLOW}Warning: a {kind} document can't be written, dropping it: {error.get('errmsg')}{Style.RESET_ALL}")
+                    else:
+                        retry.append(documents[error['index']])
+
+                self.written_documents += len(documents) - len(errors)
+                if retry:
+                    print(f"{Fore.YELLOW}Warning: {len(retry)} {kind} documents could not be written, keeping them.{Style.RESET_ALL}")
+                    failed[kind] = retry
+            except Exception as e:
+                # Most likely the database is unreachable, so keep them for the next flush.
+                print(f"{Fore.YELLOW}Warning: {len(documents)} {kind} documents could not be written, keeping them: {e}{Style.RESET_ALL}")
+                failed[kind] = documents
+        return failed
+
+    async def writer(self):
+        """
+        :fn: writer
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Flushes every flush_seconds, or sooner when flush_documents are waiting. Only one write runs at a time.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+
+            if self.pending_documents == 0:
+                continue
+
+            # Take everything waiting, new requests queue up behind it while it is written.
+            pending = self.pending
+            self.pending = { kind: [] for kind in GATEWAY_KINDS }
+            self.pending_documents = 0
+
+            # pymongo blocks, so the write happens on a thread and requests are still answered.
+            failed = await asyncio.to_thread(self.write, pending)
+
+            # Put what failed back in front of anything that arrived since.
+            for kind, documents in failed.items():
+                self.pending[kind] = documents + self.pending[kind]
+                self.pending_documents += len(documents)
+
+    def health(self) -> dict:
+        """
+        :fn: health
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: How the gateway is doing.
+        :return: Returns the gateway's counts.
+        """
+        return {
+            "uptime_seconds": round(monotonic() - self.started, 1),
+            "pending_documents": self.pending_documents,
+            "accepted_documents": self.accepted_documents,
+            "written_documents": self.written_documents,
+            "rejected_requests": self.rejected_requests,
+            "nodes_seen": len(self.nodes_seen),
+            "filter_version": 0 if self.filter is None else self.filter["version"]
+        }
+
+    async def get_filter(self) -> dict | None:
+        """
+        :fn: get_filter
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The newest suspicious device filter, read from MongoDB at most every filter_cache_seconds.
+        :return: Returns the filter's document, or None if none has been published.
+        """
+        if self.filter_checked is None or (monotonic() - self.filter_checked) >= self.filter_cache_seconds:
+            try:
+                # pymongo blocks, so it is read on a thread.
+                latest = await asyncio.to_thread(self.dbclient.suspicious_filter_client.get_latest)
+                if latest is not None:
+                    self.filter = latest
+            except Exception as e:
+                # The one already held is still better than none.
+                print(f"{Fore.YELLOW}Warning: The suspicious device filter could not be read, keeping version {0 if self.filter is None else self.filter['version']}: {e}{Style.RESET_ALL}")
+            self.filter_checked = monotonic()
+        return self.filter
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, body: bytes = b"", keep_alive: bool = True, content_type: str = "application/json", headers: dict = None):
+        """
+        :fn: respond
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Writes an HTTP response.
+        :param writer: The connection's writer.
+        :param status: The HTTP status.
+        :param body: The body, if any.
+        :param keep_alive: Whether the connection stays open for another request.
+        :param content_type: What the body is, JSON unless it is a filter.
+        :param headers: Any other headers to send.
+        """
+        if status >= 400:
+            self.rejected_requests += 1
+
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or dict()).items())
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("ascii") + body)
+        await writer.drain()
+
+    def authorised(self, headers: dict) -> bool:
+        """
+        :fn: authorised
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Checks the request's token, taking as long whether or not it matches.
+        :param headers: The request's headers, lower case.
+        :return: Returns True if there is no token set, or the request's matches it.
+        """
+        if not self.token:
+            return True
+        return compare_digest(headers.get("x-gateway-token", "").encode(), self.token.encode())
+
+    async def serve_filter(self, writer: asyncio.StreamWriter, method: str, headers: dict, query: str, keep_alive: bool):
+        """
+        :fn: serve_filter
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Answers "GET /filter?version=N", with the newest filter if it is newer than N and 204 otherwise.
+        :param writer: The connection's writer.
+        :param method: The request's method.
+        :param headers: The request's headers, lower case.
+        :param query: The request's query string.
+        :param keep_alive: Whether the connection stays open for another request.
+        """
+        if method != "GET":
+            await self.respond(writer, 405, keep_alive=keep_alive)
+            return
+        if not self.authorised(headers):
+            await self.respond(writer, 401, keep_alive=keep_alive)
+            return
+
+        try:
+            held = int(parse_qs(query).get("version", [ "0" ])[0])
+        except ValueError:
+            await self.respond(writer, 400, keep_alive=keep_alive)
+            return
+
+        latest = await self.get_filter()
+        if latest is None or latest["version"] <= held:
+            await self.respond(writer, 204, keep_alive=keep_alive)
+            return
+
+        await self.respond(writer, 200, bytes(latest["filter"]), keep_alive, "application/octet-stream", { "X-Filter-Version": latest["version"] })
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        :fn: handle
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serves one connection, "POST /ingest" queues a batch, "GET /filter" gives the suspicious device filter and "GET /health" reports the gateway's counts.
+        :param reader: The connection's reader.
+        :param writer: The connection's writer.
+        """
+        try:
+            while True:
+                # The request line and headers.
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                request_line = lines[0].split(" ")
+                if len(request_line) != 3:
+                    await self.respond(writer, 400, keep_alive=False)
+                    break
+                method, path, version = request_line
+                path, _, query = path.partition("?")
+
+                headers = dict()
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, keep_alive=False)
+                    break
+                if length > self.max_body_bytes:
+                    await self.respond(writer, 413, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length > 0 else b""
+
+                if path == "/health":
+                    await self.respond(writer, 200, json_dumps(self.health()).encode(), keep_alive)
+                elif path == "/filter":
+                    await self.serve_filter(writer, method, headers, query, keep_alive)
+                elif path != "/ingest":
+                    await self.respond(writer, 404, keep_alive=keep_alive)
+                elif method != "POST":
+                    await self.respond(writer, 405, keep_alive=keep_alive)
+                elif not self.authorised(headers):
+                    await self.respond(writer, 401, keep_alive=keep_alive)
+                else:
+                    try:
+                        status = self.accept(decode_payload(body, self.max_decoded_bytes))
+                    except Exception:
+                        # Not zlib, not BSON, or too big once decompressed.
+                        status = 400
+                    await self.respond(writer, status, keep_alive=keep_alive)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self):
+        """
+        :fn: run
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serves nodes until cancelled, then writes anything still waiting.
+        """
+        self.flush_event = asyncio.Event()
+        writer_task = asyncio.create_task(self.writer())
+
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Ingest gateway listening on {self.host}:{self.port}...")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+            # Don't lose what was accepted.
+            if self.pending_documents > 0:
+                print(f"Writing {self.pending_documents} waiting documents...")
+                self.write(self.pending)
+
+def gateway_main(config_fname: str, login_fname: str):
+    """
+    :fn: gateway_main:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This function is the main entry point for the ingest gateway.
+    :param config_fname: The gateway config file.
+    :param login_fname: The database login file.
+    """
+    with open(config_fname, "r") as file:
+        config = json_load(file)
+
+    dbclient = DatabaseClient(login_fname)
+    gateway = IngestGateway(dbclient, config)
+
+    try:
+        asyncio.run(gateway.run())
+    except KeyboardInterrupt:
+        print('Gateway exiting due to Keyboard Interrupt...')
+
+    print(f"{Fore.GREEN}{Back.RESET}Ingest gateway has finished execution!{Style.RESET_ALL}")
+
+
+# This is the main entry point for the ingest gateway.
+if __name__ == "__main__":
+    from sys import argv as sys_argv
+
+    len_sys_argv = len(sys_argv)
+    config_fname = GATEWAY_FNAME if (len_sys_argv < 2) else sys_argv[1]
+    login_fname  = DBLOGIN_FNAME if (len_sys_argv < 3) else sys_argv[2]
+
+    gateway_main(config_fname, login_fname)
@@ -0,0 +1,330 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module squashes attendance as it is inserted, tailing the attendance collection's change stream instead of waiting for the next server squash.
+"""
+from colorama import Fore, Back, Style
+from datetime import timedelta
+from json import load as json_load
+from time import monotonic
+
+from src.database.Client import DatabaseClient
+from src.structures.node import Node
+
+DBLOGIN_FNAME    = "./data/database/dbLogin.json"
+STREAMING_FNAME  = "./data/server/streaming.json"
+SUSFACTORS_FNAME = "./data/server/suspicionFactors.json"
+STRFACTORS_FNAME = "./data/server/strengthFactors.json"
+ESTFACTORS_FNAME = "./data/server/estimationFactors.json"
+SQUASHCONF_FNAME = "./data/server/squashConfig.json"
+
+class StreamingSquash:
+    """
+    :class: StreamingSquash
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Folds newly inserted attendance into the open 30 minute buckets and upserts their density records, a few seconds behind the nodes.
+    """
+    def __init__(self, dbclient: DatabaseClient, config: dict, sus_options: dict, strength_options: dict, estimation_options: dict, squash_options: dict):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates the streaming squash, the stream is opened by run()
+        :param dbclient: The database client, the stream needs MongoDB to be a replica set.
+        :param config: See "data/server/streaming.json"
+        :param sus_options: The option for suspicious macs
+        :param strength_options: Options for including macs if they fit criteria
+        :param estimation_options: Options for estimating people from devices.
+        :param squash_options: How the batch squash runs, the stream shares its lookback, rollups and profiles.
+        """
+        self.dbclient = dbclient
+        self.sus_options = sus_options
+        self.strength_options = strength_options
+        self.estimation_options = estimation_options
+        self.squash_options = squash_options
+
+        # Which stream's resume token to keep, so more than one could run.
+        self.name = str(config.get('name', 'stream'))
+
+        # Flush once this many documents are waiting, or once the oldest has waited this long.
+        self.flush_documents = int(config.get('flush_documents', 20000))
+        self.flush_seconds = float(config.get('flush_seconds', 10))
+
+        # How long one wait on the stream lasts, so a quiet stream still flushes on time.
+        self.max_await_ms = int(config.get('max_await_ms', 1000))
+
+        # How many of the newest buckets are held, older ones are loaded again if late attendance arrives.
+        self.open_buckets = int(config.get('open_buckets', 2))
+        self.lookback_buckets = int(squash_options.get('lookback_buckets', 96))
+
+        # The shortest time between publishing the suspicious device filter, if the squash options publish one.
+        self.filter_seconds = float(config.get('filter_seconds', 300))
+        self.filter_published = None
+
+        self.rollup_client = dbclient.get_rollup_client(True, squash_options)
+        self.profile_client = dbclient.get_profile_client(True, squash_options)
+        self.full_nodes = dbclient.node_client.get(Node)
+
+        # timestamp -> bucket, like the incremental squash's.
+        self.buckets = dict()
+
+        # The documents inserted and the summaries merged into since the last flush, and where the stream is up to.
+        self.pending = []
+        self.pending_merged = []
+        self.pending_since = None
+        self.resume_token = None
+
+        # The resume token last stored, where the next flush's read starts.
+        self.saved_token = None
+
+        # Counters, printed as it goes.
+        self.total_documents = 0
+        self.total_flushes = 0
+
+    def open_stream(self):
+        """
+        :fn: open_stream
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Opens the change stream where it last stopped, or from now after catching up on anything the batch squash hasn't read.
+        :return: Returns the change stream.
+        """
+        attendance_client = self.dbclient.attendance_client
+        state_client = self.dbclient.squash_state_client
+
+        # Nodes merge into their summaries, so updates are followed as well, with the whole document as it is after the merge.
+        pipeline = [ { "$match": { "operationType": { "$in": [ "insert", "update", "replace" ] } } } ]
+
+        resume_token = state_client.get_resume_token(self.name)
+        self.saved_token = resume_token
+
+        # A flush that crashed before its resume token was stored is streamed again, so what it added is taken back out first.
+        fold = { "name": self.name, "from": resume_token }
+        state_client.revert_buckets(fold)
+        if self.profile_client is not None:
+            self.profile_client.revert(fold)
+
+        if resume_token is not None:
+            stream = attendance_client.collection.watch(pipeline, full_document="updateLookup", resume_after=resume_token, max_await_time_ms=self.max_await_ms)
+        else:
+            # Opened first, so nothing inserted while catching up is missed. Anything read twice only adds to packet counts.
+            # Anything not visible to the catch up yet is in the stream, so it reads right up to now.
+            stream = attendance_client.collection.watch(pipeline, full_document="updateLookup", max_await_time_ms=self.max_await_ms)
+            print("No resume token, squashing the attendance inserted since the last squash first.")
+            self.dbclient.convert_new_attendance_to_historic(self.full_nodes, self.sus_options, self.strength_options, self.estimation_options, True, False, dict(self.squash_options, settle_seconds=0))
+
+        self.resume_token = stream.resume_token
+        return stream
+
+    def run(self):
+        """
+        :fn: run
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Tails the change stream until interrupted.
+        """
+        with self.open_stream() as stream:
+            print(f"Streaming squash is tailing {self.dbclient.attendance_client.collection.name}.")
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self.add_change(change)
+                    self.resume_token = change["_id"]
+                elif not self.pending and not self.pending_merged:
+                    # Nothing is waiting, so the stream's own position is safe to keep.
+                    self.resume_token = stream.resume_token
+
+                if self.should_flush():
+                    self.flush()
+
+    def add_change(self, change: dict):
+        """
+        :fn: add_change
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Keeps a change until the next flush, inserts are folded in and merged summaries are grouped again.
+        :param change: The change stream event.
+        """
+        # A summary deleted (by the batch squash clearing) before it was looked up has nothing left to fold.
+        document = change.get("fullDocument")
+        if document is None:
+            return
+
+        if not self.pending and not self.pending_merged:
+            self.pending_since = monotonic()
+
+        if change["operationType"] == "insert":
+            self.pending.append(document)
+        else:
+            self.pending_merged.append(document)
+
+    def should_flush(self) -> bool:
+        """
+        :fn: should_flush
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Whether the waiting documents should be squashed now.
+        :return: Returns True if enough are waiting, or they have waited long enough.
+        """
+        waiting = len(self.pending) + len(self.pending_merged)
+        if waiting == 0:
+            return False
+        return waiting >= self.flush_documents or (monotonic() - self.pending_since) >= self.flush_seconds
+
+    def flush(self):
+        """
+        :fn: flush
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Folds the waiting documents into their buckets, then upserts the density records of those buckets.
+        """
+        if not self.pending and not self.pending_merged:
+            return
+
+        documents = self.pending
+        merged = self.pending_merged
+        self.pending = []
+        self.pending_merged = []
+        self.pending_since = None
+
+        attendance_client = self.dbclient.attendance_client
+        state_client = self.dbclient.squash_state_client
+
+        # The same grouping as the incremental squash, into the buckets held here.
+        entries = attendance_client.as_batch(documents + merged)
+        freq = attendance_client.get_frequencies(attendance_client.as_batch(documents), self.strength_options)
+        node_devices = attendance_client.get_node_devices(entries, self.strength_options)
+        merged_freq = attendance_client.get_frequencies(attendance_client.as_batch(merged), self.strength_options)
+
+        # This flush's read starts at the stored resume token.
+        fold = { "name": self.name, "from": self.saved_token }
+
+        touched = set(freq) | set(node_devices) | set(merged_freq)
+        attendance_client.load_buckets(self.buckets, touched, state_client)
+        attendance_client.fold_into_buckets(self.buckets, freq, node_devices, fold)
+
+        # A merged summary holds its packets as a total, so its devices are grouped again from the collection instead of added to.
+        if merged_freq:
+            self.replace_merged(attendance_client.rebuild_frequencies({ (timestamp, mac) for timestamp, macs in merged_freq.items() for mac in macs }, self.strength_options), freq)
+
+        changed = { timestamp: self.buckets[timestamp] for timestamp in touched }
+
+        # Judged from the device profiles if there are any, else from the buckets before these.
+        suspicious_macs = None
+        if self.profile_client is not None:
+            suspicious_macs = self.profile_client.evaluate(self.profile_client.observe(freq, fold), self.sus_options, max(touched))
+        history, suspicious_macs = attendance_client.count_buckets(self.full_nodes, changed, self.sus_options, self.estimation_options, state_client, self.lookback_buckets, suspicious_macs)
+
+        # Written in the same order as the incremental squash, the resume token moves last.
+        state_client.save_buckets(attendance_client.storable_buckets(changed))
+        self.dbclient.historic_client.upsert_many(history)
+        if self.rollup_client is not None:
+            attendance_client.roll_up(self.rollup_client, attendance_client.get_node_devices(entries, self.strength_options, self.rollup_client.base_minutes), suspicious_macs, self.full_nodes, self.estimation_options)
+        state_client.set_resume_token(self.name, self.resume_token, len(documents) + len(merged))
+        self.saved_token = self.resume_token
+
+        # Moves the batch squash's watermark past what was streamed, so it isn't read again. Anything stamped before is already streamed.
+        stamps = [ document["ingested_at"] for document in documents + merged if document.get("ingested_at") is not None ]
+        watermark = state_client.get_watermark("attendance")
+        if stamps and (watermark is None or max(stamps) > watermark):
+            state_client.set_watermark("attendance", max(stamps), len(documents) + len(merged))
+
+        # The filter changes far more slowly than the records, so it isn't published every flush.
+        if self.filter_published is None or (monotonic() - self.filter_published) >= self.filter_seconds:
+            self.dbclient.publish_suspicious_filter(self.sus_options, self.squash_options)
+            self.filter_published = monotonic()
+
+        self.close_buckets()
+
+        self.total_documents += len(documents) + len(merged)
+        self.total_flushes += 1
+        print(f"Streamed {len(documents)} attendance documents and {len(merged)} merged summaries into {len(changed)} buckets, {len(history)} density records updated ({self.total_documents} documents in {self.total_flushes} flushes).")
+
+    def replace_merged(self, rebuilt: dict, freq: dict):
+        """
+        :fn: replace_merged
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Replaces the devices of merged summaries in the buckets held, and adds just the packets they gained to freq for the profiles.
+        :param rebuilt: From rebuild_frequencies()
+        :param freq: The inserted documents' frequencies, changed in place.
+        """
+        for timestamp, macs in rebuilt.items():
+            devices = self.buckets[timestamp]["devices"]
+            for mac, tpl in macs.items():
+                previous = devices.get(mac)
+                if previous is None:
+                    devices[mac] = list(tpl)
+                    gained = tpl[2]
+                else:
+                    # Attendance the batch squash already cleared isn't in the collection, so nothing counted goes down.
+                    devices[mac] = [ min(previous[0], tpl[0]), max(previous[1], tpl[1]), max(previous[2], tpl[2]) ]
+                    gained = tpl[2] - previous[2]
+
+                if gained > 0:
+                    bucket_freq = freq.setdefault(timestamp, dict())
+                    before = bucket_freq.get(mac)
+                    bucket_freq[mac] = (tpl[0], tpl[1], gained) if before is None else (min(before[0], tpl[0]), max(before[1], tpl[1]), before[2] + gained)
+
+    def close_buckets(self):
+        """
+        :fn: close_buckets
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Stops holding all but the newest buckets, they are already stored.
+        """
+        if not self.buckets:
+            return
+
+        oldest_open = max(self.buckets) - timedelta(minutes=30 * (self.open_buckets - 1))
+        for timestamp in [ timestamp for timestamp in self.buckets if timestamp < oldest_open ]:
+            del self.buckets[timestamp]
+
+
+def streaming_main(config_fname: str, login_fname: str):
+    """
+    :fn: streaming_main:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This function is the main entry point for the streaming squash.
+    :param config_fname: The streaming config file.
+    :param login_fname: The database login file.
+    """
+    from pymongo.errors import OperationFailure
+    from src.server.index import load_squash_options
+
+    with open(config_fname, "r") as file:
+        config = json_load(file)
+    with open(SUSFACTORS_FNAME, "r") as file:
+        suspicion_factors = json_load(file)
+    with open(STRFACTORS_FNAME, "r") as file:
+        strength_factors = json_load(file)
+    with open(ESTFACTORS_FNAME, "r") as file:
+        estimation_factors = json_load(file)
+
+    dbclient = DatabaseClient(login_fname)
+    squasher = StreamingSquash(dbclient, config, suspicion_factors, strength_factors, estimation_factors, load_squash_options(SQUASHCONF_FNAME))
+
+    try:
+        squasher.run()
+    except KeyboardInterrupt:
+        print('Streaming squash exiting due to Keyboard Interrupt...')
+        squasher.flush()
+    except OperationFailure as error:
+        # A standalone server has no change streams.
+        print(f"{Fore.RED}{Back.RESET}The change stream could not be opened, MongoDB must run as a replica set (even a single node one): {error}{Style.RESET_ALL}")
+        return
+
+    print(f"{Fore.GREEN}{Back.RESET}Streaming squash has finished execution!{Style.RESET_ALL}")
+
+
+# This is the main entry point for the streaming squash.
+if __name__ == "__main__":
+    from sys import argv as sys_argv
+
+    len_sys_argv = len(sys_argv)
+    config_fname = STREAMING_FNAME if (len_sys_argv < 2) else sys_argv[1]
+    login_fname  = DBLOGIN_FNAME if (len_sys_argv < 3) else sys_argv[2]
+
+    streaming_main(config_fname, login_fname)
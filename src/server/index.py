@@ -9,14 +9,35 @@ DBLOGIN_FNAME    = "./data/database/dbLogin.json"
 SUSFACTORS_FNAME = "./data/server/suspicionFactors.json"
 STRFACTORS_FNAME = "./data/server/strengthFactors.json"
 ESTFACTORS_FNAME = "./data/server/estimationFactors.json"
+SQUASHCONF_FNAME = "./data/server/squashConfig.json"
 
-def server_create_node_history(dbclient: DatabaseClient): 
+def load_squash_options(squash_config_fname: str) -> dict:
+    """
+    :fn: load_squash_options:
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Reads how the squash should run, a missing file means the full squash.
+    :param squash_config_fname: The file name that we are reading from.
+    :return: Returns the squash options.
+    """
+    from json import load as json_load
+    from os.path import exists as file_exists
+
+    if not file_exists(squash_config_fname):
+        return dict()
+
+    with open(squash_config_fname) as squash_file:
+        return json_load(squash_file)
+
+def server_create_node_history(dbclient: DatabaseClient, rollup_tier: str = None, rollup_days: int = 7): 
     """
     :fn: server_create_node_history:
     :date: 09/09/2025
     :author: Cameron Sims
     :brief: This function creates a graph which can be used to show activity from the nodes.
     :param dbclient: The database client that we are reading from.
+    :param rollup_tier: Also graph each node's peak devices from a rollup tier (e.g. "1h"), if given.
+    :param rollup_days: How many days back the rollup graph goes.
     """
     from src.structures.node import Node
     from src.graph.Graphing import Graphing
@@ -24,8 +45,6 @@ def server_create_node_history(dbclient: DatabaseClient):
     
     # Get our nodes and our history 
     nodes = dbclient.node_client.get(Node)
-
-    # Get history from the database.
     history = dbclient.historic_client.get(Density)
     
     graph_client = Graphing()
@@ -34,6 +53,13 @@ def server_create_node_history(dbclient: DatabaseClient):
     for node in nodes:
         graph_client.create_node_timeline(node, history).show()
 
+    # Rollups count distinct devices rather than records, so they get their own graph over a bounded range.
+    if rollup_tier is not None:
+        from datetime import datetime, timedelta, timezone
+        end = datetime.now(timezone.utc)
+        rollups = dbclient.rollup_client.get(rollup_tier, end - timedelta(days=rollup_days), end)
+        graph_client.create_node_peak_activity(nodes, rollups).show()
+
 def server_squash(dbclient: DatabaseClient, suspicion_factors_fname: str, strength_factors_fname: str, estimation_factors_fname: str, push_to_db: bool, clear_db: bool):
     """
     :fn: server_squash:
@@ -64,10 +90,13 @@ def server_squash(dbclient: DatabaseClient, suspicion_factors_fname: str, streng
     frequency_data = json_load(frequency_json)
     frequency = int(frequency_data['seconds'])
 
+    # Whether to squash everything each time, or only what is new.
+    squash_options = load_squash_options(SQUASHCONF_FNAME)
+
     # Squash the database
     print("Squashing the Database Insertion.")
     while True:
-        dbclient.convert_attendance_to_historic(sus_options=suspicion_factors, strength_options=strength_factors, estimation_options=estimation_factors, push_to_db=push_to_db, clear_db=clear_db)
+        dbclient.convert_attendance_to_historic(sus_options=suspicion_factors, strength_options=strength_factors, estimation_options=estimation_factors, push_to_db=push_to_db, clear_db=clear_db, squash_options=squash_options)
 
         # Sleep for however long.
         time_sleep(frequency)
@@ -108,9 +137,10 @@ def server_main(push_to_db: bool, clear_db: bool):
 
         # Squash the database
         print("Squashing the Database Insertion.")
-        density = dbclient.convert_attendance_to_historic(suspicion_factors, strength_factors, estimation_factors, push_to_db, clear_db)
+        squash_options = load_squash_options(SQUASHCONF_FNAME)
+        density = dbclient.convert_attendance_to_historic(suspicion_factors, strength_factors, estimation_factors, push_to_db, clear_db, squash_options)
                
-        server_create_node_history(dbclient)
+        server_create_node_history(dbclient, "1h" if squash_options.get('rollups', False) else None)
    
 
 
@@ -15,6 +15,9 @@ class Attendance:
     :author: Cameron Sims
     :brief: This class is used to refer to an attendance record.
     """
+    # There can be a lot of these, so no per-object dictionary.
+    __slots__ = ("timestamp", "packet_type", "node_id", "device_id", "strength")
+
     def __init__(self, timestamp: datetime = datetime.now(), node: Node | str = None, device_id: str = None, strength: int = None, packet_type: PacketType = PacketType.NONE): 
         """
         :fn: __init__
@@ -79,7 +82,9 @@ class Attendance:
         :return: A dictionary representation of the attendace.
         """
         # This is used to serialise the record, this is used to insert the node into the database.
+        # The _id is made here, so sending the same document again (e.g. from a spool) doesn't store it twice.
         return {
+            "_id": ObjectID(),
             "date_time": self.timestamp,
             "node_id": ObjectID(self.node_id),
             "device_id": self.device_id,
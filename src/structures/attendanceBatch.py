@@ -0,0 +1,356 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is used to hold many attendance records as columns, instead of one object (and one dictionary) per "ping".
+"""
+from src.structures.attendance import Attendance
+from src.structures.PacketType import PacketType
+from array import array
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId as ObjectID
+
+# Timestamps are kept as seconds since this, naive like the ones MongoDB gives back.
+EPOCH = datetime(1970, 1, 1)
+
+# Stored in the strength column when a packet had no signal strength.
+STRENGTH_NONE = -2 ** 31
+
+def to_epoch(timestamp: datetime) -> float:
+    """
+    :fn: to_epoch
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Converts a datetime to seconds, naive datetimes are kept as they are and aware ones are converted to UTC like MongoDB does.
+    :param timestamp: The datetime.
+    :return: Returns the seconds since EPOCH.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH).total_seconds()
+
+def from_epoch(seconds: float) -> datetime:
+    """
+    :fn: from_epoch
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Converts seconds from to_epoch() back to a naive datetime.
+    :param seconds: The seconds since EPOCH.
+    :return: Returns the datetime.
+    """
+    return EPOCH + timedelta(microseconds=round(seconds * 1000000))
+
+class AttendanceBatch:
+    """
+    :class: AttendanceBatch
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class holds attendance records in typed arrays, with the node and device ids stored once each and referred to by index.
+    """
+    __slots__ = (
+        "timestamps", "strengths", "packet_types",
+        "first_seen", "last_seen", "packet_counts",
+        "node_index", "node_ids", "node_lookup",
+        "device_index", "device_ids", "device_lookup"
+    )
+
+    def __init__(self):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty batch.
+        """
+        # One entry per record.
+        self.timestamps = array('d')
+        self.strengths = array('i')
+        self.packet_types = array('B')
+
+        # Summaries cover many packets, a single packet is its own first and last with a count of 1.
+        self.first_seen = array('d')
+        self.last_seen = array('d')
+        self.packet_counts = array('I')
+
+        # The nodes and devices, each stored once, the records refer to them by index.
+        self.node_index = array('I')
+        self.node_ids = []
+        self.node_lookup = dict()
+
+        self.device_index = array('I')
+        self.device_ids = []
+        self.device_lookup = dict()
+
+    def __len__(self) -> int:
+        """
+        :fn: __len__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: How many records are in the batch.
+        :return: Returns the number of records.
+        """
+        return len(self.timestamps)
+
+    def __iter__(self):
+        """
+        :fn: __iter__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Goes through the records as Attendance objects, for code that still wants them.
+        :return: Yields an Attendance per record.
+        """
+        i = 0
+        while i < len(self.timestamps):
+            yield self.get_attendance(i)
+            i += 1
+
+    def append(self, timestamp: datetime, node_id, device_id: str, strength: int | None, packet_type: PacketType, first_seen: datetime = None, last_seen: datetime = None, packet_count: int = 1):
+        """
+        :fn: append
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds a record to the end of the batch.
+        :param timestamp: When the packet was observed.
+        :param node_id: The node that observed it.
+        :param device_id: The hash of the device that sent it.
+        :param strength: The signal strength, might be None
+        :param packet_type: The type of packet (bluetooth/wifi/ethernet)
+        :param first_seen: For summaries, the first packet, the timestamp otherwise.
+        :param last_seen: For summaries, the last packet, the timestamp otherwise.
+        :param packet_count: For summaries, how many packets it covers.
+        """
+        seconds = to_epoch(timestamp)
+        self.timestamps.append(seconds)
+        self.strengths.append(STRENGTH_NONE if strength is None else strength)
+        self.packet_types.append(packet_type.value)
+
+        self.first_seen.append(seconds if first_seen is None else to_epoch(first_seen))
+        self.last_seen.append(seconds if last_seen is None else to_epoch(last_seen))
+        self.packet_counts.append(packet_count)
+
+        # Look the node and device up, adding them the first time they appear.
+        index = self.node_lookup.get(node_id)
+        if index is None:
+            index = self.node_lookup[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        self.node_index.append(index)
+
+        index = self.device_lookup.get(device_id)
+        if index is None:
+            index = self.device_lookup[device_id] = len(self.device_ids)
+            self.device_ids.append(device_id)
+        self.device_index.append(index)
+
+    def append_attendance(self, attendance: Attendance):
+        """
+        :fn: append_attendance
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds an Attendance object to the end of the batch.
+        :param attendance: The attendance record.
+        """
+        self.append(attendance.timestamp, attendance.node_id, attendance.device_id, attendance.strength, attendance.packet_type)
+
+    def extend(self, other: 'AttendanceBatch'):
+        """
+        :fn: extend
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds every record of another batch to the end of this one, e.g. the batches of a capture parsed in parts.
+        :param other: The batch to add, it isn't changed.
+        """
+        self.timestamps.extend(other.timestamps)
+        self.strengths.extend(other.strengths)
+        self.packet_types.extend(other.packet_types)
+        self.first_seen.extend(other.first_seen)
+        self.last_seen.extend(other.last_seen)
+        self.packet_counts.extend(other.packet_counts)
+
+        # The other batch numbers its nodes and devices its own way, so map them onto ours.
+        node_map = [ 0 ] * len(other.node_ids)
+        i = 0
+        for node_id in other.node_ids:
+            index = self.node_lookup.get(node_id)
+            if index is None:
+                index = self.node_lookup[node_id] = len(self.node_ids)
+                self.node_ids.append(node_id)
+            node_map[i] = index
+            i += 1
+
+        device_map = [ 0 ] * len(other.device_ids)
+        i = 0
+        for device_id in other.device_ids:
+            index = self.device_lookup.get(device_id)
+            if index is None:
+                index = self.device_lookup[device_id] = len(self.device_ids)
+                self.device_ids.append(device_id)
+            device_map[i] = index
+            i += 1
+
+        self.node_index.extend(node_map[index] for index in other.node_index)
+        self.device_index.extend(device_map[index] for index in other.device_index)
+
+    def without_devices(self, device_ids: set) -> 'AttendanceBatch':
+        """
+        :fn: without_devices
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Copies the batch, leaving out every record of some devices.
+        :param device_ids: The devices to leave out.
+        :return: Returns a new batch, this one isn't changed.
+        """
+        batch = AttendanceBatch()
+
+        # Only the devices are checked, each record just looks its device's answer up.
+        dropped = [ device_id in device_ids for device_id in self.device_ids ]
+        kept = [ i for i in range(len(self.timestamps)) if not dropped[self.device_index[i]] ]
+
+        for name in ("timestamps", "strengths", "packet_types", "first_seen", "last_seen", "packet_counts", "node_index"):
+            column = getattr(self, name)
+            setattr(batch, name, array(column.typecode, [ column[i] for i in kept ]))
+
+        batch.node_ids = list(self.node_ids)
+        batch.node_lookup = dict(self.node_lookup)
+
+        # The devices left are numbered again, so the dropped ones aren't kept.
+        device_map = [ 0 ] * len(self.device_ids)
+        i = 0
+        for device_id in self.device_ids:
+            if not dropped[i]:
+                device_map[i] = batch.device_lookup[device_id] = len(batch.device_ids)
+                batch.device_ids.append(device_id)
+            i += 1
+        batch.device_index = array('I', [ device_map[self.device_index[i]] for i in kept ])
+
+        return batch
+
+    def sort_by_time(self):
+        """
+        :fn: sort_by_time
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Puts the records in timestamp order, records with the same timestamp keep their order.
+        """
+        timestamps = self.timestamps
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+
+        # Every column is reordered the same way.
+        for name in ("timestamps", "strengths", "packet_types", "first_seen", "last_seen", "packet_counts", "node_index", "device_index"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [ column[i] for i in order ]))
+
+    def get_timestamp(self, i: int) -> datetime:
+        """
+        :fn: get_timestamp
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The time a record was observed.
+        :param i: The record.
+        :return: Returns a naive datetime.
+        """
+        return from_epoch(self.timestamps[i])
+
+    def get_strength(self, i: int) -> int | None:
+        """
+        :fn: get_strength
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The signal strength of a record.
+        :param i: The record.
+        :return: Returns the strength, or None if the packet didn't have one.
+        """
+        strength = self.strengths[i]
+        return None if strength == STRENGTH_NONE else strength
+
+    def get_node_id(self, i: int):
+        """
+        :fn: get_node_id
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The node of a record.
+        :param i: The record.
+        :return: Returns the node id, as it was given.
+        """
+        return self.node_ids[self.node_index[i]]
+
+    def get_device_id(self, i: int) -> str:
+        """
+        :fn: get_device_id
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The device of a record.
+        :param i: The record.
+        :return: Returns the device id.
+        """
+        return self.device_ids[self.device_index[i]]
+
+    def get_attendance(self, i: int) -> Attendance:
+        """
+        :fn: get_attendance
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an Attendance object of a record.
+        :param i: The record.
+        :return: Returns the attendance record.
+        """
+        return Attendance(self.get_timestamp(i), self.get_node_id(i), self.get_device_id(i), self.get_strength(i), PacketType(self.packet_types[i]))
+
+    def deserialise(self, documents):
+        """
+        :fn: deserialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds attendance documents from the database, both single packets and node summaries.
+        :param documents: The documents (a list or a cursor) we are reading through
+        """
+        for data in documents:
+            # Summaries from the nodes already hold the first, last and amount of packets.
+            if "packet_count" in data:
+                first_seen, last_seen, amount = data["first_seen"], data["last_seen"], data["packet_count"]
+            else:
+                first_seen, last_seen, amount = None, None, 1
+
+            self.append(
+                data["date_time"],
+                data["node_id"],
+                data["device_id"],
+                data.get("signal_strength"),
+                PacketType.NONE if ("packet_type" not in data) else PacketType(data["packet_type"]),
+                first_seen,
+                last_seen,
+                amount
+            )
+
+    def iter_documents(self):
+        """
+        :fn: iter_documents
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the records one at a time, so a large batch can be encoded without a list of every document.
+        :return: Yields an attendance document per record, the same documents Attendance.serialise() gives.
+        """
+        # Each node id is converted once, not once per record.
+        node_ids = [ node_id if isinstance(node_id, ObjectID) else ObjectID(node_id) for node_id in self.node_ids ]
+        device_ids = self.device_ids
+
+        length = len(self.timestamps)
+        i = 0
+        while i < length:
+            strength = self.strengths[i]
+            yield {
+                "_id": ObjectID(),
+                "date_time": from_epoch(self.timestamps[i]),
+                "node_id": node_ids[self.node_index[i]],
+                "device_id": device_ids[self.device_index[i]],
+                "signal_strength": None if strength == STRENGTH_NONE else strength,
+                "packet_type": self.packet_types[i]
+            }
+            i += 1
+
+    def serialise(self) -> list[dict]:
+        """
+        :fn: serialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the records into attendance documents for database insertion, the same documents Attendance.serialise() gives.
+        :return: A list of dictionaries, one per record.
+        """
+        return list(self.iter_documents())
@@ -0,0 +1,137 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is used to summarise every "ping" from one device, at one node, within one 30 minute period.
+"""
+from src.structures.attendance import Attendance
+from src.structures.density import Density
+from src.structures.PacketType import PacketType
+from datetime import datetime
+from bson.objectid import ObjectId as ObjectID
+
+class AttendanceSummary:
+    """
+    :class: AttendanceSummary
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class is used to refer to many attendance records of one device, collapsed into one record.
+    """
+    def __init__(self, timestamp: datetime = None, node_id: str = None, device_id: str = None, packet_type: PacketType = PacketType.NONE):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty summary, add attendance to it with add()
+        :param timestamp: Any time within the 30 minute period, this is rounded down.
+        :param node_id: The ID of the node that observed the device.
+        :param device_id: The hash of the device that was observed.
+        :param packet_type: The type of packet (bluetooth/wifi/ethernet)
+        """
+        # The start of the 30 minute period this summary covers.
+        self.timestamp = None if timestamp is None else Density.roundToLast30Minutes(timestamp)
+
+        self.node_id = node_id
+        self.device_id = device_id
+        self.packet_type = packet_type
+
+        # When the device was first and last seen, and how many packets it sent.
+        self.first_seen = None
+        self.last_seen = None
+        self.packet_count = 0
+
+        # The signal strengths, only packets that had a signal are counted.
+        self.strength_min = None
+        self.strength_max = None
+        self.strength_total = 0
+        self.strength_samples = 0
+
+        # Made once, so the server can tell a summary sent again (after a failed upload) from a new one.
+        self.upload_id = ObjectID()
+
+    def add(self, attendance: Attendance):
+        """
+        :fn: add
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds one attendance record of this device to the summary.
+        :param attendance: The attendance record.
+        """
+        self.add_packet(attendance.timestamp, attendance.strength)
+
+    def add_packet(self, timestamp: datetime, strength: int | None):
+        """
+        :fn: add_packet
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds one packet of this device to the summary, without needing an Attendance object.
+        :param timestamp: When the packet was observed.
+        :param strength: The signal strength, might be None
+        """
+        if self.first_seen is None or timestamp < self.first_seen:
+            self.first_seen = timestamp
+        if self.last_seen is None or timestamp > self.last_seen:
+            self.last_seen = timestamp
+        self.packet_count += 1
+
+        if strength is not None:
+            self.strength_min = strength if self.strength_min is None else min(self.strength_min, strength)
+            self.strength_max = strength if self.strength_max is None else max(self.strength_max, strength)
+            self.strength_total += strength
+            self.strength_samples += 1
+
+    def strength_mean(self) -> float | None:
+        """
+        :fn: strength_mean
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The mean signal strength of the packets that had one.
+        :return: Returns the mean, or None if no packet had a signal strength.
+        """
+        if self.strength_samples < 1:
+            return None
+        return self.strength_total / self.strength_samples
+
+    def deserialise(self, data: dict):
+        """
+        :fn: deserialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts dict/JSON format to this object
+        :param data: The data that we are reading through
+        """
+        self.timestamp = data["date_time"]
+        self.node_id = data["node_id"]
+        self.device_id = data["device_id"]
+        self.packet_type = PacketType.NONE if ("packet_type" not in data) else PacketType(data["packet_type"])
+        self.first_seen = data["first_seen"]
+        self.last_seen = data["last_seen"]
+        self.packet_count = data["packet_count"]
+        self.strength_min = data.get("signal_min")
+        self.strength_max = data.get("signal_max")
+        self.strength_total = data.get("signal_total", 0)
+        self.strength_samples = data.get("signal_samples", 0)
+
+    def serialise(self) -> dict:
+        """
+        :fn: serialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the summary into a dictionary format, it is stored with the attendance records.
+        :return: A dictionary representation of the summary.
+        """
+        # "signal_strength" is the strongest signal, so the server's strength filter keeps any device that came close enough.
+        return {
+            "date_time": self.timestamp,
+            "node_id": ObjectID(self.node_id),
+            "device_id": self.device_id,
+            "signal_strength": self.strength_max,
+            "packet_type": self.packet_type.value,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "packet_count": self.packet_count,
+            "signal_min": self.strength_min,
+            "signal_max": self.strength_max,
+            "signal_total": self.strength_total,
+            "signal_samples": self.strength_samples,
+            "upload_id": self.upload_id
+        }
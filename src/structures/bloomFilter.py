@@ -0,0 +1,112 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is used to send a set of device ids to the nodes in a few kilobytes, at the cost of a small chance of a false match.
+"""
+from hashlib import blake2b
+from math import ceil, log
+from struct import pack, unpack_from
+from zlib import compress, decompress
+
+# The bit count and hash count in front of the bits.
+HEADER_FORMAT = ">IB"
+HEADER_BYTES = 5
+
+class BloomFilter:
+    """
+    :class: BloomFilter
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: A Bloom filter of device ids, a device added is always found and one not added is found at about the error rate.
+    """
+    def __init__(self, capacity: int = 1000, error_rate: float = 0.001):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty filter, sized for how many devices it will hold.
+        :param capacity: How many devices will be added, more can be but the error rate goes up.
+        :param error_rate: How often a device that wasn't added should be found, 0.001 takes about 14 bits per device.
+        """
+        if error_rate <= 0 or error_rate >= 1:
+            raise ValueError(f"BloomFilter error rate must be between 0 and 1, not {error_rate}")
+
+        # An empty set still gets a (tiny) filter.
+        capacity = max(int(capacity), 1)
+
+        # The sizes that give the error rate with the fewest bits.
+        self.bit_count = max(int(ceil(-capacity * log(error_rate) / (log(2) ** 2))), 8)
+        self.hash_count = max(int(round(self.bit_count / capacity * log(2))), 1)
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+    def positions(self, device_id: str) -> list[int]:
+        """
+        :fn: positions
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: The bits a device sets, two halves of one hash make all of them.
+        :param device_id: The device id (already a hash of the MAC address).
+        :return: Returns hash_count bit positions.
+        """
+        digest = blake2b(device_id.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+
+        positions = [ 0 ] * self.hash_count
+        i = 0
+        while i < self.hash_count:
+            positions[i] = (first + i * second) % self.bit_count
+            i += 1
+        return positions
+
+    def add(self, device_id: str):
+        """
+        :fn: add
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds a device to the filter.
+        :param device_id: The device id (already a hash of the MAC address).
+        """
+        bits = self.bits
+        for position in self.positions(device_id):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, device_id: str) -> bool:
+        """
+        :fn: __contains__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Whether a device might have been added.
+        :param device_id: The device id (already a hash of the MAC address).
+        :return: Returns True for every device added, and for a few that weren't.
+        """
+        bits = self.bits
+        for position in self.positions(device_id):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def deserialise(self, data: bytes):
+        """
+        :fn: deserialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads a filter written by serialise()
+        :param data: The compressed filter.
+        """
+        data = decompress(data)
+        self.bit_count, self.hash_count = unpack_from(HEADER_FORMAT, data)
+        self.bits = bytearray(data[HEADER_BYTES:])
+
+        if len(self.bits) != (self.bit_count + 7) // 8:
+            raise ValueError(f"BloomFilter of {self.bit_count} bits can't be read from {len(self.bits)} bytes")
+
+    def serialise(self) -> bytes:
+        """
+        :fn: serialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the filter, its sizes followed by the bits, compressed.
+        :return: The compressed filter, stored as BSON binary.
+        """
+        return compress(pack(HEADER_FORMAT, self.bit_count, self.hash_count) + bytes(self.bits))
@@ -4,6 +4,7 @@
 :brief: This module is used to hold data from numerous points of history.
 """
 from src.structures.node import Node
+from src.structures.hyperLogLog import HyperLogLog
 from datetime import datetime
 from bson.objectid import ObjectId as ObjectID
 
@@ -39,6 +40,9 @@ class Density:
         self.estimation_factors = estimation_factors
         self.total_estimated_humans = int(self.total_entries / self.estimation_factors)
 
+        # A HyperLogLog sketch of the devices counted, so records can be merged into distinct counts later.
+        self.device_sketch = None
+
     def __hash__(self):
         """
         :fn: __hash__
@@ -65,6 +69,12 @@ class Density:
         self.total_entries = data["total_estimated_devices"]
         self.total_estimated_humans = data["total_estimated_humans"]
         self.estimation_factors = data["estimation_factors"]
+
+        # Only records made since sketches were added have one.
+        self.device_sketch = None
+        if data.get("device_sketch") is not None:
+            self.device_sketch = HyperLogLog()
+            self.device_sketch.deserialise(data["device_sketch"])
     
     def serialise(self) -> dict:
         """
@@ -78,7 +88,7 @@ class Density:
         print('node_id:', self.node_id, type(self.node_id))
 
         # This is used to serialise the record, this is used to insert the node into the database.
-        return {
+        data = {
             "date_time": self.timestamp,
             "location_id": self.location_id if (type(self.location_id) is type(ObjectID)) else ObjectID(self.location_id),
             "node_id": self.node_id if (type(self.node_id) is type(ObjectID)) else ObjectID(self.node_id),
@@ -86,6 +96,11 @@ class Density:
             "total_estimated_humans": self.total_estimated_humans,
             "estimation_factors": self.estimation_factors
         }
+
+        if self.device_sketch is not None:
+            data["device_sketch"] = self.device_sketch.serialise()
+
+        return data
     
     def roundToLast30Minutes(timestamp: datetime) -> datetime:
         """
@@ -95,6 +110,19 @@ class Density:
         :brief: Rounds a datetime down to 0 minutes or 30 minutes.
         :return: A datetime rounded down.
         """
-        minutes =  0 if timestamp.minute < 30 else 30
-        new_ts = datetime(timestamp.year, timestamp.month, timestamp.day, timestamp.hour, minutes)
+        return Density.roundToLastMinutes(timestamp, 30)
+
+    def roundToLastMinutes(timestamp: datetime, minutes: int) -> datetime:
+        """
+        :fn: roundToLastMinutes
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Rounds a datetime down to the last multiple of some minutes since midnight, e.g. 5, 60 or 1440 for the day.
+        :param timestamp: The time we are rounding.
+        :param minutes: The length of each period, it should divide a day.
+        :return: A datetime rounded down.
+        """
+        since_midnight = timestamp.hour * 60 + timestamp.minute
+        since_midnight -= since_midnight % minutes
+        new_ts = datetime(timestamp.year, timestamp.month, timestamp.day, since_midnight // 60, since_midnight % 60)
         return new_ts
@@ -0,0 +1,158 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is used to estimate how many distinct devices were seen, in a few kilobytes that can be merged across nodes and time.
+"""
+from hashlib import blake2b
+from math import log
+from zlib import compress, decompress
+
+# The bias correction of the sketches too small for the general formula, by register count.
+ALPHA_SMALL = { 16: 0.673, 32: 0.697, 64: 0.709 }
+
+class HyperLogLog:
+    """
+    :class: HyperLogLog
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: A HyperLogLog sketch of device ids, merging two sketches gives the sketch of every device in either.
+    """
+    def __init__(self, precision: int = 12):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates an empty sketch.
+        :param precision: 2^precision registers are kept, 12 gives 4096 registers and roughly a 1.6% error.
+        """
+        if precision < 4 or precision > 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, not {precision}")
+
+        self.precision = precision
+        self.register_count = 1 << precision
+
+        # Each register holds the longest run of leading zeros (plus one) seen by the hashes that land in it.
+        self.registers = bytearray(self.register_count)
+
+    def add(self, device_id: str):
+        """
+        :fn: add
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds a device to the sketch, adding the same device again changes nothing.
+        :param device_id: The device id (already a hash of the MAC address).
+        """
+        register, rank = self.position(device_id)
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def position(self, device_id: str) -> tuple:
+        """
+        :fn: position
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Where a device lands in the sketch, so the same device can be added to many sketches while only hashing it once.
+        :param device_id: The device id (already a hash of the MAC address).
+        :return: Returns (register, rank)
+        """
+        hashed = int.from_bytes(blake2b(device_id.encode('utf-8'), digest_size=8).digest(), 'big')
+
+        # The first bits pick the register, the rest give the rank.
+        register = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        return (register, rank)
+
+    def merge(self, other: 'HyperLogLog'):
+        """
+        :fn: merge
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Adds every device of another sketch to this one.
+        :param other: The sketch to merge in, if the precisions differ the result has the smaller one.
+        """
+        # Nodes can be configured differently, so the finer sketch is folded down to the coarser one first.
+        if other.precision > self.precision:
+            other = other.reduce(self.precision)
+        elif other.precision < self.precision:
+            reduced = self.reduce(other.precision)
+            self.precision, self.register_count, self.registers = reduced.precision, reduced.register_count, reduced.registers
+
+        # The larger of each pair of registers, done a whole sketch at a time.
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def reduce(self, precision: int) -> 'HyperLogLog':
+        """
+        :fn: reduce
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Gives the sketch the same devices would have made at a lower precision.
+        :param precision: The lower precision.
+        :return: Returns a new sketch, this one isn't changed.
+        """
+        reduced = HyperLogLog(precision)
+        registers = reduced.registers
+
+        # The index bits that are dropped become the first bits of what the rank is counted from.
+        dropped = self.precision - precision
+        low_mask = (1 << dropped) - 1
+
+        i = 0
+        for rank in self.registers:
+            if rank > 0:
+                low = i & low_mask
+                rank = rank + dropped if low == 0 else dropped - low.bit_length() + 1
+
+                register = i >> dropped
+                if rank > registers[register]:
+                    registers[register] = rank
+            i += 1
+
+        return reduced
+
+    def count(self) -> int:
+        """
+        :fn: count
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Estimates how many distinct devices were added.
+        :return: Returns the estimated number of distinct devices.
+        """
+        m = self.register_count
+
+        # The bias correction, the formula only holds from 128 registers up.
+        alpha = ALPHA_SMALL.get(m, 0.7213 / (1 + 1.079 / m))
+
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+
+        # While many registers are still empty, counting them is more accurate.
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * m and empty > 0:
+            estimate = m * log(m / empty)
+
+        return int(round(estimate))
+
+    def deserialise(self, data: bytes):
+        """
+        :fn: deserialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Reads a sketch written by serialise()
+        :param data: The compressed registers.
+        """
+        registers = decompress(data)
+
+        # The precision follows from how many registers there are.
+        self.register_count = len(registers)
+        self.precision = self.register_count.bit_length() - 1
+        self.registers = bytearray(registers)
+
+    def serialise(self) -> bytes:
+        """
+        :fn: serialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the registers, compressed since most of them are small or empty.
+        :return: The compressed registers, stored as BSON binary.
+        """
+        return compress(bytes(self.registers))
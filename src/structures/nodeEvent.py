@@ -6,6 +6,7 @@
 
 from src.structures.node import Node
 from datetime import datetime
+from bson.objectid import ObjectId as ObjectID
 
 class NodeEvent:
     """
@@ -14,7 +15,7 @@ class NodeEvent:
     :author: Aidil Zamri
     :brief: This class is used to refer to a node event that was captured
     """
-    def __init__(self, node: Node | str = None, is_powered: bool = None, is_receiving_data: bool = None, date_time: datetime = datetime.now):
+    def __init__(self, node: Node | str = None, is_powered: bool = None, is_receiving_data: bool = None, date_time: datetime = datetime.now, metrics: dict = None):
         """
         :fn: __init__
         :date: 22/10/2025
@@ -24,6 +25,7 @@ class NodeEvent:
         :param is_powered: The power status of the node
         :param is_receiving_data: The activity of the node (e.g. same area does not have any devices to detect through wireshark)
         :param date_time: The date and time the event(s) was captured
+        :param metrics: How long each stage of the node's loop took, and how much it handled (see StageTimer)
         """
                 
         #  If the node_id is a node object...
@@ -35,7 +37,12 @@ class NodeEvent:
 
         self.is_powered = is_powered
         self.is_receiving_data = is_receiving_data
-        self.date_time = date_time
+
+        # The default is the time the event is made, not when this module was loaded.
+        self.date_time = date_time() if callable(date_time) else date_time
+
+        # Only events from nodes that time their loops have metrics.
+        self.metrics = metrics
 
 
     def __hash__(self):
@@ -47,7 +54,7 @@ class NodeEvent:
         :return: The hash (id) of the node.
         """
         # This is used to create a hash of the node, this is used to identify if this node is unique.
-        return hash(self.id)
+        return hash(self.node_id)
     
     def deserialise(self, data:dict):
         """
@@ -58,10 +65,11 @@ class NodeEvent:
         :param data: The data that we are reading through
         """
 
-        self.node_id = ["node_id"]
-        self.is_powered = ["is_powered"]
-        self.is_receiving_data = ["is_receiving_data"]
-        self.date_time = ["date_time"]
+        self.node_id = data["node_id"]
+        self.is_powered = data["is_powered"]
+        self.is_receiving_data = data["is_receiving_data"]
+        self.date_time = data["date_time"]
+        self.metrics = data.get("metrics")
     
     def serialise(self):
         """
@@ -72,10 +80,14 @@ class NodeEvent:
         :return: A dictionary representation of the node event.
         """
         # This is used to serialise the node event, this is used to insert the node into the database.
-        return {
-
-            "node_id": self.node_id,
+        data = {
+            "node_id": self.node_id if isinstance(self.node_id, ObjectID) else ObjectID(self.node_id),
             "is_powered": self.is_powered,
-            "is_receivig_data": self.is_receiving_data,
-            "date_time": self.date_time ,
-        }
\ No newline at end of file
+            "is_receiving_data": self.is_receiving_data,
+            "date_time": self.date_time,
+        }
+
+        if self.metrics is not None:
+            data["metrics"] = self.metrics
+
+        return data
\ No newline at end of file
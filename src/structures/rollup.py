@@ -0,0 +1,86 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: This module is used to hold one node's density over a period of one rollup tier, e.g. 5 minutes or a day.
+"""
+from src.structures.hyperLogLog import HyperLogLog
+from datetime import datetime
+from bson.objectid import ObjectId as ObjectID
+
+class Rollup:
+    """
+    :class: Rollup
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: This class is a pre-aggregated density record, the distinct devices a node saw over a period and the most it saw at once.
+    """
+    def __init__(self, timestamp: datetime = None, node_id: str = None, location_id: str = None, device_sketch: HyperLogLog = None, peak_entries: int = None, estimation_factors: float = 1):
+        """
+        :fn: __init__
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Creates a rollup record.
+        :param timestamp: The start of the period.
+        :param node_id: The node that observed it.
+        :param location_id: The location of the node.
+        :param device_sketch: A sketch of every device the node saw over the period.
+        :param peak_entries: The most devices of any period of the tier below, the distinct devices if None.
+        :param estimation_factors: Devices per person.
+        """
+        self.timestamp = timestamp
+        self.node_id = node_id
+        self.location_id = location_id
+
+        # The distinct devices over the whole period.
+        self.device_sketch = HyperLogLog() if device_sketch is None else device_sketch
+        self.total_entries = self.device_sketch.count()
+
+        # The busiest period of the tier below, the base tier's peak is itself.
+        self.peak_entries = self.total_entries if peak_entries is None else peak_entries
+
+        # Estimations of people, from the peak like a Density record's.
+        self.estimation_factors = estimation_factors
+        self.total_estimated_humans = int(self.peak_entries / self.estimation_factors)
+
+    def deserialise(self, data: dict):
+        """
+        :fn: deserialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Converts dict/JSON format to this object
+        :param data: The data that we are reading through
+        """
+        self.timestamp = data["date_time"]
+        self.node_id = data["node_id"]
+        self.location_id = data.get("location_id")
+        self.total_entries = data["total_estimated_devices"]
+        self.peak_entries = data["peak_estimated_devices"]
+        self.total_estimated_humans = data["total_estimated_humans"]
+        self.estimation_factors = data["estimation_factors"]
+
+        self.device_sketch = HyperLogLog()
+        self.device_sketch.deserialise(data["device_sketch"])
+
+    def serialise(self) -> dict:
+        """
+        :fn: serialise
+        :date: 17/10/2026
+        :author: Cameron Sims
+        :brief: Serialises the rollup into a dictionary format for database insertion.
+        :return: A dictionary representation of the rollup.
+        """
+        data = {
+            "date_time": self.timestamp,
+            "node_id": self.node_id if isinstance(self.node_id, ObjectID) else ObjectID(self.node_id),
+            "total_estimated_devices": self.total_entries,
+            "peak_estimated_devices": self.peak_entries,
+            "total_estimated_humans": self.total_estimated_humans,
+            "estimation_factors": self.estimation_factors,
+            "device_sketch": self.device_sketch.serialise()
+        }
+
+        # Nodes that aren't registered have no location.
+        if self.location_id is not None:
+            data["location_id"] = self.location_id if isinstance(self.location_id, ObjectID) else ObjectID(self.location_id)
+
+        return data
@@ -0,0 +1,207 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: Benchmarks how fast each parser backend turns a capture file into attendance, on generated captures so it runs offline.
+"""
+from json import dumps as json_dumps, loads as json_loads
+from os import makedirs
+from os.path import join as path_join, exists as file_exists
+from subprocess import run as subprocess_run, PIPE
+from sys import executable as python_executable
+from time import perf_counter
+
+from src.test.pcapng_generator import generate_capture
+
+SNIFF_CONFIG_FNAME = "./data/node/sniffingConfig.json"
+NODE_CONFIG_FNAME  = "./data/node/nodeInfo.json"
+
+# "reader" is the native pcapng reader alone, without hashing or building attendance.
+# "parallel" is the native backend split across every core.
+BACKENDS = ("reader", "native", "parallel", "fields", "pyshark")
+
+def peak_rss_kb() -> int:
+    """
+    :fn: peak_rss_kb
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: The most memory this process has used.
+    :return: Returns the peak resident set size in kilobytes.
+    """
+    from resource import getrusage, RUSAGE_SELF
+    from sys import platform
+
+    # macOS reports bytes, Linux kilobytes.
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform == "darwin" else peak
+
+def create_sniffer(backend: str):
+    """
+    :fn: create_sniffer
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Creates a sniffer from the node's config without starting a capture.
+    :param backend: The parser backend to use.
+    :return: Returns the sniffer.
+    """
+    from src.node.Sniffer import Sniffer
+
+    sniffer = Sniffer.__new__(Sniffer)
+    sniffer.load_node_config(NODE_CONFIG_FNAME)
+    sniffer.load_sniff_config(SNIFF_CONFIG_FNAME)
+    sniffer.parser_backend = backend
+    return sniffer
+
+def run_backend(backend: str, capture_file: str, repeat: int) -> dict:
+    """
+    :fn: run_backend
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Parses a capture with one backend, keeping the fastest of several runs.
+    :param backend: The backend to run.
+    :param capture_file: The capture to parse.
+    :param repeat: How many times to parse it.
+    :return: Returns the results, or the reason the backend couldn't run.
+    """
+    baseline_kb = peak_rss_kb()
+
+    try:
+        if backend == "reader":
+            from src.node.PcapngReader import PcapngReader
+            parse = lambda: list(PcapngReader(capture_file))
+        elif backend == "parallel":
+            from os import cpu_count
+
+            sniffer = create_sniffer("native")
+            sniffer.parse_workers = cpu_count() or 1
+            sniffer.parse_parallel_bytes = 0
+            parse = lambda: sniffer.get_packets_from_file(capture_file)
+        else:
+            sniffer = create_sniffer(backend)
+            parse = lambda: sniffer.get_packets_from_file(capture_file)
+
+        best = None
+        packets = 0
+        i = 0
+        while i < repeat:
+            start = perf_counter()
+            packets = len(parse())
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            i += 1
+    except Exception as e:
+        # Usually tshark or pyshark missing.
+        return { "backend": backend, "skipped": f"{type(e).__name__}: {e}" }
+
+    return {
+        "backend": backend,
+        "packets": packets,
+        "seconds": best,
+        "packets_per_second": packets / best if best > 0 else 0.0,
+        "us_per_packet": best * 1000000 / packets if packets > 0 else 0.0,
+        "peak_rss_kb": peak_rss_kb(),
+        "rss_growth_kb": peak_rss_kb() - baseline_kb
+    }
+
+def run_worker(backend: str, capture_file: str, repeat: int) -> dict:
+    """
+    :fn: run_worker
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Runs one backend in its own python process, so each peak memory is measured on its own.
+    :param backend: The backend to run.
+    :param capture_file: The capture to parse.
+    :param repeat: How many times to parse it.
+    :return: Returns the worker's results.
+    """
+    completed = subprocess_run(
+        [ python_executable, "-m", "src.test.parser_benchmark", "--worker", backend, capture_file, "--repeat", str(repeat) ],
+        stdout=PIPE, stderr=PIPE, text=True
+    )
+
+    # The results are the last line, anything before is the sniffer printing.
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return { "backend": backend, "skipped": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "worker failed" }
+    return json_loads(lines[-1])
+
+def print_results(capture_file: str, results: list[dict]):
+    """
+    :fn: print_results
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Prints a table of the results.
+    :param capture_file: The capture that was parsed.
+    :param results: The results of each backend.
+    """
+    print(f"\n{capture_file}")
+    print(f"{'backend':<10} {'packets':>9} {'packets/s':>12} {'us/packet':>10} {'peak RSS MB':>12} {'growth MB':>10}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['backend']:<10} skipped ({result['skipped'][:100]})")
+            continue
+        print(
+            f"{result['backend']:<10} {result['packets']:>9} {result['packets_per_second']:>12.0f} {result['us_per_packet']:>10.2f} "
+            f"{result['peak_rss_kb'] / 1024:>12.1f} {result['rss_growth_kb'] / 1024:>10.1f}"
+        )
+
+def main(sizes: list[int], devices: int, backends: list[str], repeat: int, output_directory: str, seed: int) -> list[dict]:
+    """
+    :fn: main
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Generates a capture of each size (once, they're deterministic) and benchmarks every backend on it.
+    :param sizes: The packet counts of the captures.
+    :param devices: How many distinct devices are in each capture.
+    :param backends: The backends to benchmark.
+    :param repeat: How many times each backend parses each capture.
+    :param output_directory: Where the captures are written.
+    :param seed: The random seed of the captures.
+    :return: Returns every result.
+    """
+    makedirs(output_directory, exist_ok=True)
+
+    all_results = []
+    for size in sizes:
+        capture_file = path_join(output_directory, f"benchmark_{size}_{devices}_{seed}.pcapng")
+        if not file_exists(capture_file):
+            generate_capture(capture_file, packets=size, devices=devices, seed=seed)
+
+        results = [ run_worker(backend, capture_file, repeat) for backend in backends ]
+        print_results(capture_file, results)
+
+        for result in results:
+            result["capture_packets"] = size
+        all_results += results
+    return all_results
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmark the capture parser backends on generated captures.")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated packet counts.")
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"Comma separated, any of {BACKENDS}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output-directory", default="./data/captures/benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "CAPTURE_FILE"), help="Used by the benchmark itself, runs one backend and prints JSON.")
+    arguments = parser.parse_args()
+
+    # A worker runs one backend and prints its results as JSON.
+    if arguments.worker is not None:
+        backend, capture_file = arguments.worker
+        print(json_dumps(run_backend(backend, capture_file, arguments.repeat)))
+    else:
+        results = main(
+            [ int(size) for size in arguments.sizes.split(",") ],
+            arguments.devices,
+            arguments.backends.split(","),
+            arguments.repeat,
+            arguments.output_directory,
+            arguments.seed
+        )
+        if arguments.json:
+            with open(arguments.json, "w") as file:
+                file.write(json_dumps(results, indent=4))
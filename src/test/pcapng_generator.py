@@ -0,0 +1,230 @@
+"""
+:author: Cameron Sims
+:date: 17/10/2026
+:brief: Writes deterministic pcapng captures of Wi-Fi probe requests, ethernet frames and bluetooth LE adverts, for testing and benchmarking the parsers offline.
+"""
+from random import Random
+from struct import pack
+
+# Link layer types, the same ones the native reader decodes.
+LINKTYPE_ETHERNET             = 1
+LINKTYPE_IEEE802_11_RADIOTAP  = 127
+LINKTYPE_BLUETOOTH_LE_LL_PHDR = 256
+
+# The access address used by every bluetooth LE advertising packet.
+BTLE_ADVERTISING_ACCESS_ADDRESS = 0x8E89BED6
+
+# The interface each kind of packet is captured on, in the order the interfaces are written.
+INTERFACES = {
+    "wifi": (0, LINKTYPE_IEEE802_11_RADIOTAP),
+    "ethernet": (1, LINKTYPE_ETHERNET),
+    "bluetooth": (2, LINKTYPE_BLUETOOTH_LE_LL_PHDR)
+}
+
+def pad_to_4(data: bytes) -> bytes:
+    """
+    :fn: pad_to_4
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Pads data to a multiple of 4 bytes, pcapng blocks are 32 bit aligned.
+    :param data: The data to pad.
+    :return: Returns the padded data.
+    """
+    return data + b'\x00' * (-len(data) % 4)
+
+def write_block(file, block_type: int, body: bytes):
+    """
+    :fn: write_block
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Writes one pcapng block, the total length is written before and after the body.
+    :param file: The binary file to write to.
+    :param block_type: The pcapng block type.
+    :param body: The block body, already padded.
+    """
+    total_length = 12 + len(body)
+    file.write(pack('<II', block_type, total_length) + body + pack('<I', total_length))
+
+def write_section_header(file):
+    """
+    :fn: write_section_header
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Writes a little endian section header, with an unknown section length.
+    :param file: The binary file to write to.
+    """
+    write_block(file, 0x0A0D0D0A, pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+
+def write_interface(file, link_type: int):
+    """
+    :fn: write_interface
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Writes an interface description, timestamps are left in the default microseconds.
+    :param file: The binary file to write to.
+    :param link_type: The link layer type of the interface.
+    """
+    write_block(file, 0x00000001, pack('<HHI', link_type, 0, 0))
+
+def write_enhanced_packet(file, interface_id: int, timestamp_us: int, data: bytes):
+    """
+    :fn: write_enhanced_packet
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Writes one captured packet.
+    :param file: The binary file to write to.
+    :param interface_id: The interface it was captured on.
+    :param timestamp_us: When it was captured, in microseconds since the epoch.
+    :param data: The bytes of the packet.
+    """
+    header = pack('<IIIII', interface_id, timestamp_us >> 32, timestamp_us & 0xFFFFFFFF, len(data), len(data))
+    write_block(file, 0x00000006, header + pad_to_4(data))
+
+def make_mac_addresses(rng: Random, amount: int) -> list[bytes]:
+    """
+    :fn: make_mac_addresses
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Makes distinct, locally administered unicast MAC addresses, like the random ones phones send.
+    :param rng: The random generator, seeded so the same addresses come out each time.
+    :param amount: How many addresses to make.
+    :return: Returns the addresses as 6 bytes each.
+    """
+    addresses = set()
+    while len(addresses) < amount:
+        first = (rng.randrange(256) | 0x02) & 0xFE
+        addresses.add(bytes([first]) + rng.randbytes(5))
+    return sorted(addresses)
+
+def make_wifi_probe_request(mac_address: bytes, signal: int, sequence: int) -> bytes:
+    """
+    :fn: make_wifi_probe_request
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Makes a radiotap header (flags, channel and antenna signal) followed by a broadcast probe request.
+    :param mac_address: The address of the device probing.
+    :param signal: The antenna signal in dBm.
+    :param sequence: The sequence number of the frame.
+    :return: Returns the packet bytes.
+    """
+    # Flags at 8, channel (aligned to 2) at 10, antenna signal at 14.
+    radiotap = pack('<BBHI', 0, 0, 15, 0x0000002A) + pack('<BxHHb', 0x00, 2437, 0x00A0, signal)
+
+    broadcast = b'\xff' * 6
+    frame = pack('<BBH', 0x40, 0x00, 0) + broadcast + mac_address + broadcast + pack('<H', (sequence & 0x0FFF) << 4)
+
+    # An empty (wildcard) SSID and the 802.11b rates.
+    elements = b'\x00\x00' + b'\x01\x04\x02\x04\x0b\x16'
+    return radiotap + frame + elements
+
+def make_ethernet_frame(mac_address: bytes, rng: Random) -> bytes:
+    """
+    :fn: make_ethernet_frame
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Makes a minimum size IPv4 ethernet frame.
+    :param mac_address: The source address.
+    :param rng: The random generator, for the payload.
+    :return: Returns the packet bytes.
+    """
+    destination = b'\x00\xe0\x4c\x36\x05\xdc'
+    return destination + mac_address + b'\x08\x00' + rng.randbytes(46)
+
+def make_btle_advert(mac_address: bytes, signal: int, rng: Random) -> bytes:
+    """
+    :fn: make_btle_advert
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Makes an ADV_IND advert with a bluetooth LE pseudo header carrying the signal.
+    :param mac_address: The advertiser's address, written little endian like the air does.
+    :param signal: The signal in dBm.
+    :param rng: The random generator, for the advertising data.
+    :return: Returns the packet bytes.
+    """
+    advertising_data = b'\x02\x01\x06' + b'\x09\xff' + rng.randbytes(8)
+
+    # Channel, signal, noise, access address offenses, reference access address, flags (signal valid and dewhitened).
+    pseudo_header = pack('<BbbBIH', 37, signal, -128, 0, BTLE_ADVERTISING_ACCESS_ADDRESS, 0x0003)
+
+    pdu = pack('<BB', 0x40, 6 + len(advertising_data)) + mac_address[::-1] + advertising_data
+    return pseudo_header + pack('<I', BTLE_ADVERTISING_ACCESS_ADDRESS) + pdu + rng.randbytes(3)
+
+def generate_capture(output_file: str, packets: int = 10000, devices: int = 200, mix: dict = None, seed: int = 0, start_time: int = 1792198800, seconds: int = 30) -> dict:
+    """
+    :fn: generate_capture
+    :date: 17/10/2026
+    :author: Cameron Sims
+    :brief: Writes a capture, the same arguments always give the same file.
+    :param output_file: The pcapng file to write.
+    :param packets: How many packets to write.
+    :param devices: How many distinct devices send them, shared out between the packet types by the mix.
+    :param mix: The share of each packet type, e.g. { "wifi": 6, "ethernet": 1, "bluetooth": 3 }
+    :param seed: The random seed.
+    :param start_time: The epoch second of the first packet.
+    :param seconds: How many seconds the packets are spread over.
+    :return: Returns how many packets of each type were written.
+    """
+    rng = Random(seed)
+    mix = mix if mix is not None else { "wifi": 6, "ethernet": 1, "bluetooth": 3 }
+    kinds = [ kind for kind in INTERFACES if mix.get(kind, 0) > 0 ]
+    weights = [ mix[kind] for kind in kinds ]
+
+    # Each packet type gets its own devices, at least one each.
+    total_weight = sum(weights)
+    addresses = make_mac_addresses(rng, max(devices, len(kinds)))
+    device_pools = dict()
+    start = 0
+    for kind, weight in zip(kinds, weights):
+        amount = max(1, round(len(addresses) * weight / total_weight))
+        device_pools[kind] = addresses[start:start + amount] or addresses[-1:]
+        start += amount
+
+    written = { kind: 0 for kind in INTERFACES }
+    step_us = max(1, (seconds * 1000000) // max(packets, 1))
+
+    with open(output_file, 'wb') as file:
+        write_section_header(file)
+        for kind in INTERFACES:
+            write_interface(file, INTERFACES[kind][1])
+
+        i = 0
+        while i < packets:
+            kind = rng.choices(kinds, weights)[0]
+            mac_address = rng.choice(device_pools[kind])
+            signal = rng.randint(-95, -30)
+
+            if kind == "wifi":
+                data = make_wifi_probe_request(mac_address, signal, i)
+            elif kind == "ethernet":
+                data = make_ethernet_frame(mac_address, rng)
+            else:
+                data = make_btle_advert(mac_address, signal, rng)
+
+            write_enhanced_packet(file, INTERFACES[kind][0], start_time * 1000000 + i * step_us, data)
+            written[kind] += 1
+            i += 1
+
+    return written
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Write a deterministic pcapng capture for testing the parsers.")
+    parser.add_argument("output_file")
+    parser.add_argument("--packets", type=int, default=10000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--wifi", type=int, default=6, help="Share of Wi-Fi probe requests.")
+    parser.add_argument("--ethernet", type=int, default=1, help="Share of ethernet frames.")
+    parser.add_argument("--bluetooth", type=int, default=3, help="Share of bluetooth LE adverts.")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    written = generate_capture(
+        arguments.output_file,
+        packets=arguments.packets,
+        devices=arguments.devices,
+        mix={ "wifi": arguments.wifi, "ethernet": arguments.ethernet, "bluetooth": arguments.bluetooth },
+        seed=arguments.seed
+    )
+    print(f"Wrote {sum(written.values())} packets to {arguments.output_file}: {written}")